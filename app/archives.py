@@ -0,0 +1,239 @@
+"""Classify archives by the names of their members, without extracting them"""
+
+import os
+import struct
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app import stats
+
+# longest first, so .tar.gz is not taken for .gz
+ARCHIVE_SUFFIXES = (
+    ".tar.bz2",
+    ".tar.gz",
+    ".tar.xz",
+    ".tbz2",
+    ".tgz",
+    ".txz",
+    ".tar",
+    ".zip",
+    ".deb",
+)
+# streaming modes, so a tar is only ever read with the one decompressor
+# its suffix names and member data is read past rather than seeked over
+TAR_MODES = {
+    ".tar.bz2": "r|bz2",
+    ".tar.gz": "r|gz",
+    ".tar.xz": "r|xz",
+    ".tbz2": "r|bz2",
+    ".tgz": "r|gz",
+    ".txz": "r|xz",
+    ".tar": "r|",
+}
+TAR_SUFFIXES = tuple(TAR_MODES)
+
+# members that must agree before an archive is routed without reading on
+ARCHIVE_SAMPLE = 64
+ARCHIVE_WORKERS = 8
+# bytes of a tar read before giving up on it, member data stands between
+# one header and the next, so a tarball of large files is left unsure
+ARCHIVE_READ_LIMIT = 4 * 1024 * 1024
+
+_EOCD = struct.Struct("<4s4H2LH")
+_EOCD_SIGNATURE = b"PK\x05\x06"
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_CENTRAL_SIGNATURE = b"PK\x01\x02"
+_MAX_COMMENT = 0xFFFF
+_UTF8_FLAG = 0x800
+
+
+class ReadLimitReached(Exception):
+    """more of an archive would have to be read than is allowed"""
+
+
+class BoundedReader:
+    """file object for reading at most limit bytes from file"""
+
+    def __init__(self, file, limit: int):
+        self.file = file
+        self.remaining = limit
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            # a file of exactly limit bytes has simply ended
+            if self.file.read(1):
+                raise ReadLimitReached(self.file.name)
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def archive_errors() -> tuple[type[Exception], ...]:
+    """
+    errors a damaged archive can raise while its members are read,
+    the readers are imported here rather than when the module loads,
+    so a run whose Downloads holds no archive never loads them
+    """
+
+    import lzma
+    import tarfile
+    import zipfile
+
+    return (
+        OSError,
+        EOFError,
+        ValueError,
+        struct.error,
+        tarfile.TarError,
+        zipfile.BadZipFile,
+        lzma.LZMAError,
+        ReadLimitReached,
+    )
+
+
+def archive_suffix(name: str) -> str | None:
+    """the archive suffix name ends with, matched whole, or None"""
+
+    lowered = name.lower()
+    for suffix in ARCHIVE_SUFFIXES:
+        if lowered.endswith(suffix) and len(lowered) > len(suffix):
+            return suffix
+    return None
+
+
+def is_archive(name: str) -> bool:
+    """whether name ends with an archive suffix, my.zipper.txt does not"""
+    return archive_suffix(name) is not None
+
+
+def zip_member_names(file) -> Iterator[str]:
+    """
+    member names read one central directory record at a time,
+    found through the end of central directory record, member data
+    and the rest of the directory are never read
+    """
+
+    import zipfile
+
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    tail_size = min(size, _EOCD.size + _MAX_COMMENT)
+    file.seek(size - tail_size)
+    tail = file.read(tail_size)
+
+    position = tail.rfind(_EOCD_SIGNATURE)
+    if position == -1:
+        raise zipfile.BadZipFile("no end of central directory record")
+    _, _, _, _, total, directory_size, directory_offset, _ = _EOCD.unpack_from(
+        tail, position
+    )
+
+    if total == 0xFFFF or directory_offset == 0xFFFFFFFF:
+        # zip64, leave the extended records to zipfile
+        file.seek(0)
+        yield from zipfile.ZipFile(file).namelist()
+        return
+
+    # measured back from the record, so data prepended to the archive is fine
+    file.seek(size - tail_size + position - directory_size)
+    for _ in range(total):
+        header = file.read(_CENTRAL_HEADER.size)
+        fields = _CENTRAL_HEADER.unpack(header)
+        if fields[0] != _CENTRAL_SIGNATURE:
+            raise zipfile.BadZipFile("bad central directory record")
+        flags = fields[3]
+        name_length, extra_length, comment_length = fields[10:13]
+        name = file.read(name_length)
+        file.seek(extra_length + comment_length, os.SEEK_CUR)
+        yield name.decode("utf-8" if flags & _UTF8_FLAG else "cp437")
+
+
+def tar_member_names(path: Path, limit: int = ARCHIVE_READ_LIMIT) -> Iterator[str]:
+    """
+    member names read header by header, directories ending in /,
+    decompressed as the suffix says and only as far as the last header
+    read, raising ReadLimitReached once limit bytes of the file are read
+    """
+
+    import tarfile
+
+    mode = TAR_MODES[archive_suffix(path.name)]
+    with open(path, "rb") as file:
+        with tarfile.open(fileobj=BoundedReader(file, limit), mode=mode) as tar:
+            for member in tar:
+                yield member.name + "/" if member.isdir() else member.name
+
+
+def member_names(path: Path) -> Iterator[str]:
+    """member names of a zip or tar archive, lazily"""
+
+    suffix = archive_suffix(path.name)
+    if suffix in TAR_SUFFIXES:
+        yield from tar_member_names(path)
+    elif suffix == ".zip":
+        with open(path, "rb") as file:
+            yield from zip_member_names(file)
+
+
+def classify_members(
+    names: Iterable[str], ext_dir_map: dict[str, str], sample: int = ARCHIVE_SAMPLE
+) -> str | None:
+    """
+    the directory every member's extension maps to, stopping at the
+    first member that maps elsewhere or nowhere, or once sample members
+    agree, directories and hidden files are not counted
+    """
+
+    destination = None
+    agreed = 0
+    for name in names:
+        base_name = name.rstrip("/").rsplit("/", 1)[-1]
+        if name.endswith("/") or base_name.startswith(".") or "__MACOSX/" in name:
+            continue
+
+        directory = ext_dir_map.get(os.path.splitext(base_name)[1].lower())
+        if directory is None or destination not in (None, directory):
+            return None
+
+        destination = directory
+        agreed += 1
+        if agreed >= sample:
+            break
+
+    return destination
+
+
+def classify_archive(
+    path: Path, ext_dir_map: dict[str, str], sample: int = ARCHIVE_SAMPLE
+) -> str | None:
+    """destination directory for an archive's contents, None if unsure"""
+
+    names = member_names(path)
+    try:
+        return classify_members(names, ext_dir_map, sample)
+    except archive_errors():
+        return None
+    finally:
+        names.close()
+
+
+def classify_archives(
+    paths: list[Path],
+    ext_dir_map: dict[str, str],
+    max_workers: int = ARCHIVE_WORKERS,
+) -> dict[Path, str | None]:
+    """classify a batch of archives on a thread pool"""
+
+    if not paths:
+        return {}
+
+    def classify(path: Path) -> str | None:
+        return classify_archive(path, ext_dir_map)
+
+    stats.count("archive_reads", len(paths))
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+        return dict(zip(paths, executor.map(classify, paths)))
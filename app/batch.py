@@ -0,0 +1,173 @@
+"""Organize many home directories at once on a process pool"""
+
+import glob
+import logging
+import os
+from collections import Counter, deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger("Prod Logger")
+
+# roots organized at once, and at most this many from any one disk
+BATCH_WORKERS = 4
+ROOTS_PER_DEVICE = 2
+
+
+@dataclass
+class RootResult:
+    """outcome of organizing one root, error is set if it failed"""
+
+    root: Path
+    moves: int = 0
+    deferred: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+    stats: dict = field(default_factory=dict)
+
+    def summary(self) -> str:
+        if self.error is not None:
+            return f"{self.root}: failed after {self.seconds:.2f}s: {self.error}"
+        return (
+            f"{self.root}: {self.moves} moves, {self.deferred} deferred "
+            f"in {self.seconds:.2f}s"
+        )
+
+
+def expand_roots(patterns: list[str]) -> list[Path]:
+    """
+    directories named by patterns, each a path or a glob such as
+    /home/*, in order and without duplicates
+    """
+
+    roots: dict[Path, None] = {}
+    for pattern in patterns:
+        is_glob = any(char in pattern for char in "*?[")
+        matches = sorted(glob.glob(pattern)) if is_glob else [pattern]
+        for match in matches:
+            path = Path(match).resolve()
+            if path.is_dir():
+                roots.setdefault(path, None)
+            else:
+                logger.error("Skipping root %s, it is not a directory", match)
+    return list(roots)
+
+
+def drop_privileges(root: Path):
+    """
+    when running as root, become the owner of root so nothing is
+    created there that its owner cannot move or delete, and symlinks
+    planted in it cannot reach anything its owner could not
+    """
+
+    if os.geteuid() != 0:
+        return
+
+    owner = os.stat(root)
+    if owner.st_uid == 0:
+        return
+
+    import pwd
+
+    try:
+        os.initgroups(pwd.getpwuid(owner.st_uid).pw_name, owner.st_gid)
+    except KeyError:
+        os.setgroups([])
+    os.setgid(owner.st_gid)
+    os.setuid(owner.st_uid)
+
+
+def run_batch(
+    roots: list[Path],
+    task: Callable[[Path], RootResult],
+    workers: int = BATCH_WORKERS,
+    per_device: int = ROOTS_PER_DEVICE,
+) -> list[RootResult]:
+    """
+    run task for every root on a pool of workers processes, each root
+    in a fresh process, roots on the same device are queued so no more
+    than per_device of them run at once, a root whose task raised or
+    whose process died is reported as failed without stopping the rest,
+    when a process dies the pool is rebuilt and the roots that were in
+    flight with it are rerun one at a time to tell which one it was
+    """
+
+    queues: dict[int, deque[Path]] = {}
+    for root in roots:
+        queues.setdefault(os.stat(root).st_dev, deque()).append(root)
+
+    results: dict[Path, RootResult] = {}
+    busy: Counter = Counter()
+    running: dict[Future, tuple[Path, int]] = {}
+    suspects: deque[tuple[Path, int]] = deque()
+
+    def new_pool() -> ProcessPoolExecutor:
+        # a fresh process per root keeps privileges and state from leaking
+        return ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1)
+
+    def submit(root: Path, device: int) -> bool:
+        try:
+            future = pool.submit(task, root)
+        except BrokenProcessPool:
+            return False
+        running[future] = (root, device)
+        busy[device] += 1
+        return True
+
+    def submit_ready():
+        # suspects run alone, so a process dying again names its root
+        if suspects:
+            if not running and submit(*suspects[0]):
+                suspects.popleft()
+            return
+        for device, queue in queues.items():
+            while queue and busy[device] < per_device and len(running) < workers:
+                if not submit(queue[0], device):
+                    return
+                queue.popleft()
+
+    def fail(root: Path, error: BaseException):
+        message = f"{type(error).__name__}: {error}"
+        logger.error("Error in run_batch for %s: %s", root, message)
+        results[root] = RootResult(root, error=message)
+
+    pool = new_pool()
+    try:
+        while True:
+            submit_ready()
+            if not running:
+                if not suspects and not any(queues.values()):
+                    break
+                # the pool broke before anything more could be submitted
+                pool.shutdown()
+                pool = new_pool()
+                continue
+
+            in_flight = len(running)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            if any(
+                isinstance(future.exception(), BrokenProcessPool) for future in done
+            ):
+                # everything still in flight fails along with the dead process
+                done, _ = wait(running)
+                pool.shutdown()
+                pool = new_pool()
+
+            for future in done:
+                root, device = running.pop(future)
+                busy[device] -= 1
+                error = future.exception()
+                if error is None:
+                    results[root] = future.result()
+                elif isinstance(error, BrokenProcessPool) and in_flight > 1:
+                    # any of the roots in flight may have killed it
+                    suspects.append((root, device))
+                else:
+                    fail(root, error)
+    finally:
+        pool.shutdown()
+
+    return [results[root] for root in roots]
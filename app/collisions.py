@@ -0,0 +1,112 @@
+"""Pick free 'name (n).ext' names for moves whose destination is taken"""
+
+import os
+import re
+from collections.abc import Callable
+from pathlib import Path
+
+from app import stats
+
+# what happens to a move whose destination name is already taken
+COLLISION_RENAME = "rename"
+COLLISION_ABORT = "abort"
+COLLISION_POLICIES = (COLLISION_RENAME, COLLISION_ABORT)
+
+_SUFFIXED_STEM = re.compile(r"^(?P<stem>.*) \((?P<number>\d+)\)$")
+
+
+def split_name(name: str, is_dir: bool = False) -> tuple[str, str]:
+    """
+    stem and extension of name, an archive's whole suffix such as
+    .tar.gz counting as its extension, directories keep their whole
+    name as stem
+    """
+
+    if is_dir:
+        return name, ""
+
+    # cli.py imports this module, the archive readers are loaded on first use
+    from app.archives import archive_suffix
+
+    suffix = archive_suffix(name)
+    if suffix is not None:
+        return name[: -len(suffix)], name[-len(suffix) :]
+    path = Path(name)
+    return path.stem, path.suffix
+
+
+def suffixed_name(name: str, number: int, is_dir: bool = False) -> str:
+    """name with ' (number)' added before its extension"""
+
+    stem, extension = split_name(name, is_dir)
+    return f"{stem} ({number}){extension}"
+
+
+class _DirectoryNames:
+    """names taken in one directory plus the highest suffix used per stem"""
+
+    def __init__(self, names: set[str]):
+        self.names: set[str] = set()
+        self.max_suffix: dict[tuple[str, str], int] = {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str):
+        self.names.add(name)
+        stem, extension = split_name(name)
+        match = _SUFFIXED_STEM.match(stem)
+        if match is not None:
+            key = (match["stem"], extension)
+            number = int(match["number"])
+            self.max_suffix[key] = max(self.max_suffix.get(key, 0), number)
+
+
+def list_names(directory: Path) -> set[str]:
+    """every name in directory, hidden ones included"""
+
+    try:
+        stats.count("listings")
+        return set(os.listdir(directory))
+    except FileNotFoundError:
+        return set()
+
+
+class CollisionIndex:
+    """
+    per-destination index of taken names, each directory is listed once
+    by lister, on its first collision, and the next free name is found
+    in O(1) from the highest suffix recorded for its stem
+    """
+
+    def __init__(self, lister: Callable[[Path], set[str]] = list_names):
+        self._lister = lister
+        self._dirs: dict[Path, _DirectoryNames] = {}
+        self._reserved: dict[Path, set[str]] = {}
+
+    def _names(self, directory: Path) -> _DirectoryNames:
+        if directory not in self._dirs:
+            names = self._lister(directory)
+            names |= self._reserved.pop(directory, set())
+            self._dirs[directory] = _DirectoryNames(names)
+        return self._dirs[directory]
+
+    def reserve(self, path: Path):
+        """record path as taken by a planned move"""
+
+        if path.parent in self._dirs:
+            self._dirs[path.parent].add(path.name)
+        else:
+            self._reserved.setdefault(path.parent, set()).add(path.name)
+
+    def free_name(self, path: Path, is_dir: bool = False) -> Path:
+        """the next 'name (n).ext' in path's directory that nothing has taken"""
+
+        names = self._names(path.parent)
+        stem, extension = split_name(path.name, is_dir)
+        number = names.max_suffix.get((stem, extension), 0) + 1
+        candidate = suffixed_name(path.name, number, is_dir)
+        # only reachable when a directory and a file split the same name differently
+        while candidate in names.names:
+            number += 1
+            candidate = suffixed_name(path.name, number, is_dir)
+        return path.with_name(candidate)
@@ -0,0 +1,141 @@
+"""Copy files across devices without bouncing data through userspace"""
+
+import errno
+import logging
+import os
+import shutil
+from pathlib import Path
+
+from app import stats
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger("Prod Logger")
+
+COPY_REFLINK = "reflink"
+COPY_FILE_RANGE = "copy_file_range"
+COPY_SENDFILE = "sendfile"
+COPY_USERSPACE = "userspace"
+
+# _IOW(0x94, 9, int) from linux/fs.h
+FICLONE = 0x40049409
+
+# errors meaning "this method is not available here", anything else is real
+_UNSUPPORTED_ERRNOS = {
+    errno.EBADF,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTSUP,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EXDEV,
+}
+
+_CHUNK_SIZE = 1 << 30
+
+
+def _unsupported(ose: OSError) -> bool:
+    return ose.errno in _UNSUPPORTED_ERRNOS
+
+
+def _reflink(source_fd: int, destination_fd: int) -> bool:
+    if fcntl is None:
+        return False
+
+    try:
+        fcntl.ioctl(destination_fd, FICLONE, source_fd)
+    except OSError as ose:
+        if _unsupported(ose):
+            return False
+        raise
+    return True
+
+
+def _copy_file_range(source_fd: int, destination_fd: int, size: int) -> bool:
+    if not hasattr(os, "copy_file_range"):
+        return False
+
+    offset = 0
+    try:
+        while offset < size:
+            copied = os.copy_file_range(
+                source_fd, destination_fd, min(_CHUNK_SIZE, size - offset), offset, offset
+            )
+            if copied == 0:
+                break
+            offset += copied
+    except OSError as ose:
+        if _unsupported(ose):
+            return False
+        raise
+    return offset == size
+
+
+def _sendfile(source_fd: int, destination_fd: int, size: int) -> bool:
+    if not hasattr(os, "sendfile"):
+        return False
+
+    offset = 0
+    try:
+        os.lseek(destination_fd, 0, os.SEEK_SET)
+        while offset < size:
+            sent = os.sendfile(
+                destination_fd, source_fd, offset, min(_CHUNK_SIZE, size - offset)
+            )
+            if sent == 0:
+                break
+            offset += sent
+    except OSError as ose:
+        if _unsupported(ose):
+            return False
+        raise
+    return offset == size
+
+
+def copy_file(source: Path, destination: Path) -> str:
+    """
+    copy the contents of source to destination, trying a reflink,
+    then copy_file_range, then sendfile and finally a userspace copy,
+    returns which of them did the work
+    """
+
+    with open(source, "rb") as source_file, open(destination, "wb") as dest_file:
+        source_fd = source_file.fileno()
+        destination_fd = dest_file.fileno()
+        size = os.fstat(source_fd).st_size
+
+        method = None
+        if _reflink(source_fd, destination_fd):
+            method = COPY_REFLINK
+        elif _copy_file_range(source_fd, destination_fd, size):
+            method = COPY_FILE_RANGE
+        else:
+            # start over in case a method failed after a partial copy
+            os.ftruncate(destination_fd, 0)
+            if _sendfile(source_fd, destination_fd, size):
+                method = COPY_SENDFILE
+            else:
+                os.ftruncate(destination_fd, 0)
+                dest_file.seek(0)
+                source_file.seek(0)
+                shutil.copyfileobj(source_file, dest_file)
+                method = COPY_USERSPACE
+
+    stats.count("copies")
+    stats.count("bytes_copied", size)
+    logger.debug("Copied %s to %s via %s", source, destination, method)
+    return method
+
+
+def copy2(source: str, destination: str) -> str:
+    """drop-in copy_function for shutil.move and shutil.copytree"""
+
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, os.path.basename(source))
+
+    copy_file(Path(source), Path(destination))
+    shutil.copystat(source, destination)
+    return destination
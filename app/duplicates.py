@@ -0,0 +1,171 @@
+"""Find byte-identical copies of incoming files in a destination directory"""
+
+import hashlib
+import os
+import stat
+from pathlib import Path
+
+from app import stats
+
+# what to do with a file whose identical copy already sits at the destination
+DUPLICATE_MOVE = "move"
+DUPLICATE_SKIP = "skip"
+DUPLICATE_REPLACE = "replace"
+DUPLICATE_HARDLINK = "hardlink"
+DUPLICATE_POLICIES = (
+    DUPLICATE_MOVE,
+    DUPLICATE_SKIP,
+    DUPLICATE_REPLACE,
+    DUPLICATE_HARDLINK,
+)
+
+PARTIAL_SIZE = 64 * 1024
+HASH_WORKERS = 4
+_CHUNK_SIZE = 1024 * 1024
+
+
+def partial_hash(path: Path) -> bytes:
+    """hash of the first and last PARTIAL_SIZE bytes of path"""
+
+    digest = hashlib.blake2b()
+    with open(path, "rb") as file:
+        digest.update(file.read(PARTIAL_SIZE))
+        size = os.fstat(file.fileno()).st_size
+        if size > PARTIAL_SIZE:
+            file.seek(max(PARTIAL_SIZE, size - PARTIAL_SIZE))
+            digest.update(file.read(PARTIAL_SIZE))
+    return digest.digest()
+
+
+def full_hash(path: Path) -> bytes:
+    """hash of all of path"""
+
+    digest = hashlib.blake2b()
+    with open(path, "rb") as file:
+        while chunk := file.read(_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _hash_all(
+    hash_function, paths: set[Path], max_workers: int
+) -> dict[Path, bytes | None]:
+    def safe_hash(path):
+        try:
+            return hash_function(path)
+        except OSError:
+            return None
+
+    # imported here so the policy constants stay cheap for the CLI to load
+    from concurrent.futures import ThreadPoolExecutor
+
+    ordered = list(paths)
+    stats.count("hashes", len(ordered))
+    # hashlib releases the GIL while hashing, so threads scale here
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(ordered)))) as pool:
+        return dict(zip(ordered, pool.map(safe_hash, ordered)))
+
+
+def list_candidates(destination_dir: Path) -> dict[Path, Path]:
+    """every non-hidden regular file in destination_dir, mapped to itself"""
+
+    candidates = {}
+    try:
+        stats.count("listings")
+        with os.scandir(destination_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_file(
+                    follow_symlinks=False
+                ):
+                    continue
+                candidates[Path(entry.path)] = Path(entry.path)
+    except OSError:
+        return {}
+    return candidates
+
+
+def find_duplicates(
+    sources: list[Path],
+    destination_dir: Path,
+    max_workers: int = HASH_WORKERS,
+    candidates: dict[Path, Path] | None = None,
+) -> dict[Path, Path]:
+    """
+    map each source to a byte-identical file in destination_dir,
+    candidates maps every file destination_dir will hold to where its
+    bytes are now (by default the files already in it), they are
+    narrowed by size, then by a hash of head and tail, and only the
+    survivors are hashed in full, empty files never match
+    """
+
+    if candidates is None:
+        candidates = list_candidates(destination_dir)
+
+    # keyed by where the bytes are, so a file arriving later is read at its source
+    destination_by_size: dict[int, list[Path]] = {}
+    located = {}
+    stats.count("stats", len(candidates))
+    for candidate, current in candidates.items():
+        try:
+            stat_result = os.lstat(current)
+        except OSError:
+            continue
+        if stat.S_ISREG(stat_result.st_mode) and stat_result.st_size:
+            destination_by_size.setdefault(stat_result.st_size, []).append(current)
+            located[current] = candidate
+
+    # stage 1: only files of equal size can be identical
+    sized: dict[Path, tuple[int, list[Path]]] = {}
+    stats.count("stats", len(sources))
+    for source in sources:
+        try:
+            size = os.stat(source).st_size
+        except OSError:
+            continue
+        if size in destination_by_size:
+            sized[source] = (size, destination_by_size[size])
+
+    if not sized:
+        return {}
+
+    # stage 2: head and tail, which is the whole file for small files
+    involved = set(sized)
+    for _, paths in sized.values():
+        involved.update(paths)
+    partial = _hash_all(partial_hash, involved, max_workers)
+
+    pairs: dict[Path, list[Path]] = {}
+    for source, (size, paths) in sized.items():
+        matches = [
+            path
+            for path in paths
+            if partial[source] is not None and partial[path] == partial[source]
+        ]
+        if matches:
+            pairs[source] = matches
+
+    # stage 3: full hash only where head and tail did not cover everything
+    needs_full = set()
+    for source, matches in pairs.items():
+        if sized[source][0] > 2 * PARTIAL_SIZE:
+            needs_full.add(source)
+            needs_full.update(matches)
+    full = _hash_all(full_hash, needs_full, max_workers) if needs_full else {}
+
+    duplicates = {}
+    for source, matches in pairs.items():
+        if source in needs_full:
+            matches = [
+                path
+                for path in matches
+                if full[source] is not None and full[path] == full[source]
+            ]
+        if not matches:
+            continue
+
+        # prefer the copy that already carries the incoming name
+        matches = [located[path] for path in matches]
+        same_name = [path for path in matches if path.name == source.name]
+        duplicates[source] = (same_name or matches)[0]
+
+    return duplicates
@@ -0,0 +1,133 @@
+"""Gitignore-style exclusion patterns compiled into a single matcher"""
+
+import logging
+import re
+from pathlib import Path
+
+from app.state import default_state_path
+
+logger = logging.getLogger("Prod Logger")
+
+
+def default_exclude_path(home: Path | None = None) -> Path:
+    """exclusion file next to the state file"""
+    return default_state_path(home).with_name("exclude")
+
+
+def _translate(glob: str) -> str:
+    """regex for a glob where * and ? stay within one path component"""
+
+    parts = []
+    index = 0
+    while index < len(glob):
+        char = glob[index]
+        if glob.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+            continue
+        if glob.startswith("**", index):
+            parts.append(".*")
+            index += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = glob.find("]", index + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = glob[index + 1 : end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                index = end
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    return "".join(parts)
+
+
+def pattern_regex(pattern: str) -> str | None:
+    """
+    regex matching what a gitignore-style pattern excludes, tested
+    against paths relative to home with a trailing / on directories,
+    None for blank lines and comments
+    """
+
+    pattern = pattern.strip()
+    if not pattern or pattern.startswith("#"):
+        return None
+    if pattern.startswith("!"):
+        logger.warning("Negated exclusion %s is not supported, ignoring", pattern)
+        return None
+
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    # like gitignore, a slash anywhere but the end anchors at home
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    regex = _translate(pattern)
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    return regex + ("/" if dir_only else "/?")
+
+
+class ExclusionMatcher:
+    """
+    every pattern compiled into one alternation, so testing an entry
+    costs a single regex match however many patterns there are
+    """
+
+    def __init__(self, home: Path, patterns: list[str] | tuple[str, ...] = ()):
+        self.home = home
+        self.patterns = tuple(patterns)
+        regexes = [
+            regex
+            for regex in (pattern_regex(pattern) for pattern in self.patterns)
+            if regex is not None
+        ]
+        self._regex = re.compile("|".join(f"(?:{regex})" for regex in regexes))
+        self._empty = not regexes
+
+    def __bool__(self) -> bool:
+        return not self._empty
+
+    def prefix(self, directory: Path) -> str:
+        """relative path of directory as entries inside it are tested"""
+
+        relative = directory.relative_to(self.home).as_posix()
+        return "" if relative == "." else relative + "/"
+
+    def excluded(self, relative: str, is_dir: bool) -> bool:
+        """whether the item at relative, a path below home, is excluded"""
+
+        if self._empty:
+            return False
+        if is_dir:
+            relative += "/"
+        return self._regex.fullmatch(relative) is not None
+
+    def excluded_path(self, path: Path, is_dir: bool) -> bool:
+        """whether path, or a directory between home and it, is excluded"""
+
+        if self._empty or not path.is_relative_to(self.home):
+            return False
+
+        parts = path.relative_to(self.home).parts
+        for depth in range(1, len(parts) + 1):
+            inner = depth < len(parts)
+            if self.excluded("/".join(parts[:depth]), inner or is_dir):
+                return True
+        return False
+
+
+def read_exclude_file(path: Path) -> list[str]:
+    """patterns in path, one per line, a missing file has none"""
+
+    try:
+        return path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return []
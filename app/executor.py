@@ -0,0 +1,288 @@
+"""Apply a planned list of moves"""
+
+import ctypes
+import errno
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from app import stats
+from app.copy_engine import copy2, copy_file
+from app.journal import MoveJournal
+from app.planner import ACTION_LINK, ACTION_REPLACE, MoveOp, MovePlan
+
+logger = logging.getLogger("Prod Logger")
+
+# concurrent cross-device copies allowed to touch a single device
+DEVICE_WORKERS = 2
+
+# from linux/fcntl.h and linux/fs.h
+AT_FDCWD = -100
+RENAME_NOREPLACE = 1
+
+# renameat2 errors meaning the kernel or filesystem cannot do it atomically
+_NOREPLACE_UNSUPPORTED = {errno.EINVAL, errno.ENOSYS, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+try:
+    _renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+except (AttributeError, OSError):  # not linux, or a libc without it
+    _renameat2 = None
+
+
+class _DeviceMap:
+    """st_dev of directories, each directory is stat'ed once"""
+
+    def __init__(self):
+        self._devices: dict[Path, int] = {}
+
+    def device(self, directory: Path) -> int:
+        if directory not in self._devices:
+            stats.count("stats")
+            self._devices[directory] = os.stat(directory).st_dev
+        return self._devices[directory]
+
+
+def _log_move(op: MoveOp, moved_path: Path):
+    # arguments only, never a listing of the destination: formatting is
+    # deferred until a handler accepts the record
+    if op.is_dir:
+        logger.info("Directory %s was moved to %s", op.source, moved_path)
+    else:
+        logger.info("File %s moved to %s", op.source, moved_path)
+
+
+def _resolve_duplicate(op: MoveOp) -> bool:
+    """
+    handle the identical copy op found at its destination,
+    True if that already completed op so nothing is left to move
+    """
+
+    if op.action == ACTION_LINK:
+        if op.destination != op.duplicate_of:
+            os.link(op.duplicate_of, op.destination)
+        os.unlink(op.source)
+        logger.info("File %s linked to %s", op.source, op.duplicate_of)
+        return True
+
+    if op.action == ACTION_REPLACE and op.destination != op.duplicate_of:
+        os.unlink(op.duplicate_of)
+        logger.info("Duplicate %s replaced by %s", op.duplicate_of, op.source)
+    return False
+
+
+def _rename_noreplace(source: Path, destination: Path):
+    """
+    rename source to destination, raising FileExistsError rather than
+    replacing anything already there, atomically through renameat2 and
+    otherwise with a check just before the rename
+    """
+
+    if _renameat2 is not None:
+        result = _renameat2(
+            AT_FDCWD,
+            os.fsencode(source),
+            AT_FDCWD,
+            os.fsencode(destination),
+            RENAME_NOREPLACE,
+        )
+        if result == 0:
+            return
+        err = ctypes.get_errno()
+        if err not in _NOREPLACE_UNSUPPORTED:
+            raise OSError(err, os.strerror(err), str(source), None, str(destination))
+
+    if os.path.lexists(destination):
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), str(destination))
+    os.rename(source, destination)
+
+
+def _replaces(op: MoveOp) -> bool:
+    """whether op is meant to take the place of the copy at its destination"""
+    return op.action == ACTION_REPLACE and op.destination == op.duplicate_of
+
+
+def _rename(op: MoveOp) -> bool:
+    """
+    move op with a single rename that never overwrites an item
+    appearing at the destination after planning,
+    False if source and destination turn out to be on different devices
+    """
+
+    try:
+        if _replaces(op):
+            os.rename(op.source, op.destination)
+        else:
+            _rename_noreplace(op.source, op.destination)
+    except OSError as ose:
+        if ose.errno == errno.EXDEV:
+            return False
+        raise
+
+    stats.count("renames")
+    _log_move(op, op.destination)
+    return True
+
+
+def _cross_device_move(op: MoveOp, sync: bool = False) -> tuple[Path, str | None]:
+    """
+    copy op to its destination and remove the source,
+    regular files report which copy path the engine took,
+    with sync the copy reaches the disk before the source is removed,
+    like _rename nothing already at the destination is overwritten
+    """
+
+    if op.source.is_symlink():
+        os.symlink(os.readlink(op.source), op.destination)
+        os.unlink(op.source)
+        return op.destination, None
+
+    if op.is_dir:
+        # copytree refuses an existing destination, shutil.move nests inside it
+        shutil.copytree(op.source, op.destination, symlinks=True, copy_function=copy2)
+        shutil.rmtree(op.source)
+        return op.destination, None
+
+    claimed = not _replaces(op)
+    if claimed:
+        # claim the name before copying into it
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL
+        os.close(os.open(op.destination, flags, 0o600))
+    try:
+        method = copy_file(op.source, op.destination)
+    except OSError:
+        if claimed:
+            os.unlink(op.destination)
+        raise
+    shutil.copystat(op.source, op.destination)
+    if sync:
+        stats.count("fsyncs")
+        fd = os.open(op.destination, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    os.unlink(op.source)
+    logger.info("File %s copied via %s", op.source, method)
+    return op.destination, method
+
+
+def _copy_move(
+    op: MoveOp, semaphores: list[threading.BoundedSemaphore], sync: bool = False
+) -> tuple[Path, str | None]:
+    """move op across devices while holding each device's semaphore"""
+
+    for semaphore in semaphores:
+        semaphore.acquire()
+    try:
+        logger.debug("Cross-device move of %s to %s", op.source, op.destination)
+        moved_path, method = _cross_device_move(op, sync)
+    finally:
+        for semaphore in reversed(semaphores):
+            semaphore.release()
+
+    _log_move(op, moved_path)
+    return moved_path, method
+
+
+def execute_op(op: MoveOp, sync: bool = False) -> Path:
+    """
+    apply a single move on the calling thread,
+    renaming when possible and copying across devices otherwise,
+    with sync a copy reaches the disk before its source is removed
+    """
+
+    if _resolve_duplicate(op) or _rename(op):
+        return op.destination
+
+    moved_path, _ = _cross_device_move(op, sync)
+    _log_move(op, moved_path)
+    return moved_path
+
+
+def execute_plan(
+    plan: MovePlan,
+    device_workers: int = DEVICE_WORKERS,
+    copy_report: dict[Path, str] | None = None,
+    journal: MoveJournal | None = None,
+) -> list[Path]:
+    """
+    apply every move in plan, plan should already have been checked
+    for conflicts, same-device moves are renamed inline while
+    cross-device moves are copied on worker pools grouped by
+    (source device, destination device) with at most device_workers
+    copies touching any one device at a time,
+    copy_report collects the copy path taken for each copied file,
+    journal records the whole plan as one durable batch, an op whose
+    duplicate is an earlier op's destination waits for that op's copy
+    """
+
+    devices = _DeviceMap()
+    moved_paths: dict[int, Path] = {}
+    pending: dict[int, Future] = {}
+    pending_destinations: dict[Path, Future] = {}
+    pools: dict[tuple[int, int], ThreadPoolExecutor] = {}
+    semaphores: dict[int, threading.BoundedSemaphore] = {}
+    sync = journal is not None
+
+    if journal is not None:
+        journal.begin(plan.ops)
+
+    try:
+        for index, op in enumerate(plan):
+            logger.debug("Source path in execute_plan: %s", op.source)
+            logger.debug("Destination path in execute_plan: %s", op.destination)
+            # an identical copy still being copied into place is waited for
+            arriving = pending_destinations.get(op.duplicate_of)
+            if arriving is not None:
+                wait([arriving])
+            if _resolve_duplicate(op):
+                moved_paths[index] = op.destination
+                continue
+
+            source_dev = devices.device(op.source.parent)
+            destination_dev = devices.device(op.destination.parent)
+
+            if source_dev == destination_dev and _rename(op):
+                moved_paths[index] = op.destination
+                continue
+
+            group = (source_dev, destination_dev)
+            if group not in pools:
+                pools[group] = ThreadPoolExecutor(
+                    max_workers=device_workers,
+                    thread_name_prefix=f"move-{source_dev}-{destination_dev}",
+                )
+            # acquired in device order so two groups never deadlock
+            group_semaphores = [
+                semaphores.setdefault(dev, threading.BoundedSemaphore(device_workers))
+                for dev in sorted(set(group))
+            ]
+            pending[index] = pools[group].submit(
+                _copy_move, op, group_semaphores, sync
+            )
+            pending_destinations[op.destination] = pending[index]
+
+    finally:
+        wait(pending.values())
+        for pool in pools.values():
+            pool.shutdown()
+
+        # whatever completed is made durable and recorded, even on failure
+        if journal is not None:
+            completed = set(moved_paths)
+            completed.update(
+                index
+                for index, future in pending.items()
+                if future.exception() is None
+            )
+            journal.commit([plan.ops[index] for index in sorted(completed)])
+
+    for index, future in pending.items():
+        moved_paths[index], method = future.result()
+        if method is not None and copy_report is not None:
+            copy_report[plan.ops[index].source] = method
+
+    return [moved_paths[index] for index in sorted(moved_paths)]
@@ -1,13 +1,42 @@
 """Organize Files into the Appropriate Locations"""
 
+import dataclasses
+import functools
+import itertools
 import logging
 import os
-import shutil
-import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 
+from app import stats
+from app.archives import (
+    ARCHIVE_READ_LIMIT,
+    ARCHIVE_SAMPLE,
+    classify_archives,
+    is_archive,
+)
+from app.collisions import COLLISION_RENAME
+from app.duplicates import (
+    DUPLICATE_MOVE,
+    DUPLICATE_REPLACE,
+    DUPLICATE_SKIP,
+    find_duplicates,
+)
+from app.listing import ListedEntry, list_non_hidden
+from app.exclusions import ExclusionMatcher
+from app.executor import DEVICE_WORKERS, execute_plan
+from app.journal import MoveJournal
+from app.planner import ACTION_LINK, ACTION_MOVE, ACTION_REPLACE, MoveOp, MovePlan
+from app.repos import RepoIndex
+from app.rules import DEFAULT_RULES, RuleDispatcher, compile_rules
+from app.snapshot import EntrySnapshot, HomeSnapshot
+from app.sniffing import MAGIC_SIGNATURES, is_partial_download, sniff_files
 from app.special_exceptions import EmptyDirectory
+from app.state import RunState, config_fingerprint
+from app.trash import Trash, TrashPolicy, default_trash_dir, format_size
+from app.traversal import DEFAULT_MAX_DEPTH, Traversal
 
 # uncomment logger for debugging
 # logger = logging.getLogger("Debug Logger")
@@ -18,6 +47,31 @@ from app.special_exceptions import EmptyDirectory
 # uncomment logger for production
 logger = logging.getLogger("Prod Logger")
 
+FUNNEL_DIR_EXT_MAP = {
+    "Documents": [".pdf", ".doc", ".docx", ".txt"],
+    "Pictures": [".png", ".jpg", ".jpeg", ".svg"],
+    "Music": [".wav", ".mp3", ".mp4", ".ogg"],
+    "Videos": [".mov", ".avi", ".wmv", ".flv", ".avchd"],
+    "3D Models": [".stl", ".3mf", ".obj", ".step", ".stp", ".fcstd", ".f3d"],
+}
+EXT_DIR_MAP = {
+    ext: directory
+    for directory, ext_list in FUNNEL_DIR_EXT_MAP.items()
+    for ext in ext_list
+}
+
+# compressed files listed by name when asking before trashing them
+PROMPT_FILES = 20
+
+# directories listed at once while taking a snapshot, raise it for
+# network and FUSE mounts where each listing and stat is a round trip
+SCAN_WORKERS = 1
+
+# compiled once, main runs every rule in one pass,
+# the single-rule dispatchers back the individual funnels
+DEFAULT_DISPATCHER = compile_rules(DEFAULT_RULES)
+FUNNEL_DISPATCHERS = {rule.name: compile_rules([rule]) for rule in DEFAULT_RULES}
+
 
 def get_non_hidden_dirs(directory: Path | None = None) -> list[str]:
     """get list of non-hidden directories"""
@@ -25,15 +79,8 @@ def get_non_hidden_dirs(directory: Path | None = None) -> list[str]:
     if directory is None:
         return []
 
-    approved_items = [
-        item for item in os.listdir(directory) if not item.startswith(".")
-    ]
-    approved_dirs = [item for item in approved_items if Path(directory, item).is_dir()]
+    approved_dirs = [entry.name for entry in list_non_hidden(directory) if entry.is_dir]
     logger.debug("Approved Directories in %s: %s", directory, approved_dirs)
-    actual_dirs = subprocess.run(
-        ["ls", directory], capture_output=True, text=True, check=True
-    )
-    logger.debug("Actual Directories in %s: %s", directory, actual_dirs.stdout)
     return approved_dirs
 
 
@@ -43,16 +90,235 @@ def get_non_hidden_files(directory: Path | None = None) -> list[str]:
     if directory is None:
         return []
 
-    approved_items = [
-        item for item in os.listdir(directory) if not item.startswith(".")
-    ]
     approved_files = [
-        file for file in approved_items if Path(directory, file).is_file()
+        entry.name for entry in list_non_hidden(directory) if entry.is_file
     ]
     logger.debug("Approved Files: %s", approved_files)
     return approved_files
 
 
+def list_entries(
+    directory_path: Path, exclusions: ExclusionMatcher | None = None
+) -> list[tuple[ListedEntry, bool]]:
+    """non-hidden entries of a directory, each with whether it is excluded"""
+
+    listed = list_non_hidden(directory_path)
+    if not exclusions:
+        return [(entry, False) for entry in listed]
+
+    prefix = exclusions.prefix(directory_path)
+    marked = []
+    for entry in listed:
+        excluded = exclusions.excluded(prefix + entry.name, entry.is_dir)
+        if excluded:
+            stats.count("excluded")
+        marked.append((entry, excluded))
+    return marked
+
+
+def entry_snapshot(
+    directory_path: Path,
+    entry: ListedEntry,
+    repos: RepoIndex | None = None,
+    excluded: bool = False,
+) -> EntrySnapshot | None:
+    """
+    snapshot entry for a listed item, probing a directory for .git
+    (through repos when given, which also tells whether a repository
+    is in use), an excluded item is kept only as a taken name and never
+    probed, None for anything neither a file nor a directory
+    """
+
+    if not entry.is_dir and not entry.is_file:
+        return None
+    if excluded:
+        return EntrySnapshot(
+            entry.name, entry.is_dir, excluded=True, is_symlink=entry.is_symlink
+        )
+    if entry.is_dir and repos is not None:
+        repo = repos.probe(directory_path / entry.name)
+        return EntrySnapshot(entry.name, True, *repo, is_symlink=entry.is_symlink)
+    if entry.is_dir:
+        stats.count("git_probes")
+        has_git = Path.exists(directory_path / entry.name / ".git")
+        return EntrySnapshot(entry.name, True, has_git, is_symlink=entry.is_symlink)
+    return EntrySnapshot(entry.name, False, is_symlink=entry.is_symlink)
+
+
+def snapshot_dir_entries(
+    directory_path: Path,
+    exclusions: ExclusionMatcher | None = None,
+    repos: RepoIndex | None = None,
+) -> list[EntrySnapshot]:
+    """
+    list a directory into snapshot entries, probing .git,
+    excluded entries are marked as such and excluded directories never
+    probed
+    """
+
+    entries = []
+    for entry, excluded in list_entries(directory_path, exclusions):
+        snapshot_entry = entry_snapshot(directory_path, entry, repos, excluded)
+        if snapshot_entry is not None:
+            entries.append(snapshot_entry)
+    return entries
+
+
+def take_home_snapshot(
+    home: Path,
+    state: RunState | None = None,
+    exclusions: ExclusionMatcher | None = None,
+    repos: RepoIndex | None = None,
+    scan_workers: int = SCAN_WORKERS,
+) -> HomeSnapshot:
+    """
+    list home and each of its top-level directories once,
+    recording names, types and .git presence and activity for the funnels,
+    directories unchanged since the run that saved state are not listed,
+    excluded ones are neither listed nor routed and excluded items
+    inside the others are recorded but not routed,
+    with several scan_workers the directories are listed concurrently and
+    then every .git probe is issued concurrently, so on a high-latency
+    mount the scan takes about as long as its slowest directory
+    """
+
+    if repos is None:
+        repos = RepoIndex()
+
+    directories = []
+    for directory in get_non_hidden_dirs(home):
+        if exclusions and exclusions.excluded(directory, True):
+            logger.debug("Excluding directory %s", directory)
+            stats.count("excluded")
+            continue
+        directories.append(directory)
+
+    def scan(directory: str) -> tuple[list, bool]:
+        directory_path = home / directory
+        if state is not None:
+            cached_entries = state.cached_dir(directory, directory_path)
+            if cached_entries is not None:
+                logger.debug("Reusing unchanged directory %s", directory)
+                return cached_entries, True
+        return list_entries(directory_path, exclusions), False
+
+    # a single worker scans in this thread, without handing items to a pool
+    pool = ThreadPoolExecutor(scan_workers) if scan_workers > 1 else nullcontext()
+    with pool:
+        mapper = map if scan_workers == 1 else pool.map
+        scanned = list(mapper(scan, directories))
+
+        # the probes of every directory go out as one batch
+        probes = [
+            (home / directory, entry, excluded)
+            for directory, (entries, cached) in zip(directories, scanned)
+            if not cached
+            for entry, excluded in entries
+        ]
+
+        def probe(item: tuple[Path, ListedEntry, bool]) -> EntrySnapshot | None:
+            directory_path, entry, excluded = item
+            return entry_snapshot(directory_path, entry, repos, excluded)
+
+        probed = iter(list(mapper(probe, probes)))
+
+    snapshot = HomeSnapshot(home)
+    for directory, (entries, cached) in zip(directories, scanned):
+        if cached:
+            snapshot.add_dir(directory, entries, cached=True)
+            continue
+        snapshot_entries = itertools.islice(probed, len(entries))
+        snapshot.add_dir(
+            directory, [entry for entry in snapshot_entries if entry is not None]
+        )
+
+    logger.debug("Home snapshot taken for %s", home)
+    return snapshot
+
+
+def take_dirs_snapshot(
+    home: Path,
+    directories: list[str],
+    exclusions: ExclusionMatcher | None = None,
+    repos: RepoIndex | None = None,
+) -> HomeSnapshot:
+    """
+    snapshot of only the given top-level directories,
+    for routing a few directories known to have changed,
+    excluded directories are left out and repositories probed
+    through repos so ones in use are deferred
+    """
+
+    if repos is None:
+        repos = RepoIndex()
+
+    snapshot = HomeSnapshot(home)
+    for directory in directories:
+        directory_path = home / directory
+        if directory.startswith(".") or not directory_path.is_dir():
+            continue
+        if exclusions and exclusions.excluded(directory, True):
+            stats.count("excluded")
+            continue
+        snapshot.add_dir(
+            directory, snapshot_dir_entries(directory_path, exclusions, repos)
+        )
+
+    return snapshot
+
+
+def run_config(
+    desktop_flag: bool,
+    duplicate_policy: str = DUPLICATE_MOVE,
+    exclusions: ExclusionMatcher | None = None,
+) -> str:
+    """fingerprint of the settings that decide where items are routed"""
+    return config_fingerprint(
+        desktop_flag,
+        duplicate_policy,
+        DEFAULT_RULES,
+        FUNNEL_DIR_EXT_MAP,
+        MAGIC_SIGNATURES,
+        ARCHIVE_SAMPLE,
+        ARCHIVE_READ_LIMIT,
+        exclusions.patterns if exclusions else (),
+    )
+
+
+def record_run_state(
+    home: Path, snapshot: HomeSnapshot, plan: MovePlan, state: RunState
+):
+    """
+    record every top-level directory as organized once plan has been
+    applied, cached directories the plan did not touch keep their record
+    and ones holding a deferred repository are left to be routed again
+    """
+
+    def top_dir(path: Path) -> str:
+        return path.relative_to(home).parts[0]
+
+    touched = {top_dir(op.source) for op in plan}
+    touched |= {top_dir(op.destination) for op in plan}
+    deferred = {top_dir(op.source) for op in plan.deferred}
+
+    for directory in snapshot.top_dirs():
+        if directory in deferred:
+            state.forget(directory)
+            continue
+        if directory in snapshot.cached and directory not in touched:
+            continue
+
+        # Downloads is routed by content too, so its files are watched
+        state.record_dir(
+            directory,
+            home / directory,
+            snapshot.entries(directory),
+            watch_files=directory == "Downloads",
+        )
+
+    state.forget_missing(snapshot.top_dirs())
+
+
 def create_required_dirs(dirs: list, home: Path):
     """
     create all required directories if they do not already exist
@@ -78,408 +344,590 @@ def create_required_dirs(dirs: list, home: Path):
         raise
 
 
-def research_dir_funnel(home: Path, desktop_flag: bool = False):
+def duplicate_candidates(plan: MovePlan, destination_dir: Path) -> dict[Path, Path]:
     """
-    move directories to Research directory
-    if they start with 'Learn', 'Study', or 'Test'
+    files destination_dir will hold once the moves already on plan are
+    applied, each mapped to where its bytes are now, read from the
+    plan's snapshot when it lists destination_dir and from disk otherwise,
+    files the plan's exclusions leave alone are never candidates
     """
 
-    try:
-        approved_home_dirs = get_non_hidden_dirs(home)
-        if approved_home_dirs == [] or len(approved_home_dirs) == 0:
-            raise EmptyDirectory(home, research_dir_funnel.__name__)
-
-        for directory in approved_home_dirs:
-            if directory == "Research":
-                continue
-
-            if not desktop_flag and directory == "Desktop":
-                continue
-
-            directory_path = home / directory
-            approved_sub_dirs = get_non_hidden_dirs(directory_path)
-            if approved_sub_dirs == []:
-                logger.debug("No subdirectories in %s", directory)
-                continue
-
-            for item in approved_sub_dirs:
-                has_git_file = Path.exists(home / directory / item / ".git")
-                is_research = (
-                    item.startswith("Learn")
-                    or item.startswith("Study")
-                    or item.startswith("Test")
-                )
-                is_research = is_research and has_git_file
-                if not is_research:
-                    continue
-
-                source_path = home / directory / item
-                destination_path = home / "Research"
+    snapshot = plan.snapshot
+    if snapshot is not None and snapshot.holds(destination_dir):
+        # kept up to date as moves are planned, sources out and targets in
+        names = snapshot.files(destination_dir.name)
+    else:
+        moved_out = {op.source for op in plan}
+        names = [
+            name
+            for name in get_non_hidden_files(destination_dir)
+            if destination_dir / name not in moved_out
+        ]
+        names += [
+            op.destination.name
+            for op in plan
+            if op.destination.parent == destination_dir and not op.is_dir
+        ]
+
+    exclusions = plan.exclusions
+    candidates = {}
+    for name in names:
+        path = destination_dir / name
+        # never linked to, let alone replaced
+        if exclusions and exclusions.excluded_path(path, False):
+            stats.count("excluded")
+            continue
+        candidates[path] = plan.source_of(path) or path
+    return candidates
+
+
+def resolve_duplicates(
+    plan: MovePlan, ops: list[MoveOp], duplicate_policy: str = DUPLICATE_MOVE
+) -> list[MoveOp]:
+    """
+    apply duplicate_policy to file ops whose bytes will already sit in
+    their destination directory once the moves planned so far are
+    applied, skipped ops are recorded on plan and dropped, the rest keep
+    their order
+    """
 
-                if not (destination_path / item).exists():
-                    logger.debug("Source path in research_dir_funnel: %s", source_path)
-                    logger.debug(
-                        "Destination path in research_dir_funnel: %s", destination_path
-                    )
-                    moved_dir_path = shutil.move(source_path, destination_path)
-                    logger.info(
-                        "Directory %s was moved to %s", source_path, moved_dir_path
-                    )
+    if duplicate_policy == DUPLICATE_MOVE:
+        return ops
 
-                else:
-                    raise FileExistsError(
-                        f"Cannot move {item} into {destination_path} because it already exists"
-                    )
+    sources_by_destination: dict[Path, list[Path]] = {}
+    for op in ops:
+        if not op.is_dir:
+            sources_by_destination.setdefault(op.destination.parent, []).append(
+                op.source
+            )
 
-    except EmptyDirectory as ed:
-        logger.error("EmptyDirectory in research_dir_funnel: %s", ed)
-        raise
+    duplicates: dict[Path, Path] = {}
+    for destination_dir, sources in sources_by_destination.items():
+        duplicates.update(
+            find_duplicates(
+                sources,
+                destination_dir,
+                candidates=duplicate_candidates(plan, destination_dir),
+            )
+        )
 
-    except FileExistsError as fee:
-        logger.error("FileExistsError in research_dir_funnel: %s", fee)
-        raise
+    resolved = []
+    replaced: set[Path] = set()
+    for op in ops:
+        existing = duplicates.get(op.source)
+        if existing is None:
+            resolved.append(op)
+            continue
+
+        logger.info("File %s is a duplicate of %s", op.source, existing)
+        if duplicate_policy == DUPLICATE_SKIP:
+            plan.skip(op)
+            continue
+
+        action = ACTION_LINK
+        if duplicate_policy == DUPLICATE_REPLACE:
+            # an existing copy can only be replaced once per run
+            action = ACTION_MOVE if existing in replaced else ACTION_REPLACE
+            replaced.add(existing)
+        if action == ACTION_MOVE:
+            resolved.append(op)
+        else:
+            resolved.append(
+                dataclasses.replace(op, action=action, duplicate_of=existing)
+            )
 
-    logger.debug("Function completed: research_dir_funnel")
-    logger.info("Research directory organized!")
+    return resolved
 
 
-def college_dir_funnel(home: Path, desktop_flag: bool = False):
+def plan_home(
+    home: Path,
+    dispatcher: RuleDispatcher,
+    desktop_flag: bool = False,
+    snapshot: HomeSnapshot | None = None,
+    plan: MovePlan | None = None,
+    func_name: str | None = None,
+    duplicate_policy: str = DUPLICATE_MOVE,
+    traversal: Traversal | None = None,
+) -> MovePlan:
     """
-    move directories to College directory
-    if they start with 'CS'
+    give every item below each top-level home directory, down to the
+    traversal's depth, a single routing decision and plan its move to
+    the destination of the rule it matched, a directory that is moved
+    is not looked inside, the snapshot is updated as if the planned
+    moves had happened, files already present at their destination
+    follow duplicate_policy
     """
 
+    func_name = func_name or plan_home.__name__
+
     try:
-        approved_home_dirs = get_non_hidden_dirs(home)
+        if snapshot is None:
+            snapshot = take_home_snapshot(home)
+        if plan is None:
+            plan = MovePlan(snapshot=snapshot)
+        if traversal is None:
+            traversal = Traversal(snapshot_dir_entries)
+
+        approved_home_dirs = snapshot.top_dirs()
         if approved_home_dirs == []:
-            raise EmptyDirectory(home, college_dir_funnel.__name__)
+            raise EmptyDirectory(home, func_name)
 
         for directory in approved_home_dirs:
-            if directory == "College":
+            if not desktop_flag and directory == "Desktop":
                 continue
 
-            if (not desktop_flag) and directory == "Desktop":
+            # unchanged since a run that left it fully organized,
+            # the saved state says nothing about deeper levels though
+            if directory in snapshot.cached and traversal.max_depth == 1:
                 continue
 
-            directory_path = home / directory
-            approved_sub_dirs = get_non_hidden_dirs(directory_path)
-            if approved_sub_dirs == []:
-                logger.debug("No subdirectories in %s", directory)
-                continue
+            ops = []
+            routed: dict[Path, EntrySnapshot] = {}
+
+            # moving away, or yet to arrive from an earlier directory
+            def is_planned(path: Path) -> bool:
+                return path in routed or plan.is_target(path)
 
-            for item in approved_sub_dirs:
-                is_college = item.startswith("CS")
-                if not is_college:
+            for parent, entry in traversal.walk(
+                home / directory, snapshot.entries(directory), stop=is_planned
+            ):
+                rule = dispatcher.route(directory, entry)
+                if rule is None:
                     continue
 
-                source_path = home / directory / item
-                destination_path = home / "College"
-                if not (destination_path / item).exists():
-                    logger.debug("Source path in college_dir_funnel: %s", source_path)
-                    logger.debug(
-                        "Destination path in college_dir_funnel: %s", destination_path
-                    )
-                    moved_dir_path = shutil.move(source_path, destination_path)
-                    logger.info(
-                        "Directory %s was move to %s", source_path, moved_dir_path
+                source = parent / entry.name
+                routed[source] = entry
+                destination = home / rule.destination / entry.name
+                op = MoveOp(source, destination, entry.is_dir, rule.name)
+                # never pull a repository out from under an open editor
+                if entry.active:
+                    logger.info("Deferring active repository %s", source)
+                    plan.defer(op)
+                    continue
+                ops.append(op)
+
+            for op in resolve_duplicates(plan, ops, duplicate_policy):
+                planned = plan.add(op)
+                if planned is None:
+                    continue
+                if op.source.parent == home / directory:
+                    snapshot.move(
+                        directory,
+                        op.source.name,
+                        planned.destination.parent.name,
+                        planned.destination.name,
                     )
                 else:
-                    raise FileExistsError(
-                        f"Cannot move {item} into {destination_path} because it already exists"
+                    snapshot.add(
+                        planned.destination.parent.name,
+                        dataclasses.replace(
+                            routed[op.source], name=planned.destination.name
+                        ),
                     )
 
     except EmptyDirectory as ed:
-        logger.error("EmptyDirectory in college_dir_funnel: %s", ed)
-        raise
-
-    except FileExistsError as fee:
-        logger.error("FileExistsError in college_dir_funnel: %s", fee)
+        logger.error("EmptyDirectory in %s: %s", func_name, ed)
         raise
 
-    logger.debug("Function completed: college_dir_funnel")
-    logger.info("College directory organized!")
+    logger.debug("Function completed: %s", func_name)
+    return plan
 
 
-def hackathon_dir_funnel(home: Path, desktop_flag: bool = False):
+def route_home(
+    home: Path,
+    dispatcher: RuleDispatcher,
+    desktop_flag: bool = False,
+    snapshot: HomeSnapshot | None = None,
+    func_name: str | None = None,
+    duplicate_policy: str = DUPLICATE_MOVE,
+):
     """
-    move directories to Hackathons directory
-    if they start with 'Hackathon'
+    plan the moves for dispatcher over home and apply them,
+    nothing moves if any planned move conflicts
     """
 
-    try:
-        approved_home_dirs = get_non_hidden_dirs(home)
-        if approved_home_dirs == []:
-            raise EmptyDirectory(home, hackathon_dir_funnel.__name__)
-
-        for directory in approved_home_dirs:
-            if directory == "Hackathons":
-                continue
-
-            if not desktop_flag and directory == "Desktop":
-                continue
+    func_name = func_name or route_home.__name__
+    with stats.span(func_name):
+        plan = plan_home(
+            home, dispatcher, desktop_flag, snapshot, None, func_name, duplicate_policy
+        )
+        apply_plan(plan, func_name)
 
-            directory_path = home / directory
-            approved_sub_dirs = get_non_hidden_dirs(directory_path)
-            if approved_sub_dirs == []:
-                logger.debug("No subdirectories in %s", directory)
-                continue
 
-            for item in approved_sub_dirs:
-                has_git_file = Path.exists(home / directory / item / ".git")
-                is_hackathon = item.startswith("Hackathon")
-                is_hackathon = is_hackathon and has_git_file
-                if not is_hackathon:
-                    continue
+def apply_plan(
+    plan: MovePlan,
+    func_name: str | None = None,
+    device_workers: int = DEVICE_WORKERS,
+    journal: MoveJournal | None = None,
+) -> list[Path]:
+    """
+    apply a complete plan,
+    nothing moves if any planned move conflicts
+    """
 
-                source_path = home / directory / item
-                destination_path = home / "Hackathons"
+    func_name = func_name or apply_plan.__name__
 
-                if not (destination_path / item).exists():
-                    logger.debug("Source path in hackathon_dir_funnel: %s", source_path)
-                    logger.debug(
-                        "Destination path in hackathon_dir_funnel: %s", destination_path
-                    )
-                    moved_dir_path = shutil.move(source_path, destination_path)
-                    logger.info(
-                        "Directory %s was move to %s", source_path, moved_dir_path
-                    )
-                else:
-                    raise FileExistsError(
-                        f"Cannot move {item} into {destination_path} because it already exists"
-                    )
+    try:
+        plan.check()
+        return execute_plan(plan, device_workers, journal=journal)
 
-    except EmptyDirectory as ed:
-        logger.error("EmptyDirectory in hackathon_dir_funnel: %s", ed)
+    except FileExistsError as fee:
+        logger.error("FileExistsError in %s: %s", func_name, fee)
         raise
 
-    except FileExistsError as fee:
-        logger.error("FileExistsError in hackathon_dir_funnel: %s", fee)
+    except OSError as ose:
+        logger.error("OSError in %s: %s", func_name, ose)
         raise
 
-    logger.debug("Function completed: hackathon_dir_funnel")
-    logger.info("Hackathon directory organized!")
+
+def organize_home(
+    home: Path, desktop_flag: bool = False, snapshot: HomeSnapshot | None = None
+):
+    """
+    run every default rule over home in a single pass,
+    rule priority decides which funnel an item ends up in
+    """
+
+    route_home(home, DEFAULT_DISPATCHER, desktop_flag, snapshot)
+    logger.info("Home directory organized!")
 
 
-def projects_dir_funnel(home: Path, desktop_flag: bool = False):
+def research_dir_funnel(
+    home: Path, desktop_flag: bool = False, snapshot: HomeSnapshot | None = None
+):
     """
-    move directories to Projects
-    if they contain a .git file
-    and not already in Research
+    move directories to Research directory
+    if they start with 'Learn', 'Study', or 'Test'
     """
 
-    try:
-        approved_home_dirs = get_non_hidden_dirs(home)
-        if approved_home_dirs == []:
-            raise EmptyDirectory(home, projects_dir_funnel.__name__)
+    route_home(
+        home,
+        FUNNEL_DISPATCHERS["research"],
+        desktop_flag,
+        snapshot,
+        research_dir_funnel.__name__,
+    )
+    logger.info("Research directory organized!")
 
-        for directory in approved_home_dirs:
-            if directory == "Projects":
-                continue
 
-            if directory == "Research":
-                continue
+def college_dir_funnel(
+    home: Path, desktop_flag: bool = False, snapshot: HomeSnapshot | None = None
+):
+    """
+    move directories to College directory
+    if they start with 'CS'
+    """
 
-            if not desktop_flag and directory == "Desktop":
-                continue
+    route_home(
+        home,
+        FUNNEL_DISPATCHERS["college"],
+        desktop_flag,
+        snapshot,
+        college_dir_funnel.__name__,
+    )
+    logger.info("College directory organized!")
 
-            directory_path = home / directory
-            approved_sub_dirs = get_non_hidden_dirs(directory_path)
-            if approved_sub_dirs == []:
-                logger.debug("No subdirectories in %s", directory)
-                continue
 
-            for item in approved_sub_dirs:
-                has_git_file = Path.exists(home / directory / item / ".git")
-                if not has_git_file:
-                    continue
+def hackathon_dir_funnel(
+    home: Path, desktop_flag: bool = False, snapshot: HomeSnapshot | None = None
+):
+    """
+    move directories to Hackathons directory
+    if they start with 'Hackathon'
+    """
 
-                source_path = home / directory / item
-                destination_path = home / "Projects"
-                if not (destination_path / item).exists():
-                    logger.debug("Source path in projects_dir_funnel: %s", source_path)
-                    logger.debug(
-                        "Destination path in projects_dir_funnel: %s", destination_path
-                    )
-                    moved_dir_path = shutil.move(source_path, destination_path)
-                    logger.info(
-                        "Directory %s was moved to %s", source_path, moved_dir_path
-                    )
-                else:
-                    raise FileExistsError(
-                        f"Cannot move {item} into {destination_path} because it already exists"
-                    )
+    route_home(
+        home,
+        FUNNEL_DISPATCHERS["hackathon"],
+        desktop_flag,
+        snapshot,
+        hackathon_dir_funnel.__name__,
+    )
+    logger.info("Hackathon directory organized!")
 
-    except EmptyDirectory as ed:
-        logger.error("EmptyDirectory in projects_dir_funnel: %s", ed)
-        raise
 
-    except FileExistsError as fee:
-        logger.error("FileExistsError in projects_dir_funnel: %s", fee)
-        raise
+def projects_dir_funnel(
+    home: Path, desktop_flag: bool = False, snapshot: HomeSnapshot | None = None
+):
+    """
+    move directories to Projects
+    if they contain a .git file
+    and not already in Research
+    """
 
-    logger.debug("Function completed: projects_dir_funnel")
+    route_home(
+        home,
+        FUNNEL_DISPATCHERS["projects"],
+        desktop_flag,
+        snapshot,
+        projects_dir_funnel.__name__,
+    )
     logger.info("Projects directory organized!")
 
 
-def backups_dir_funnel(home: Path, desktop_flag: bool = False):
+def backups_dir_funnel(
+    home: Path,
+    desktop_flag: bool = False,
+    snapshot: HomeSnapshot | None = None,
+    duplicate_policy: str = DUPLICATE_MOVE,
+):
     """
     move files to Backups
     if they contain 'key', 'backup', or 'recovery' in the filename
     """
 
+    route_home(
+        home,
+        FUNNEL_DISPATCHERS["backups"],
+        desktop_flag,
+        snapshot,
+        backups_dir_funnel.__name__,
+        duplicate_policy,
+    )
+    logger.info("Backups directory organized!")
+
+
+def plan_downloads(
+    home: Path,
+    snapshot: HomeSnapshot | None = None,
+    plan: MovePlan | None = None,
+    duplicate_policy: str = DUPLICATE_MOVE,
+) -> MovePlan:
+    """
+    plan moving Downloads files to other directories
+    based on their file extension, archives by what they hold,
+    falling back to their content when the extension is unknown,
+    files already present at their destination follow duplicate_policy
+    """
+
+    if plan is None:
+        plan = MovePlan(snapshot=snapshot)
+
     try:
-        approved_home_dirs = get_non_hidden_dirs(home)
-        if approved_home_dirs == []:
-            raise EmptyDirectory(home, backups_dir_funnel.__name__)
+        # funnel remaining files into Documents, Pictures, Music, Videos
+        downloads_path = home / "Downloads"
+        if snapshot is None:
+            downloads_files = get_non_hidden_files(downloads_path)
+        else:
+            downloads_files = snapshot.files("Downloads")
+        if downloads_files == []:
+            raise EmptyDirectory(downloads_path, cleanup_downloads_dir.__name__)
 
-        for directory in approved_home_dirs:
-            if (not desktop_flag) and directory == "Desktop":
-                continue
+        if snapshot is not None and "Downloads" in snapshot.cached:
+            logger.debug("Downloads unchanged since it was last organized")
+            return plan
 
-            if directory == "Backups":
+        # suffix lookup is the zero-I/O fast path, archives are routed
+        # by the names of their members and only files neither can
+        # route get their header sniffed
+        routed_files = []
+        archive_files = []
+        unrouted_files = []
+        for file in downloads_files:
+            # left in place by an earlier duplicate skip
+            if plan.is_skipped(downloads_path / file):
                 continue
-
-            directory_path = home / directory
-            approved_files = get_non_hidden_files(directory_path)
-            backup_files = [
-                file
-                for file in approved_files
-                if "backup" in file or "recovery" in file or "key" in file
-            ]
-            logger.info("Backup files to be moved: %s", backup_files)
-
-            if backup_files == []:
-                logger.debug("No backup files in %s", directory)
+            # moving it would break the browser's final rename
+            if is_partial_download(file):
+                logger.debug("Leaving partial download %s", file)
                 continue
+            directory = EXT_DIR_MAP.get(Path(file).suffix.lower())
+            if directory is not None:
+                routed_files.append((file, directory))
+            elif is_archive(file):
+                archive_files.append(downloads_path / file)
+            else:
+                unrouted_files.append(downloads_path / file)
 
-            for file in backup_files:
-                source_path = home / directory / file
-                destination_path = home / "Backups"
-                logger.debug("Source path in backups_dir_funnel: %s", source_path)
-                logger.debug(
-                    "Destination path in backups_dir_funnel: %s", destination_path
-                )
-                shutil.move(source_path, destination_path)
-                logger.info("File %s moved to %s", source_path, destination_path)
-                logger.debug(
-                    f"Current Backups directory: {get_non_hidden_files(destination_path)}"
+        for file_path, directory in classify_archives(
+            archive_files, EXT_DIR_MAP
+        ).items():
+            if directory is None:
+                unrouted_files.append(file_path)
+            else:
+                logger.debug("Archive %s holds %s content", file_path, directory)
+                routed_files.append((file_path.name, directory))
+
+        for file_path, directory in sniff_files(unrouted_files).items():
+            if directory is not None:
+                logger.debug("Sniffed %s as %s content", file_path, directory)
+                routed_files.append((file_path.name, directory))
+
+        ops = [
+            MoveOp(downloads_path / file, home / directory / file, False, "downloads")
+            for file, directory in routed_files
+        ]
+        for op in resolve_duplicates(plan, ops, duplicate_policy):
+            planned = plan.add(op)
+            if planned is not None and snapshot is not None:
+                snapshot.move(
+                    "Downloads",
+                    op.source.name,
+                    planned.destination.parent.name,
+                    planned.destination.name,
                 )
 
     except EmptyDirectory as ed:
-        logger.error("EmptyDirectory in backups_dir_funnel: %s", ed)
+        logger.error("EmptyDirectory in cleanup_downloads_dir: %s", ed)
         raise
 
-    except FileExistsError as fee:
-        logger.error("FileExistsError in backups_dir_funnel: %s", fee)
-        raise
+    logger.debug("Function completed: plan_downloads")
+    return plan
 
-    except OSError as ose:
-        logger.error("OSError in backups_dir_funnel: %s", ose)
-        raise
 
-    logger.debug("Function completed: backups_dir_funnel")
-    logger.info("Backups directory organized!")
+def plan_run(
+    home: Path,
+    desktop_flag: bool = False,
+    snapshot: HomeSnapshot | None = None,
+    duplicate_policy: str = DUPLICATE_MOVE,
+    collision_policy: str = COLLISION_RENAME,
+    max_depth: int = DEFAULT_MAX_DEPTH,
+    exclusions: ExclusionMatcher | None = None,
+    repos: RepoIndex | None = None,
+) -> MovePlan:
+    """
+    plan every move of a full run, home rules first then Downloads,
+    without touching the disk, home rules look max_depth levels below
+    each top-level directory and never inside excluded ones,
+    repositories in use are deferred rather than moved
+    """
 
+    if repos is None:
+        repos = RepoIndex()
+    if snapshot is None:
+        snapshot = take_home_snapshot(home, exclusions=exclusions, repos=repos)
 
-def cleanup_downloads_dir(home: Path):
+    lister = functools.partial(
+        snapshot_dir_entries, exclusions=exclusions, repos=repos
+    )
+    traversal = Traversal(lister, max_depth, repos=repos)
+    with stats.span(plan_home.__name__):
+        plan = plan_home(
+            home,
+            DEFAULT_DISPATCHER,
+            desktop_flag,
+            snapshot,
+            MovePlan(collision_policy, snapshot, exclusions),
+            duplicate_policy=duplicate_policy,
+            traversal=traversal,
+        )
+    logger.info(
+        "Visited %d entries, pruned %d subtrees", traversal.visited, traversal.pruned
+    )
+    # an empty Downloads must not stop the rest of home being organized
+    if snapshot.files("Downloads"):
+        with stats.span(plan_downloads.__name__):
+            plan_downloads(home, snapshot, plan, duplicate_policy)
+    else:
+        logger.info("Nothing to clean up in Downloads")
+    return plan
+
+
+def cleanup_downloads_dir(
+    home: Path,
+    snapshot: HomeSnapshot | None = None,
+    duplicate_policy: str = DUPLICATE_MOVE,
+):
     """
     clean up Downloads directory by moving files
-    based on their file extension to other directories
+    based on their file extension to other directories,
+    falling back to their content when the extension is unknown
     """
 
-    try:
-        # funnel remaining files into Documents, Pictures, Music, Videos
-        downloads_path = home / "Downloads"
-        downloads_files = get_non_hidden_files(downloads_path)
-        if downloads_files == []:
-            raise EmptyDirectory(downloads_path, cleanup_downloads_dir.__name__)
-
-        funnel_dir_ext_map = {
-            "Documents": [".pdf", ".doc", ".docx", ".txt"],
-            "Pictures": [".png", ".jpg", ".jpeg", ".svg"],
-            "Music": [".wav", ".mp3", ".mp4", ".ogg"],
-            "Videos": [".mov", ".avi", ".wmv", ".flv", ".avchd"],
-            "3D Models": [".stl", ".3mf", ".obj", ".step", ".stp", ".fcstd", ".f3d"],
-        }
+    with stats.span(cleanup_downloads_dir.__name__):
+        plan = plan_downloads(home, snapshot, None, duplicate_policy)
+        apply_plan(plan, cleanup_downloads_dir.__name__)
 
-        for file in downloads_files:
-            file_ext = Path(file).suffix
-            for directory, ext_list in funnel_dir_ext_map.items():
-                if file_ext in ext_list:
-                    source_path = home / "Downloads" / file
-                    destination_path = home / directory
-                    logger.debug(
-                        "Source path in cleanup_downloads_dir: %s", source_path
-                    )
-                    logger.debug(
-                        "Destination path in cleanup_downloads_dir: %s",
-                        destination_path,
-                    )
-                    shutil.move(source_path, destination_path)
-                    logger.info("File %s moved to %s", source_path, destination_path)
+    logger.debug("Function completed: cleanup_downloads_dir")
+    logger.info("Downloads directory cleaned up!")
 
-                    break
 
-    except EmptyDirectory as ed:
-        logger.error("EmptyDirectory in cleanup_downloads_dir: %s", ed)
-        raise
+def plan_trash(
+    home: Path,
+    plan: MovePlan,
+    policy: TrashPolicy | None = None,
+    exclusions: ExclusionMatcher | None = None,
+) -> MovePlan:
+    """
+    record on plan the compressed files del_zip_files would trash once
+    plan has been applied, for a dry run, files plan moves out of
+    Downloads first are left out
+    """
 
-    except FileExistsError as fee:
-        logger.error("FileExistsError in cleanup_downloads_dir: %s", fee)
-        raise
+    downloads_path = home / "Downloads"
+    if not downloads_path.is_dir():
+        return plan
 
-    except OSError as ose:
-        logger.error("OSError in cleanup_downloads_dir: %s", ose)
-        raise
+    policy = policy or TrashPolicy()
+    moved = {op.source for op in plan}
+    zip_files, _ = policy.select(downloads_path, exclusions)
+    for file, size in zip_files:
+        if downloads_path / file not in moved:
+            plan.trash(downloads_path / file, size)
+    return plan
 
-    logger.debug("Function completed: cleanup_downloads_dir")
-    logger.info("Downloads directory cleaned up!")
 
+def confirm_trash(zip_files: list[tuple[str, int]]) -> bool:
+    """ask before trashing, listing a bounded number of the files"""
 
-def del_zip_files(home: Path, del_flag: bool = False):
+    lines = [
+        f"  {file} ({format_size(size)})" for file, size in zip_files[:PROMPT_FILES]
+    ]
+    if len(zip_files) > PROMPT_FILES:
+        lines.append(f"  ... and {len(zip_files) - PROMPT_FILES} more")
+    total = format_size(sum(size for _, size in zip_files))
+    is_sure = input(
+        f"Are you sure you want to trash these {len(zip_files)} compressed files "
+        f"({total})? (y/n)\n" + "\n".join(lines) + "\n"
+    )
+    return is_sure in ("y", "Y")
+
+
+def del_zip_files(
+    home: Path,
+    del_flag: bool = False,
+    snapshot: HomeSnapshot | None = None,
+    policy: TrashPolicy | None = None,
+    assume_yes: bool = False,
+    trash: Trash | None = None,
+    exclusions: ExclusionMatcher | None = None,
+):
     """
-    if delete flag is True, delete the zip files in Downloads
+    if delete flag is True, move the compressed files in Downloads that
+    policy selects (every archive by default) and exclusions leave in
+    play to the trash, asking first unless assume_yes is set,
+    an empty or missing Downloads simply has nothing to trash
     """
 
     if del_flag:
         try:
             downloads_path = home / "Downloads"
-            downloads_files = get_non_hidden_files(downloads_path)
-            if downloads_files == []:
-                raise EmptyDirectory(downloads_path, del_zip_files.__name__)
-
-            def is_zip_file(file):
-                if ".zip" in file:
-                    return True
-                if ".deb" in file:
-                    return True
-                if ".tar.gz" in file:
-                    return True
-                if ".tar.bz2" in file:
-                    return True
-                if ".tar.xz" in file:
-                    return True
-                return False
-
-            zip_files = list(filter(is_zip_file, downloads_files))
-            is_sure = input(
-                f"Are you sure you want to delete these zip files? (y/n)\n{zip_files}"
-            )
-
-            if is_sure in ("y", "Y"):
-                for file in zip_files:
-                    os.remove(downloads_path / file)
-                    logger.info("File: %s removed", file)
-
-            else:
+            # the run that just organized home has often emptied it
+            if not downloads_path.is_dir():
+                logger.info("Nothing to trash, %s does not exist", downloads_path)
+                return
+            policy = policy or TrashPolicy()
+            zip_files, has_files = policy.select(downloads_path, exclusions)
+            if not has_files:
+                logger.info("Nothing to trash, %s is empty", downloads_path)
+                return
+
+            if not zip_files:
+                logger.info("No compressed files to trash")
+                return
+
+            if not assume_yes and not confirm_trash(zip_files):
                 sys.exit(1)
 
-        except EmptyDirectory as ed:
-            logger.error("Empty directory in del_zip_files: %s", ed)
-            raise
+            trash = trash or Trash(default_trash_dir(home))
+            for file, _ in zip_files:
+                trash.trash(downloads_path / file)
+                if snapshot is not None:
+                    snapshot.remove("Downloads", file)
+                logger.info("File: %s trashed", file)
 
         except OSError as oe:
             logger.error("Deletion Issue, OSError: %s", oe)
             raise
 
-        logger.info("Compressed files deleted!")
+        logger.info("Compressed files trashed!")
@@ -0,0 +1,221 @@
+"""Append-only journal of applied moves, for crash recovery and undo"""
+
+import errno
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+from app import stats
+from app.planner import ACTION_LINK, ACTION_MOVE, ACTION_REPLACE, MoveOp
+from app.state import default_state_path
+
+logger = logging.getLogger("Prod Logger")
+
+
+def default_journal_path(home: Path | None = None) -> Path:
+    """journal file next to the state file"""
+    return default_state_path(home).with_name("journal.jsonl")
+
+
+def sync_directories(directories: set[Path]):
+    """fsync each directory once so renames into and out of it are durable"""
+
+    for directory in sorted(directories):
+        try:
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        except FileNotFoundError:
+            continue
+        try:
+            stats.count("fsyncs")
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _op_record(op: MoveOp) -> dict:
+    return {
+        "source": str(op.source),
+        "destination": str(op.destination),
+        "is_dir": op.is_dir,
+        "reason": op.reason,
+        "action": op.action,
+        "duplicate_of": None if op.duplicate_of is None else str(op.duplicate_of),
+    }
+
+
+def _record_op(record: dict) -> MoveOp:
+    duplicate_of = record.get("duplicate_of")
+    return MoveOp(
+        Path(record["source"]),
+        Path(record["destination"]),
+        record["is_dir"],
+        record["reason"],
+        record.get("action", ACTION_MOVE),
+        None if duplicate_of is None else Path(duplicate_of),
+    )
+
+
+def _append_records(path: Path, records: list[dict]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as file:
+        for record in records:
+            file.write(json.dumps(record) + "\n")
+        file.flush()
+        stats.count("fsyncs")
+        os.fsync(file.fileno())
+
+
+class MoveJournal:
+    """
+    JSON lines journal of one run, every move of a batch is recorded
+    as begun before any of them happens and as done once the batch's
+    directories have been fsynced, so the journal and each directory
+    are synced once per batch rather than once per move
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.run = time.time_ns()
+        self._ids: dict[MoveOp, int] = {}
+        self._next_id = 0
+
+    def begin(self, ops: list[MoveOp]):
+        """durably record ops as about to be applied"""
+
+        if not ops:
+            return
+
+        records = []
+        if not self._ids:
+            records.append({"event": "run", "run": self.run})
+        for op in ops:
+            self._ids[op] = self._next_id
+            records.append(
+                {"event": "begin", "run": self.run, "id": self._next_id}
+                | _op_record(op)
+            )
+            self._next_id += 1
+        _append_records(self.path, records)
+
+    def commit(self, ops: list[MoveOp]):
+        """make the applied ops durable and record them as done"""
+
+        if not ops:
+            return
+
+        directories = set()
+        for op in ops:
+            directories.add(op.source.parent)
+            directories.add(op.destination.parent)
+        sync_directories(directories)
+
+        _append_records(
+            self.path,
+            [{"event": "done", "run": self.run, "id": self._ids[op]} for op in ops],
+        )
+
+
+def read_journal(path: Path) -> list[dict]:
+    """records in path, a line torn by a crash mid-write is ignored"""
+
+    records = []
+    try:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.debug("Ignoring torn journal line in %s", path)
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def _restore(source: Path, destination: Path):
+    """put destination's bytes back at source without removing destination"""
+
+    try:
+        os.link(destination, source)
+    except OSError as ose:
+        if ose.errno != errno.EXDEV:
+            raise
+        shutil.copy2(destination, source)
+
+
+def _was_applied(op: MoveOp) -> bool:
+    """whether op happened and nothing has taken its source's place since"""
+    return not op.source.exists() and op.destination.exists()
+
+
+def _undo_op(op: MoveOp) -> bool:
+    """reverse a single applied op, False if it never happened"""
+
+    if not _was_applied(op):
+        return False
+
+    if op.action == ACTION_MOVE:
+        shutil.move(op.destination, op.source)
+    elif op.action == ACTION_LINK:
+        _restore(op.source, op.destination)
+        if op.destination != op.duplicate_of:
+            os.unlink(op.destination)
+    elif op.action == ACTION_REPLACE:
+        # the replaced copy held the same bytes, so bring it back too
+        _restore(op.source, op.destination)
+        if op.destination != op.duplicate_of:
+            os.rename(op.destination, op.duplicate_of)
+
+    logger.info("Moved %s back to %s", op.destination, op.source)
+    return True
+
+
+def undo_last_run(path: Path, dry_run: bool = False) -> list[MoveOp]:
+    """
+    replay the most recent run in path in reverse, moves begun but
+    never recorded as done (the process died) are undone if they
+    happened, returns the ops that were undone, or with dry_run the
+    ops that would be, leaving the disk and journal untouched
+    """
+
+    records = read_journal(path)
+    undone_runs = {record["run"] for record in records if record["event"] == "undone"}
+    runs = [
+        record["run"]
+        for record in records
+        if record["event"] == "run" and record["run"] not in undone_runs
+    ]
+    if not runs:
+        logger.info("Nothing to undo in %s", path)
+        return []
+
+    run = runs[-1]
+    begun = [
+        _record_op(record)
+        for record in records
+        if record["event"] == "begin" and record["run"] == run
+    ]
+
+    if dry_run:
+        return [op for op in reversed(begun) if _was_applied(op)]
+
+    undone = []
+    try:
+        for op in reversed(begun):
+            if _undo_op(op):
+                undone.append(op)
+    except OSError as ose:
+        logger.error("OSError in undo_last_run: %s", ose)
+        raise
+
+    finally:
+        directories = set()
+        for op in undone:
+            directories.add(op.source.parent)
+            directories.add(op.destination.parent)
+        sync_directories(directories)
+
+    _append_records(path, [{"event": "undone", "run": run}])
+    return undone
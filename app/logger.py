@@ -0,0 +1,45 @@
+"""Production logging written from a background thread"""
+
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+
+PROD_LOGGER = "Prod Logger"
+
+
+def start_queue_logging(
+    logger: logging.Logger, handlers: list[logging.Handler]
+) -> QueueListener:
+    """
+    replace logger's handlers with a QueueHandler so callers only
+    enqueue records, handlers write them on the listener's thread,
+    stop the returned listener to flush what is still queued
+    """
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(records))
+
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def setup_prod_logging(verbose: bool, log_path: Path | None = None) -> QueueListener:
+    """
+    log messages to stdout, or to log_path when given, through a queue,
+    INFO and above with verbose and only errors otherwise
+    """
+
+    if log_path is None:
+        handler: logging.Handler = logging.StreamHandler(sys.stdout)
+    else:
+        handler = logging.FileHandler(log_path, mode="w", encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    logger = logging.getLogger(PROD_LOGGER)
+    logger.setLevel(logging.INFO if verbose else logging.ERROR)
+    return start_queue_logging(logger, [handler])
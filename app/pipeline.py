@@ -0,0 +1,244 @@
+"""asyncio pipeline overlapping the scan, classify and move stages"""
+
+import asyncio
+import logging
+from pathlib import Path
+
+from app import file_organizer as fo
+from app.archives import classify_archives, is_archive
+from app.collisions import COLLISION_RENAME
+from app.exclusions import ExclusionMatcher
+from app.executor import execute_op
+from app.journal import MoveJournal
+from app.planner import MoveOp, MovePlan
+from app.repos import RepoIndex
+from app.rules import RuleDispatcher
+from app.sniffing import is_partial_download, sniff_files
+from app.special_exceptions import EmptyDirectory
+
+logger = logging.getLogger("Prod Logger")
+
+# bounded so a fast stage waits for a slow one instead of piling up work
+SCAN_QUEUE_SIZE = 4
+MOVE_QUEUE_SIZE = 64
+
+
+async def _scan(
+    home: Path,
+    desktop_flag: bool,
+    scan_queue: asyncio.Queue,
+    exclusions: ExclusionMatcher | None = None,
+    repos: RepoIndex | None = None,
+):
+    """
+    list each top-level directory that is not excluded off the event
+    loop, probing repositories through repos
+    """
+
+    loop = asyncio.get_running_loop()
+    try:
+        top_dirs = await loop.run_in_executor(None, fo.get_non_hidden_dirs, home)
+        if top_dirs == []:
+            raise EmptyDirectory(home, run_pipeline.__name__)
+
+        for directory in top_dirs:
+            if not desktop_flag and directory == "Desktop":
+                continue
+            if exclusions and exclusions.excluded(directory, True):
+                continue
+
+            entries = await loop.run_in_executor(
+                None, fo.snapshot_dir_entries, home / directory, exclusions, repos
+            )
+            await scan_queue.put((directory, entries))
+    finally:
+        await scan_queue.put(None)
+
+
+async def _classify(
+    home: Path,
+    dispatcher: RuleDispatcher,
+    scan_queue: asyncio.Queue,
+    move_queue: asyncio.Queue,
+    plan: MovePlan,
+):
+    """
+    route scanned entries like plan_run does, home rules first and
+    the Downloads extension map, archive members and then content
+    sniffing for the rest, repositories in use are deferred on plan
+    """
+
+    loop = asyncio.get_running_loop()
+    try:
+        while (scanned := await scan_queue.get()) is not None:
+            directory, entries = scanned
+            archive_files = []
+            unrouted_files = []
+
+            for entry in entries:
+                if entry.excluded:
+                    continue
+                rule = dispatcher.route(directory, entry)
+                if rule is not None:
+                    op = MoveOp(
+                        home / directory / entry.name,
+                        home / rule.destination / entry.name,
+                        entry.is_dir,
+                        rule.name,
+                    )
+                    # never pull a repository out from under an open editor
+                    if entry.active:
+                        logger.info("Deferring active repository %s", op.source)
+                        plan.defer(op)
+                    else:
+                        await move_queue.put(op)
+                    continue
+
+                if directory != "Downloads" or entry.is_dir:
+                    continue
+                # still being written by the browser
+                if is_partial_download(entry.name):
+                    continue
+
+                destination = fo.EXT_DIR_MAP.get(Path(entry.name).suffix.lower())
+                if destination is None and is_archive(entry.name):
+                    archive_files.append(home / directory / entry.name)
+                elif destination is None:
+                    unrouted_files.append(home / directory / entry.name)
+                else:
+                    await move_queue.put(
+                        MoveOp(
+                            home / directory / entry.name,
+                            home / destination / entry.name,
+                            False,
+                            "downloads",
+                        )
+                    )
+
+            if archive_files:
+                classified = await loop.run_in_executor(
+                    None, classify_archives, archive_files, fo.EXT_DIR_MAP
+                )
+                for file_path, destination in classified.items():
+                    if destination is None:
+                        unrouted_files.append(file_path)
+                    else:
+                        await move_queue.put(
+                            MoveOp(
+                                file_path,
+                                home / destination / file_path.name,
+                                False,
+                                "downloads",
+                            )
+                        )
+
+            if unrouted_files:
+                sniffed = await loop.run_in_executor(None, sniff_files, unrouted_files)
+                for file_path, destination in sniffed.items():
+                    if destination is not None:
+                        await move_queue.put(
+                            MoveOp(
+                                file_path,
+                                home / destination / file_path.name,
+                                False,
+                                "downloads",
+                            )
+                        )
+    finally:
+        await move_queue.put(None)
+
+
+def _apply(ops: list[MoveOp], journal: MoveJournal | None = None):
+    """
+    apply a group of moves, with a journal the group is recorded before
+    and after it happens as one durable batch, whatever moved before a
+    failure is still recorded as done
+    """
+
+    if journal is None:
+        for op in ops:
+            execute_op(op)
+        return
+
+    journal.begin(ops)
+    applied = []
+    try:
+        for op in ops:
+            execute_op(op, sync=True)
+            applied.append(op)
+    finally:
+        journal.commit(applied)
+
+
+async def _move(
+    move_queue: asyncio.Queue, plan: MovePlan, journal: MoveJournal | None = None
+):
+    """
+    apply moves as they arrive, a move whose destination is taken
+    is renamed, or recorded as a conflict and skipped if the plan aborts
+    on collisions, every move waiting in the queue is applied as one
+    group so a journal is synced once per group rather than per move
+    """
+
+    loop = asyncio.get_running_loop()
+    done = False
+    while not done:
+        arrived = [await move_queue.get()]
+        while not move_queue.empty():
+            arrived.append(move_queue.get_nowait())
+        if None in arrived:
+            done = True
+            arrived = arrived[: arrived.index(None)]
+
+        group = []
+        for op in arrived:
+            planned = await loop.run_in_executor(None, plan.add, op)
+            if planned is not None:
+                group.append(planned)
+        if group:
+            await loop.run_in_executor(None, _apply, group, journal)
+
+
+async def run_pipeline(
+    home: Path,
+    desktop_flag: bool = False,
+    dispatcher: RuleDispatcher | None = None,
+    collision_policy: str = COLLISION_RENAME,
+    journal: MoveJournal | None = None,
+    exclusions: ExclusionMatcher | None = None,
+    repos: RepoIndex | None = None,
+) -> MovePlan:
+    """
+    organize home with scanning, classification and moving running
+    concurrently, connected by bounded queues, returns the applied moves
+    and raises FileExistsError at the end if any move was skipped,
+    with a journal the run can be undone, excluded paths are left alone
+    and repositories in use deferred
+    """
+
+    dispatcher = dispatcher or fo.DEFAULT_DISPATCHER
+    scan_queue: asyncio.Queue = asyncio.Queue(SCAN_QUEUE_SIZE)
+    move_queue: asyncio.Queue = asyncio.Queue(MOVE_QUEUE_SIZE)
+    plan = MovePlan(collision_policy, exclusions=exclusions)
+    repos = repos or RepoIndex()
+
+    tasks = [
+        asyncio.create_task(_scan(home, desktop_flag, scan_queue, exclusions, repos)),
+        asyncio.create_task(_classify(home, dispatcher, scan_queue, move_queue, plan)),
+        asyncio.create_task(_move(move_queue, plan, journal)),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    try:
+        plan.check()
+    except FileExistsError as fee:
+        logger.error("FileExistsError in run_pipeline: %s", fee)
+        raise
+
+    logger.info("Home directory organized!")
+    return plan
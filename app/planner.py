@@ -0,0 +1,181 @@
+"""Planned moves for a whole run, checked for conflicts before anything moves"""
+
+import dataclasses
+from dataclasses import dataclass
+from pathlib import Path
+
+from app import stats
+from app.collisions import (
+    COLLISION_ABORT,
+    COLLISION_RENAME,
+    CollisionIndex,
+    list_names,
+)
+from app.exclusions import ExclusionMatcher
+from app.snapshot import HomeSnapshot
+from app.trash import format_size
+
+
+# how a MoveOp is applied
+ACTION_MOVE = "move"
+ACTION_REPLACE = "replace"
+ACTION_LINK = "link"
+
+
+@dataclass(frozen=True)
+class MoveOp:
+    """
+    a single planned move of source to destination, when duplicate_of
+    names an identical file at the destination the action says whether
+    source replaces it or destination becomes a hard link to it
+    """
+
+    source: Path
+    destination: Path
+    is_dir: bool
+    reason: str
+    action: str = ACTION_MOVE
+    duplicate_of: Path | None = None
+
+    def __str__(self):
+        kind = "dir " if self.is_dir else "file"
+        line = f"[{self.reason}] {kind} {self.source} -> {self.destination}"
+        if self.action != ACTION_MOVE:
+            line += f" ({self.action} duplicate {self.duplicate_of})"
+        return line
+
+
+class MovePlan:
+    """
+    ordered move operations plus any conflicts found while planning,
+    with the rename collision policy a taken destination gets the next
+    free 'name (n).ext' instead of becoming a conflict,
+    destinations listed in snapshot are checked against it in memory
+    rather than on disk, nothing is moved into a directory exclusions
+    leave alone
+    """
+
+    def __init__(
+        self,
+        collision_policy: str = COLLISION_RENAME,
+        snapshot: HomeSnapshot | None = None,
+        exclusions: ExclusionMatcher | None = None,
+    ):
+        self.collision_policy = collision_policy
+        self.snapshot = snapshot
+        self.exclusions = exclusions
+        self.ops: list[MoveOp] = []
+        self.conflicts: list[str] = []
+        self.skipped: list[MoveOp] = []
+        self.deferred: list[MoveOp] = []
+        self.excluded: list[MoveOp] = []
+        self.trashed: list[tuple[Path, int]] = []
+        # where each planned destination's item is until the plan is applied
+        self._targets: dict[Path, Path] = {}
+        self._skipped_sources: set[Path] = set()
+        self._collisions = CollisionIndex(self._list_names)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __iter__(self):
+        return iter(self.ops)
+
+    def _list_names(self, directory: Path) -> set[str]:
+        if self.snapshot is not None and self.snapshot.holds(directory):
+            return self.snapshot.names(directory.name)
+        return list_names(directory)
+
+    def _exists(self, path: Path) -> bool:
+        if self.snapshot is not None and self.snapshot.holds(path.parent):
+            return self.snapshot.contains(path.parent.name, path.name)
+        stats.count("exists_checks")
+        return path.exists()
+
+    def add(self, op: MoveOp) -> MoveOp | None:
+        """
+        add op and return it as planned, renamed if its destination is
+        already taken on disk or by an earlier op, None if the collision
+        policy records a conflict instead or the destination directory
+        is excluded
+        """
+
+        if self.exclusions and self.exclusions.excluded_path(
+            op.destination.parent, True
+        ):
+            # stays put rather than falling through to another rule
+            self.excluded.append(op)
+            self._skipped_sources.add(op.source)
+            return None
+
+        # replacing or linking over an identical copy reuses its name
+        taken = self._exists(op.destination) and op.destination != op.duplicate_of
+        if op.destination in self._targets or taken:
+            if self.collision_policy == COLLISION_ABORT:
+                self.conflicts.append(
+                    f"Cannot move {op.source.name} into {op.destination.parent} because it already exists"
+                )
+                return None
+
+            # a renamed op no longer lands on its duplicate, so it moves plainly
+            op = dataclasses.replace(
+                op,
+                destination=self._collisions.free_name(op.destination, op.is_dir),
+                action=ACTION_MOVE,
+                duplicate_of=None,
+            )
+
+        self._targets[op.destination] = op.source
+        self._collisions.reserve(op.destination)
+        self.ops.append(op)
+        return op
+
+    def skip(self, op: MoveOp):
+        """leave op's source where it is for the rest of the run"""
+
+        self.skipped.append(op)
+        self._skipped_sources.add(op.source)
+
+    def defer(self, op: MoveOp):
+        """leave op's source in place until a later run"""
+        self.deferred.append(op)
+
+    def trash(self, path: Path, size: int):
+        """record that path, of size bytes, goes to the trash after the moves"""
+        self.trashed.append((path, size))
+
+    def is_skipped(self, source: Path) -> bool:
+        """whether source was skipped earlier in the run"""
+        return source in self._skipped_sources
+
+    def is_target(self, path: Path) -> bool:
+        """whether an item is planned to arrive at path"""
+        return path in self._targets
+
+    def source_of(self, path: Path) -> Path | None:
+        """where the item planned to arrive at path is now, None if none is"""
+        return self._targets.get(path)
+
+    def check(self):
+        """raise FileExistsError if any conflict was found while planning"""
+
+        if self.conflicts:
+            raise FileExistsError("; ".join(self.conflicts))
+
+    def describe(self) -> str:
+        """human readable listing of the plan"""
+
+        lines = [str(op) for op in self.ops]
+        lines += [f"[skip duplicate] {op.source}" for op in self.skipped]
+        lines += [f"[defer active repository] {op.source}" for op in self.deferred]
+        lines += [
+            f"[excluded destination] {op.source} -> {op.destination.parent}"
+            for op in self.excluded
+        ]
+        lines += [
+            f"[trash] {path} ({format_size(size)})" for path, size in self.trashed
+        ]
+        lines += [f"[conflict] {conflict}" for conflict in self.conflicts]
+        if not lines:
+            return "Nothing to move"
+        return "\n".join(lines)
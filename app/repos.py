@@ -0,0 +1,132 @@
+"""Git repository detection and activity, read from .git without running git"""
+
+import json
+import logging
+import os
+import stat
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from app import stats
+from app.state import RACY_WINDOW_NS, default_state_path
+
+logger = logging.getLogger("Prod Logger")
+
+REPOS_VERSION = 1
+
+# git replaces each of these through a lock file and a rename,
+# so every update also bumps the mtime of .git itself
+ACTIVITY_FILES = ("HEAD", "index", "ORIG_HEAD")
+
+# a repository touched this recently is left for a later run
+ACTIVE_WINDOW = 15 * 60
+
+
+def default_repo_cache_path(home: Path | None = None) -> Path:
+    """repository cache next to the state file"""
+    return default_state_path(home).with_name("repos.json")
+
+
+class RepoInfo(NamedTuple):
+    """whether a directory is a git repository and whether it is in use"""
+
+    is_repo: bool
+    active: bool = False
+
+
+NOT_A_REPO = RepoInfo(False)
+
+
+class RepoIndex:
+    """
+    every directory is probed for .git at most once per run, the last
+    activity of a repository is cached against the inode and mtime of
+    its .git directory so an unchanged repository costs a single stat,
+    records persist across runs through load and save
+    """
+
+    def __init__(
+        self, records: dict | None = None, active_window: float = ACTIVE_WINDOW
+    ):
+        self.records: dict[str, list[int]] = records or {}
+        self.active_window_ns = int(active_window * 1_000_000_000)
+        self.now_ns = time.time_ns()
+        self._probed: dict[Path, RepoInfo] = {}
+
+    @classmethod
+    def load(cls, path: Path, active_window: float = ACTIVE_WINDOW) -> "RepoIndex":
+        """load records saved by an earlier run, unreadable ones start empty"""
+
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return cls(active_window=active_window)
+        except (OSError, ValueError) as error:
+            logger.error("Ignoring unreadable repository cache %s: %s", path, error)
+            return cls(active_window=active_window)
+
+        if data.get("version") != REPOS_VERSION:
+            return cls(active_window=active_window)
+        return cls(data.get("repos", {}), active_window)
+
+    def save(self, path: Path):
+        """write records atomically so a crash never leaves half a file"""
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"version": REPOS_VERSION, "repos": self.records}, file)
+        os.replace(tmp_path, path)
+
+    def _last_activity(self, git_dir: Path) -> int:
+        latest = 0
+        for name in ACTIVITY_FILES:
+            try:
+                stats.count("stats")
+                latest = max(latest, os.stat(git_dir / name).st_mtime_ns)
+            except FileNotFoundError:
+                continue
+        return latest
+
+    def _activity(self, directory: Path, git_stat: os.stat_result) -> int:
+        key = str(directory)
+        record = self.records.get(key)
+        if record is not None and record[:2] == [
+            git_stat.st_ino,
+            git_stat.st_mtime_ns,
+        ]:
+            return record[2]
+
+        activity = self._last_activity(directory / ".git")
+        # an update in the same clock tick would not change the mtime
+        if git_stat.st_mtime_ns < self.now_ns - RACY_WINDOW_NS:
+            self.records[key] = [git_stat.st_ino, git_stat.st_mtime_ns, activity]
+        else:
+            self.records.pop(key, None)
+        return activity
+
+    def probe(self, directory: Path) -> RepoInfo:
+        """whether directory is a repository and was active recently"""
+
+        info = self._probed.get(directory)
+        if info is not None:
+            return info
+
+        stats.count("git_probes")
+        try:
+            git_stat = os.stat(directory / ".git")
+        except OSError:
+            self.records.pop(str(directory), None)
+            info = NOT_A_REPO
+        else:
+            if stat.S_ISDIR(git_stat.st_mode):
+                activity = self._activity(directory, git_stat)
+                info = RepoInfo(True, self.now_ns - activity < self.active_window_ns)
+            else:
+                # a worktree or submodule, its metadata lives elsewhere
+                info = RepoInfo(True)
+
+        self._probed[directory] = info
+        return info
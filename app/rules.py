@@ -0,0 +1,134 @@
+"""Declarative routing rules compiled into a single dispatcher"""
+
+import re
+from dataclasses import dataclass
+
+from app.snapshot import EntrySnapshot
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    route an item found inside a top-level home directory to destination,
+    lower priority values win when several rules match the same item
+    """
+
+    name: str
+    destination: str
+    priority: int
+    for_dirs: bool = True
+    prefixes: tuple[str, ...] = ()
+    substrings: tuple[str, ...] = ()
+    requires_git: bool = False
+    skip_sources: tuple[str, ...] = ()
+
+
+DEFAULT_RULES = (
+    Rule(
+        "research",
+        "Research",
+        10,
+        prefixes=("Learn", "Study", "Test"),
+        requires_git=True,
+    ),
+    Rule("college", "College", 20, prefixes=("CS",)),
+    Rule("hackathon", "Hackathons", 30, prefixes=("Hackathon",), requires_git=True),
+    Rule("projects", "Projects", 40, requires_git=True, skip_sources=("Research",)),
+    Rule(
+        "backups",
+        "Backups",
+        50,
+        for_dirs=False,
+        substrings=("backup", "recovery", "key"),
+    ),
+)
+
+
+class RuleDispatcher:
+    """
+    rules compiled once into a prefix trie and a single substring regex,
+    so each entry is routed in one pass with every predicate evaluated
+    at most once
+    """
+
+    def __init__(self, rules: tuple[Rule, ...] | list[Rule]):
+        self.rules = sorted(rules, key=lambda rule: rule.priority)
+        # candidates that match on every name, split by entry type
+        self._unconditional = {True: set(), False: set()}
+        self._trie: dict = {}
+        self._substring_ranks: dict[str, set[int]] = {}
+
+        for rank, rule in enumerate(self.rules):
+            if not rule.prefixes and not rule.substrings:
+                self._unconditional[rule.for_dirs].add(rank)
+
+            for prefix in rule.prefixes:
+                node = self._trie
+                for char in prefix:
+                    node = node.setdefault(char, {})
+                node.setdefault(None, set()).add(rank)
+
+            for substring in rule.substrings:
+                self._substring_ranks.setdefault(substring, set()).add(rank)
+
+        self._substring_regex = None
+        if self._substring_ranks:
+            alternation = "|".join(
+                re.escape(substring)
+                for substring in sorted(self._substring_ranks, key=len, reverse=True)
+            )
+            # lookahead so overlapping substrings are all reported
+            self._substring_regex = re.compile(f"(?=({alternation}))")
+
+    def _prefix_ranks(self, name: str) -> set[int]:
+        ranks = set()
+        node = self._trie
+        for char in name:
+            node = node.get(char)
+            if node is None:
+                break
+            ranks |= node.get(None, set())
+        return ranks
+
+    def _substring_matches(self, name: str) -> set[int]:
+        ranks = set()
+        if self._substring_regex is not None:
+            for match in self._substring_regex.finditer(name):
+                ranks |= self._substring_ranks[match.group(1)]
+        return ranks
+
+    def route(self, source_dir: str, entry: EntrySnapshot) -> Rule | None:
+        """
+        return the rule entry should be moved by, or None when it stays,
+        an entry already inside its best rule's destination stays put
+        """
+
+        prefix_hits = self._prefix_ranks(entry.name)
+        substring_hits = self._substring_matches(entry.name)
+        candidates = self._unconditional[entry.is_dir] | prefix_hits | substring_hits
+
+        for rank in sorted(candidates):
+            rule = self.rules[rank]
+            if rule.for_dirs != entry.is_dir:
+                continue
+
+            # a rule only matches if all of its name predicates hold
+            if rule.prefixes and rank not in prefix_hits:
+                continue
+            if rule.substrings and rank not in substring_hits:
+                continue
+
+            if rule.requires_git and not entry.has_git:
+                continue
+
+            if source_dir == rule.destination or source_dir in rule.skip_sources:
+                return None
+
+            return rule
+
+        return None
+
+
+def compile_rules(rules: tuple[Rule, ...] | list[Rule]) -> RuleDispatcher:
+    """compile rules into a dispatcher"""
+    return RuleDispatcher(rules)
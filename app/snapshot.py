@@ -0,0 +1,102 @@
+"""In-memory snapshot of home and its top-level directories"""
+
+import dataclasses
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class EntrySnapshot:
+    """
+    a non-hidden item found inside a top-level home directory,
+    active marks a repository someone has worked in recently,
+    excluded an item that takes up its name but is never routed,
+    is_symlink a link that is routed as an item but never looked inside
+    """
+
+    name: str
+    is_dir: bool
+    has_git: bool = False
+    active: bool = False
+    excluded: bool = False
+    is_symlink: bool = False
+
+
+class HomeSnapshot:
+    """
+    names, types and .git presence of everything one level below home,
+    built by a single traversal and kept up to date as items are moved,
+    directories reused unchanged from an earlier run are listed in cached,
+    excluded items count as taken names but are left out of files and
+    sub_dirs
+    """
+
+    def __init__(self, home: Path):
+        self.home = home
+        self.cached: set[str] = set()
+        self._dirs: dict[str, dict[str, EntrySnapshot]] = {}
+
+    def add_dir(
+        self, directory: str, entries: list[EntrySnapshot], cached: bool = False
+    ):
+        """record the contents of a top-level directory"""
+        self._dirs[directory] = {entry.name: entry for entry in entries}
+        if cached:
+            self.cached.add(directory)
+
+    def top_dirs(self) -> list[str]:
+        """names of the non-hidden top-level directories"""
+        return list(self._dirs)
+
+    def entries(self, directory: str) -> list[EntrySnapshot]:
+        """everything inside a top-level directory"""
+        return list(self._dirs.get(directory, {}).values())
+
+    def sub_dirs(self, directory: str) -> list[EntrySnapshot]:
+        """directories inside a top-level directory"""
+        return [
+            entry
+            for entry in self._dirs.get(directory, {}).values()
+            if entry.is_dir and not entry.excluded
+        ]
+
+    def files(self, directory: str) -> list[str]:
+        """names of the files inside a top-level directory"""
+        return [
+            entry.name
+            for entry in self._dirs.get(directory, {}).values()
+            if not entry.is_dir and not entry.excluded
+        ]
+
+    def holds(self, directory_path: Path) -> bool:
+        """whether directory_path is a top-level directory this snapshot lists"""
+        return directory_path.parent == self.home and directory_path.name in self._dirs
+
+    def names(self, directory: str) -> set[str]:
+        """names of everything inside a top-level directory"""
+        return set(self._dirs.get(directory, {}))
+
+    def contains(self, directory: str, name: str) -> bool:
+        """whether a top-level directory holds an item called name"""
+        return name in self._dirs.get(directory, {})
+
+    def move(
+        self,
+        source_dir: str,
+        name: str,
+        destination_dir: str,
+        new_name: str | None = None,
+    ):
+        """reflect the move of source_dir/name into destination_dir"""
+        entry = self._dirs[source_dir].pop(name)
+        if new_name is not None and new_name != name:
+            entry = dataclasses.replace(entry, name=new_name)
+        self._dirs.setdefault(destination_dir, {})[entry.name] = entry
+
+    def add(self, directory: str, entry: EntrySnapshot):
+        """reflect an item from below the top level moving into directory"""
+        self._dirs.setdefault(directory, {})[entry.name] = entry
+
+    def remove(self, directory: str, name: str):
+        """reflect the deletion of directory/name"""
+        self._dirs.get(directory, {}).pop(name, None)
@@ -0,0 +1,109 @@
+"""Detect file types from magic bytes in a bounded header"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app import stats
+
+HEADER_SIZE = 4096
+SNIFF_WORKERS = 8
+
+# suffixes browsers and download managers write to until a download
+# completes and is renamed, such files are never routed
+PARTIAL_SUFFIXES = (".part", ".crdownload", ".download", ".partial", ".tmp")
+
+# (offset, magic bytes, destination directory), checked in order
+MAGIC_SIGNATURES = [
+    (0, b"%PDF-", "Documents"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "Documents"),
+    (0, b"\x89PNG\r\n\x1a\n", "Pictures"),
+    (0, b"\xff\xd8\xff", "Pictures"),
+    (0, b"GIF87a", "Pictures"),
+    (0, b"GIF89a", "Pictures"),
+    (8, b"WAVE", "Music"),
+    (8, b"AVI ", "Videos"),
+    (0, b"OggS", "Music"),
+    (0, b"ID3", "Music"),
+    (0, b"\xff\xfb", "Music"),
+    (4, b"ftypqt  ", "Videos"),
+    (4, b"ftyp", "Music"),
+    (0, b"FLV", "Videos"),
+    (0, b"\x30\x26\xb2\x75\x8e\x66\xcf\x11", "Videos"),
+    (0, b"solid ", "3D Models"),
+]
+
+# zip based formats, told apart by member names near the start of the archive
+ZIP_MAGIC = b"PK\x03\x04"
+ZIP_MEMBER_HINTS = [
+    (b"word/", "Documents"),
+    (b"3D/3dmodel.model", "3D Models"),
+]
+
+
+def is_partial_download(name: str) -> bool:
+    """whether name is a download still being written"""
+    return name.lower().endswith(PARTIAL_SUFFIXES)
+
+
+def read_header(path: Path, size: int = HEADER_SIZE) -> bytes:
+    """read at most size bytes from the start of path"""
+
+    try:
+        with open(path, "rb") as file:
+            return file.read(size)
+    except OSError:
+        return b""
+
+
+def classify_header(header: bytes, has_suffix: bool = True) -> str | None:
+    """
+    return the destination directory for a file header,
+    plain text is only trusted for files without any extension
+    """
+
+    if header == b"":
+        return None
+
+    for offset, magic, destination in MAGIC_SIGNATURES:
+        if header.startswith(magic, offset):
+            return destination
+
+    if header.startswith(ZIP_MAGIC):
+        for hint, destination in ZIP_MEMBER_HINTS:
+            if hint in header:
+                return destination
+        return None
+
+    if header.lstrip().startswith((b"<svg", b"<?xml")) and b"<svg" in header:
+        return "Pictures"
+
+    if not has_suffix and b"\x00" not in header:
+        try:
+            header.decode("utf-8")
+        except UnicodeDecodeError:
+            # a multi-byte character may be cut off at the header boundary
+            try:
+                header[:-3].decode("utf-8")
+            except UnicodeDecodeError:
+                return None
+        return "Documents"
+
+    return None
+
+
+def sniff_file(path: Path) -> str | None:
+    """destination directory for path based on its content"""
+    return classify_header(read_header(path), path.suffix != "")
+
+
+def sniff_files(
+    paths: list[Path], max_workers: int = SNIFF_WORKERS
+) -> dict[Path, str | None]:
+    """sniff a batch of files, reading their headers on a thread pool"""
+
+    if not paths:
+        return {}
+
+    stats.count("header_reads", len(paths))
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+        return dict(zip(paths, executor.map(sniff_file, paths)))
@@ -15,5 +15,3 @@ class EmptyDirectory(Exception):
         """TODO: add docstring"""
         return f"Directory {self.directory} is empty in {self.func_name}"
 
-
-# TODO: add special exception for FileExistsError to handle by file rename with (1..n)
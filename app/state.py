@@ -0,0 +1,193 @@
+"""Directory state persisted between runs for incremental scans"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+from app import stats
+from app.snapshot import EntrySnapshot
+
+logger = logging.getLogger("Prod Logger")
+
+STATE_VERSION = 3
+
+# mtimes this close to the time they were recorded are not trusted,
+# a change in the same clock tick would otherwise go unnoticed
+RACY_WINDOW_NS = 1_000_000_000
+
+
+def default_state_path(home: Path | None = None) -> Path:
+    """
+    state file under $XDG_STATE_HOME (~/.local/state by default),
+    or under home's .local/state when organizing someone else's home
+    """
+
+    if home is not None:
+        # the caller's $XDG_STATE_HOME says nothing about another user's home
+        state_home = home / ".local" / "state"
+    else:
+        state_home = os.environ.get("XDG_STATE_HOME") or Path.home() / ".local/state"
+    return Path(state_home) / "file_organizer" / "state.json"
+
+
+def config_fingerprint(*settings) -> str:
+    """short digest of everything that influences routing decisions"""
+    return hashlib.sha256(repr(settings).encode()).hexdigest()[:16]
+
+
+class RunState:
+    """
+    mtime and inode of every top-level directory left fully organized
+    by the last run, together with its entries, so an unchanged
+    directory can be reused without listing it again
+    """
+
+    def __init__(self, config: str, dirs: dict | None = None):
+        self.config = config
+        self.dirs: dict[str, dict] = dirs or {}
+
+    @classmethod
+    def load(cls, path: Path, config: str) -> "RunState":
+        """
+        load state written by an earlier run,
+        a missing, unreadable or differently configured state starts empty
+        """
+
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return cls(config)
+        except (OSError, ValueError) as error:
+            logger.error("Ignoring unreadable state file %s: %s", path, error)
+            return cls(config)
+
+        if data.get("version") != STATE_VERSION or data.get("config") != config:
+            logger.info("State file %s is from another configuration", path)
+            return cls(config)
+
+        return cls(config, data.get("dirs", {}))
+
+    def save(self, path: Path):
+        """write state atomically so a crash never leaves half a file"""
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {"version": STATE_VERSION, "config": self.config, "dirs": self.dirs},
+                file,
+            )
+        os.replace(tmp_path, path)
+
+    def cached_dir(
+        self, directory: str, directory_path: Path
+    ) -> list[EntrySnapshot] | None:
+        """
+        entries recorded for directory if neither it nor any of the
+        entries whose mtime was recorded have changed, otherwise None,
+        this costs one stat per recorded subdirectory since a .git
+        created inside one only changes that subdirectory's mtime, so a
+        reused directory is checked in a fraction of a listing rather
+        than for free
+        """
+
+        record = self.dirs.get(directory)
+        if record is None:
+            return None
+
+        try:
+            stats.count("stats")
+            stat_result = os.stat(directory_path)
+            if (stat_result.st_mtime_ns, stat_result.st_ino) != (
+                record["mtime_ns"],
+                record["ino"],
+            ):
+                return None
+
+            entries = []
+            for recorded in record["entries"]:
+                name, is_dir, has_git, excluded, is_symlink, mtime_ns = recorded
+                if mtime_ns is not None:
+                    stats.count("stats")
+                    if os.stat(directory_path / name).st_mtime_ns != mtime_ns:
+                        return None
+                entries.append(
+                    EntrySnapshot(
+                        name,
+                        is_dir,
+                        has_git,
+                        excluded=excluded,
+                        is_symlink=is_symlink,
+                    )
+                )
+
+        except (OSError, KeyError, ValueError):
+            return None
+
+        return entries
+
+    def record_dir(
+        self,
+        directory: str,
+        directory_path: Path,
+        entries: list[EntrySnapshot],
+        watch_files: bool = False,
+    ):
+        """
+        remember directory as fully organized, subdirectory mtimes are kept
+        to notice .git appearing, file mtimes only when watch_files is set
+        (for directories routed by file content), excluded entries are
+        only kept as names
+        """
+
+        self.dirs.pop(directory, None)
+        racy_after = time.time_ns() - RACY_WINDOW_NS
+
+        try:
+            stats.count("stats")
+            stat_result = os.stat(directory_path)
+            if stat_result.st_mtime_ns > racy_after:
+                return
+
+            recorded = []
+            for entry in entries:
+                mtime_ns = None
+                if not entry.excluded and (entry.is_dir or watch_files):
+                    stats.count("stats")
+                    mtime_ns = os.stat(directory_path / entry.name).st_mtime_ns
+                    if mtime_ns > racy_after:
+                        return
+                recorded.append(
+                    [
+                        entry.name,
+                        entry.is_dir,
+                        entry.has_git,
+                        entry.excluded,
+                        entry.is_symlink,
+                        mtime_ns,
+                    ]
+                )
+
+        except OSError as ose:
+            logger.debug("Not recording state for %s: %s", directory_path, ose)
+            return
+
+        self.dirs[directory] = {
+            "mtime_ns": stat_result.st_mtime_ns,
+            "ino": stat_result.st_ino,
+            "entries": recorded,
+        }
+
+    def forget(self, directory: str):
+        """drop the record of directory so it is listed and routed again"""
+        self.dirs.pop(directory, None)
+
+    def forget_missing(self, directories: list[str]):
+        """drop directories that no longer exist"""
+
+        for directory in set(self.dirs) - set(directories):
+            del self.dirs[directory]
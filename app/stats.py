@@ -0,0 +1,128 @@
+"""Counters and timing spans for a run, only collected when enabled"""
+
+import json
+import threading
+import time
+from contextlib import nullcontext
+
+COUNTERS = (
+    "listings",
+    "visited",
+    "pruned",
+    "excluded",
+    "stats",
+    "exists_checks",
+    "git_probes",
+    "header_reads",
+    "archive_reads",
+    "hashes",
+    "renames",
+    "copies",
+    "bytes_copied",
+    "fsyncs",
+)
+
+STATS_TABLE = "table"
+STATS_JSON = "json"
+STATS_FORMATS = (STATS_TABLE, STATS_JSON)
+
+
+class RunStats:
+    """
+    counter totals plus calls and seconds spent in each named span,
+    updated under a lock since scan, sniff, archive and hash pools
+    count from their own threads
+    """
+
+    def __init__(self):
+        self.counters: dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self.spans: dict[str, list] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, document: dict) -> "RunStats":
+        """rebuild stats from as_dict output, such as a batch worker's"""
+
+        run_stats = cls()
+        run_stats.counters.update(document.get("counters", {}))
+        for name, span in document.get("spans", {}).items():
+            run_stats.spans[name] = [span["calls"], span["seconds"]]
+        return run_stats
+
+    def as_dict(self) -> dict:
+        return {
+            "spans": {
+                name: {"calls": calls, "seconds": seconds}
+                for name, (calls, seconds) in self.spans.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def table(self) -> str:
+        lines = [f"{'span':<24}{'calls':>8}{'seconds':>12}"]
+        for name, (calls, seconds) in self.spans.items():
+            lines.append(f"{name:<24}{calls:>8}{seconds:>12.4f}")
+        lines.append("")
+        lines.append(f"{'counter':<24}{'value':>20}")
+        for name, value in self.counters.items():
+            lines.append(f"{name:<24}{value:>20}")
+        return "\n".join(lines)
+
+    def format(self, stats_format: str = STATS_TABLE) -> str:
+        if stats_format == STATS_JSON:
+            return json.dumps(self.as_dict(), indent=2)
+        return self.table()
+
+
+class _Span:
+    def __init__(self, stats: RunStats, name: str):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        with self.stats.lock:
+            totals = self.stats.spans.setdefault(self.name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += elapsed
+
+
+# a single global check is all that instrumented code pays while disabled
+_active: RunStats | None = None
+_NULL_SPAN = nullcontext()
+
+
+def enable() -> RunStats:
+    """start collecting into a fresh RunStats"""
+
+    global _active
+    _active = RunStats()
+    return _active
+
+
+def disable():
+    """stop collecting"""
+
+    global _active
+    _active = None
+
+
+def count(name: str, amount: int = 1):
+    """add amount to counter name if collecting"""
+
+    run_stats = _active
+    if run_stats is not None:
+        with run_stats.lock:
+            run_stats.counters[name] += amount
+
+
+def span(name: str):
+    """context manager timing its body as name if collecting"""
+
+    if _active is None:
+        return _NULL_SPAN
+    return _Span(_active, name)
@@ -0,0 +1,198 @@
+"""Trash following the freedesktop.org spec, and what may be trashed"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import quote
+
+from app import stats
+from app.archives import ARCHIVE_SUFFIXES
+from app.exclusions import ExclusionMatcher
+
+logger = logging.getLogger("Prod Logger")
+
+DAY = 24 * 60 * 60
+SIZE_UNITS = ("B", "KiB", "MiB", "GiB", "TiB")
+
+
+def format_size(size: float) -> str:
+    """size in bytes in the largest unit it reaches"""
+
+    for unit in SIZE_UNITS[:-1]:
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} {SIZE_UNITS[-1]}"
+
+
+def default_trash_dir(home: Path | None = None) -> Path:
+    """
+    home trash under $XDG_DATA_HOME (~/.local/share by default),
+    or under home's .local/share when trashing in someone else's home
+    """
+
+    if home is not None:
+        return home / ".local" / "share" / "Trash"
+    data_home = os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share"
+    return Path(data_home) / "Trash"
+
+
+def mount_point(path: Path) -> Path:
+    """the top directory of the filesystem path is on"""
+
+    path = path.resolve()
+    device = os.stat(path).st_dev
+    while path.parent != path and os.stat(path.parent).st_dev == device:
+        path = path.parent
+    return path
+
+
+@dataclass(frozen=True)
+class TrashPolicy:
+    """
+    compressed files that may be trashed, those ending in one of
+    suffixes, last modified at least min_age_days ago and at least
+    min_size bytes large
+    """
+
+    min_age_days: float = 0
+    min_size: int = 0
+    suffixes: tuple[str, ...] = ARCHIVE_SUFFIXES
+
+    def matches(self, name: str) -> bool:
+        """whether name ends with one of suffixes, matched whole"""
+
+        lowered = name.lower()
+        return any(
+            lowered.endswith(suffix) and len(lowered) > len(suffix)
+            for suffix in self.suffixes
+        )
+
+    def select(
+        self,
+        directory: Path,
+        exclusions: ExclusionMatcher | None = None,
+        now: float | None = None,
+    ) -> tuple[list[tuple[str, int]], bool]:
+        """
+        (name, size) of every file in directory the policy selects and
+        exclusions leave in play, decided in one scandir pass that only
+        stats files whose name matches, plus whether directory holds any
+        non-hidden file at all, nothing is selected from a directory that
+        is itself excluded or lies below an excluded one
+        """
+
+        now = time.time() if now is None else now
+        oldest_mtime = now - self.min_age_days * DAY
+        prefix = exclusions.prefix(directory) if exclusions else ""
+        directory_excluded = bool(exclusions) and exclusions.excluded_path(
+            directory, True
+        )
+        selected = []
+        has_files = False
+
+        stats.count("listings")
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                has_files = True
+                if not self.matches(entry.name):
+                    continue
+                if directory_excluded or (
+                    exclusions and exclusions.excluded(prefix + entry.name, False)
+                ):
+                    stats.count("excluded")
+                    continue
+
+                stats.count("stats")
+                stat_result = entry.stat()
+                if stat_result.st_mtime > oldest_mtime:
+                    continue
+                if stat_result.st_size < self.min_size:
+                    continue
+                selected.append((entry.name, stat_result.st_size))
+
+        return sorted(selected), has_files
+
+
+class Trash:
+    """
+    move files into a freedesktop.org trash with a .trashinfo record
+    each, always by rename: files on the home trash's device go to the
+    home trash, others to .Trash-$uid at the top of their own filesystem,
+    so even a multi-GB file is trashed in constant time and never copied
+    """
+
+    def __init__(self, home_trash: Path):
+        self.home_trash = home_trash
+        self._trashes: dict[int, tuple[Path, Path | None]] = {}
+
+    def _make_trash(self, trash_dir: Path):
+        for sub_dir in ("files", "info"):
+            os.makedirs(trash_dir / sub_dir, mode=0o700, exist_ok=True)
+
+    def _trash_for(self, path: Path, device: int) -> tuple[Path, Path | None]:
+        """trash directory for device, with the top it records paths from"""
+
+        if device in self._trashes:
+            return self._trashes[device]
+
+        self._make_trash(self.home_trash)
+        if os.stat(self.home_trash).st_dev == device:
+            trash = (self.home_trash, None)
+        else:
+            top_dir = mount_point(path.parent)
+            trash_dir = top_dir / f".Trash-{os.getuid()}"
+            self._make_trash(trash_dir)
+            trash = (trash_dir, top_dir)
+
+        self._trashes[device] = trash
+        return trash
+
+    def _reserve_info(self, trash_dir: Path, name: str, record: str) -> str:
+        """write a .trashinfo under the first free name, returning that name"""
+
+        number = 1
+        trashed_name = name
+        while True:
+            info_path = trash_dir / "info" / f"{trashed_name}.trashinfo"
+            if not os.path.lexists(trash_dir / "files" / trashed_name):
+                flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL
+                try:
+                    fd = os.open(info_path, flags, 0o600)
+                except FileExistsError:
+                    pass
+                else:
+                    with os.fdopen(fd, "w", encoding="utf-8") as file:
+                        file.write(record)
+                    return trashed_name
+            number += 1
+            trashed_name = f"{name}.{number}"
+
+    def trash(self, path: Path) -> Path:
+        """move path into the trash, returning where it now is"""
+
+        # the directory resolved, so a symlinked Downloads maps onto its mount
+        path = path.parent.resolve() / path.name
+        trash_dir, top_dir = self._trash_for(path, os.lstat(path).st_dev)
+        recorded_path = path if top_dir is None else path.relative_to(top_dir)
+        record = (
+            "[Trash Info]\n"
+            f"Path={quote(str(recorded_path))}\n"
+            f"DeletionDate={time.strftime('%Y-%m-%dT%H:%M:%S')}\n"
+        )
+
+        trashed_name = self._reserve_info(trash_dir, path.name, record)
+        trashed_path = trash_dir / "files" / trashed_name
+        try:
+            stats.count("renames")
+            os.rename(path, trashed_path)
+        except OSError:
+            os.unlink(trash_dir / "info" / f"{trashed_name}.trashinfo")
+            raise
+
+        logger.debug("Trashed %s as %s", path, trashed_path)
+        return trashed_path
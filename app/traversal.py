@@ -0,0 +1,119 @@
+"""Depth-limited traversal below the top-level home directories"""
+
+import logging
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+from app import stats
+from app.repos import RepoIndex
+from app.snapshot import EntrySnapshot
+
+logger = logging.getLogger("Prod Logger")
+
+# depth 1 is the items directly inside a top-level home directory,
+# the only level the funnels looked at before traversal was configurable
+DEFAULT_MAX_DEPTH = 1
+
+# trees with nothing worth routing and far too many entries to list,
+# hidden ones such as .git are never listed in the first place
+PRUNED_DIRS = frozenset(
+    {
+        "node_modules",
+        "anaconda3",
+        "miniconda3",
+        "site-packages",
+        "__pycache__",
+        "venv",
+    }
+)
+
+
+class Traversal:
+    """
+    walk below a top-level directory down to max_depth, listing each
+    directory with lister, git repositories, symlinks and pruned_names
+    are never descended into, the top-level directory included (probed through
+    repos when given), visited and pruned count the entries yielded and
+    the subtrees skipped
+    """
+
+    def __init__(
+        self,
+        lister: Callable[[Path], list[EntrySnapshot]],
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        pruned_names: frozenset[str] = PRUNED_DIRS,
+        repos: RepoIndex | None = None,
+    ):
+        self.lister = lister
+        self.max_depth = max_depth
+        self.pruned_names = pruned_names
+        self.repos = repos
+        self.visited = 0
+        self.pruned = 0
+
+    def _prune(self, path: Path):
+        logger.debug("Not descending into %s", path)
+        self.pruned += 1
+        stats.count("pruned")
+
+    def _is_repo(self, path: Path) -> bool:
+        if self.repos is not None:
+            return self.repos.probe(path).is_repo
+        stats.count("git_probes")
+        return Path.exists(path / ".git")
+
+    def _descends_top(self, directory: Path) -> bool:
+        # its items are still routed, only their contents are left alone
+        if (
+            directory.name in self.pruned_names
+            or directory.is_symlink()
+            or self._is_repo(directory)
+        ):
+            self._prune(directory)
+            return False
+        return True
+
+    def _descends(self, path: Path, entry: EntrySnapshot, depth: int) -> bool:
+        if not entry.is_dir or depth >= self.max_depth:
+            return False
+        # a repository moves as a whole, its insides are never routed,
+        # and a symlink may lead anywhere, outside home included
+        if entry.has_git or entry.is_symlink or entry.name in self.pruned_names:
+            self._prune(path)
+            return False
+        return True
+
+    def walk(
+        self,
+        directory: Path,
+        entries: list[EntrySnapshot] | None = None,
+        depth: int = 1,
+        stop: Callable[[Path], bool] | None = None,
+    ) -> Iterator[tuple[Path, EntrySnapshot]]:
+        """
+        yield (parent, entry) for everything in directory, each entry
+        before its contents, directories stop(path) holds for once
+        their entry has been yielded are not descended into,
+        entries skips listing directory when it is already known,
+        excluded entries are neither yielded nor descended into
+        """
+
+        if entries is None:
+            entries = self.lister(directory)
+
+        # a top-level directory is checked once, and only when going deeper
+        descends = depth > 1 or self.max_depth == 1 or self._descends_top(directory)
+
+        for entry in entries:
+            if entry.excluded:
+                continue
+            self.visited += 1
+            stats.count("visited")
+            yield directory, entry
+
+            path = directory / entry.name
+            if not descends or not self._descends(path, entry, depth):
+                continue
+            if stop is not None and stop(path):
+                continue
+            yield from self.walk(path, None, depth + 1, stop)
@@ -0,0 +1,272 @@
+"""Watch home, Downloads and Desktop with inotify and route new items"""
+
+import ctypes
+import ctypes.util
+import errno
+import functools
+import logging
+import os
+import select
+import struct
+from collections.abc import Iterator
+from pathlib import Path
+
+from app import file_organizer as fo
+from app.collisions import COLLISION_RENAME
+from app.duplicates import DUPLICATE_MOVE
+from app.exclusions import ExclusionMatcher
+from app.journal import MoveJournal
+from app.planner import MovePlan
+from app.repos import ACTIVE_WINDOW, RepoIndex
+from app.sniffing import is_partial_download
+from app.special_exceptions import EmptyDirectory
+from app.traversal import DEFAULT_MAX_DEPTH, Traversal
+
+logger = logging.getLogger("Prod Logger")
+
+# from sys/inotify.h
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+DEBOUNCE_SECONDS = 1.0
+
+_EVENT_HEADER = struct.Struct("iIII")
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    return _libc
+
+
+class DirectoryWatcher:
+    """
+    inotify watches on a few directories, yielding changed entries
+    in batches once no new event has arrived for the debounce window
+    """
+
+    def __init__(self, paths: list[Path], debounce: float = DEBOUNCE_SECONDS):
+        libc = _load_libc()
+        self.debounce = debounce
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        # a pipe lets stop() wake up a watcher blocked in select
+        self._stop_read, self._stop_write = os.pipe()
+        self._stopped = False
+        self._watches: dict[int, Path] = {}
+
+        for path in paths:
+            wd = libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                self.close()
+                raise OSError(err, os.strerror(err), str(path))
+            self._watches[wd] = path
+            logger.debug("Watching %s", path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """release the inotify instance"""
+        for fd in (self._fd, self._stop_read, self._stop_write):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def stop(self):
+        """make batches() return, safe to call from another thread"""
+        self._stopped = True
+        os.write(self._stop_write, b"x")
+
+    def _read_events(self, batch: set[tuple[Path, str, bool]]):
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            except OSError as ose:
+                if ose.errno == errno.EINTR:
+                    continue
+                raise
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    # events were dropped, have every watched directory rescanned
+                    batch.update((path, "", True) for path in self._watches.values())
+                    continue
+                if mask & IN_IGNORED or wd not in self._watches or not name:
+                    continue
+                # files are only routed once they have been fully written
+                if mask & IN_CREATE and not mask & IN_ISDIR:
+                    continue
+                if name.startswith("."):
+                    continue
+                # still downloading, its final rename arrives as IN_MOVED_TO
+                if not mask & IN_ISDIR and is_partial_download(name):
+                    continue
+
+                batch.add((self._watches[wd], name, bool(mask & IN_ISDIR)))
+
+    def batches(self) -> Iterator[set[tuple[Path, str, bool]]]:
+        """
+        yield sets of (watched directory, name, is_dir), blocking
+        without a timeout while idle so no CPU is spent between events
+        """
+
+        readers = [self._fd, self._stop_read]
+        while not self._stopped:
+            readable, _, _ = select.select(readers, [], [])
+            if self._stop_read in readable:
+                return
+
+            batch: set[tuple[Path, str, bool]] = set()
+            self._read_events(batch)
+            # coalesce everything that keeps arriving within the window
+            while not self._stopped:
+                readable, _, _ = select.select(readers, [], [], self.debounce)
+                if not readable or self._stop_read in readable:
+                    break
+                self._read_events(batch)
+
+            if batch:
+                yield batch
+
+
+def changed_dirs(home: Path, batch: set[tuple[Path, str, bool]]) -> set[str]:
+    """top-level directories whose contents need routing after batch"""
+
+    directories = set()
+    for watched, name, is_dir in batch:
+        if watched == home:
+            if not name:
+                # home overflowed, any top-level directory may have changed
+                directories.update(fo.get_non_hidden_dirs(home))
+            elif is_dir:
+                # a directory created in or moved into home, route what it holds
+                directories.add(name)
+        else:
+            directories.add(watched.name)
+    return directories
+
+
+def dispatch_batch(
+    home: Path,
+    directories: set[str],
+    desktop_flag: bool = False,
+    device_workers: int = fo.DEVICE_WORKERS,
+    journal_path: Path | None = None,
+    exclusions: ExclusionMatcher | None = None,
+    repos: RepoIndex | None = None,
+    duplicate_policy: str = DUPLICATE_MOVE,
+    collision_policy: str = COLLISION_RENAME,
+    max_depth: int = DEFAULT_MAX_DEPTH,
+) -> MovePlan:
+    """
+    route the contents of the given top-level directories
+    through the regular planner and apply the plan, with a journal
+    each batch is recorded as a run of its own that --undo reverts,
+    excluded paths are left alone and repositories in use deferred,
+    duplicate_policy, collision_policy and max_depth act as in plan_run
+    """
+
+    if repos is None:
+        repos = RepoIndex()
+
+    snapshot = fo.take_dirs_snapshot(home, sorted(directories), exclusions, repos)
+    plan = MovePlan(collision_policy, snapshot, exclusions)
+    lister = functools.partial(
+        fo.snapshot_dir_entries, exclusions=exclusions, repos=repos
+    )
+    try:
+        if snapshot.top_dirs():
+            fo.plan_home(
+                home,
+                fo.DEFAULT_DISPATCHER,
+                desktop_flag,
+                snapshot,
+                plan,
+                duplicate_policy=duplicate_policy,
+                traversal=Traversal(lister, max_depth, repos=repos),
+            )
+        if "Downloads" in snapshot.top_dirs():
+            fo.plan_downloads(home, snapshot, plan, duplicate_policy)
+    except EmptyDirectory as ed:
+        logger.debug("Nothing left to route: %s", ed)
+
+    journal = None if journal_path is None else MoveJournal(journal_path)
+    fo.apply_plan(plan, dispatch_batch.__name__, device_workers, journal)
+    return plan
+
+
+def watch_home(
+    home: Path,
+    desktop_flag: bool = False,
+    debounce: float = DEBOUNCE_SECONDS,
+    device_workers: int = fo.DEVICE_WORKERS,
+    watcher: DirectoryWatcher | None = None,
+    journal_path: Path | None = None,
+    exclusions: ExclusionMatcher | None = None,
+    active_window: float = ACTIVE_WINDOW,
+    duplicate_policy: str = DUPLICATE_MOVE,
+    collision_policy: str = COLLISION_RENAME,
+    max_depth: int = DEFAULT_MAX_DEPTH,
+):
+    """
+    route new items in home, Downloads and (with desktop_flag) Desktop
+    as they arrive until the watcher is stopped, journaling every batch
+    when journal_path is set, a repository with git activity in the
+    last active_window seconds is left for a later batch, a batch that
+    aborts on a collision moves nothing and watching carries on
+    """
+
+    if watcher is None:
+        paths = [home, home / "Downloads"]
+        if desktop_flag:
+            paths.append(home / "Desktop")
+        watcher = DirectoryWatcher(paths, debounce)
+
+    with watcher:
+        for batch in watcher.batches():
+            directories = changed_dirs(home, batch)
+            logger.info("Changes in %s", ", ".join(sorted(directories)) or home)
+            try:
+                dispatch_batch(
+                    home,
+                    directories,
+                    desktop_flag,
+                    device_workers,
+                    journal_path,
+                    exclusions,
+                    # activity is judged as of this batch, not when watching began
+                    RepoIndex(active_window=active_window),
+                    duplicate_policy,
+                    collision_policy,
+                    max_depth,
+                )
+            except OSError as ose:
+                # keep watching, the next batch may well succeed
+                logger.error("Could not route batch in watch_home: %s", ose)
@@ -0,0 +1 @@
+"""Synthetic home trees and organizer timings, run with python -m benchmarks.bench"""
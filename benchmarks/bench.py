@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+"""Time each funnel and a full run over generated home trees"""
+
+import argparse
+import dataclasses
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from unittest import mock
+
+import main
+from app import file_organizer as fo
+from app.special_exceptions import EmptyDirectory
+from benchmarks.home_tree import PRESETS, TreeSpec, generate_home
+
+RESULTS_VERSION = 1
+
+
+def _main_run(home: Path):
+    with mock.patch.object(Path, "home", return_value=home):
+        main.main(desktop_flag=True, trash_flag=False)
+
+
+def _del_zip_files(home: Path):
+    fo.del_zip_files(home, True, assume_yes=True)
+
+
+BENCHMARKS: dict[str, Callable[[Path], None]] = {
+    "research_dir_funnel": lambda home: fo.research_dir_funnel(home, True),
+    "college_dir_funnel": lambda home: fo.college_dir_funnel(home, True),
+    "hackathon_dir_funnel": lambda home: fo.hackathon_dir_funnel(home, True),
+    "projects_dir_funnel": lambda home: fo.projects_dir_funnel(home, True),
+    "backups_dir_funnel": lambda home: fo.backups_dir_funnel(home, True),
+    "cleanup_downloads_dir": fo.cleanup_downloads_dir,
+    "del_zip_files": _del_zip_files,
+    "main": _main_run,
+}
+
+
+def time_benchmark(
+    function: Callable[[Path], None], spec: TreeSpec, repeat: int, workdir: Path
+) -> list[float]:
+    """
+    seconds taken by function over a fresh tree on each repetition,
+    only the call itself is timed, not generating or removing the tree
+    """
+
+    timings = []
+    for _ in range(repeat):
+        home = Path(tempfile.mkdtemp(prefix="home-", dir=workdir))
+        try:
+            generate_home(home, spec)
+            start = time.perf_counter()
+            try:
+                function(home)
+            except EmptyDirectory:
+                pass
+            timings.append(time.perf_counter() - start)
+        finally:
+            shutil.rmtree(home)
+    return timings
+
+
+def run_suite(
+    spec: TreeSpec, names: list[str], repeat: int, workdir: Path
+) -> dict[str, dict]:
+    """min, median and every timing for each named benchmark"""
+
+    results = {}
+    for name in names:
+        timings = time_benchmark(BENCHMARKS[name], spec, repeat, workdir)
+        results[name] = {
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "runs": timings,
+        }
+        print(f"{name:<24} min {results[name]['min']:.4f}s", file=sys.stderr)
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict]) -> list[str]:
+    """one line per benchmark with its median relative to baseline"""
+
+    lines = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["median"] / baseline[name]["median"]
+        lines.append(
+            f"{name:<24} {baseline[name]['median']:.4f}s -> "
+            f"{result['median']:.4f}s ({ratio:.2f}x)"
+        )
+    return lines
+
+
+def cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-p", "--preset", choices=PRESETS, default="1k", help="size of the home tree"
+    )
+    parser.add_argument(
+        "-e", "--entries", type=int, help="override the preset's entry count"
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument(
+        "-b",
+        "--benchmark",
+        action="append",
+        choices=BENCHMARKS,
+        help="benchmark to run, repeatable, all by default",
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, help="write results to this JSON file"
+    )
+    parser.add_argument(
+        "--baseline", type=Path, help="compare against earlier JSON results"
+    )
+    parser.add_argument(
+        "--workdir", type=Path, help="directory the trees are generated in"
+    )
+    args = parser.parse_args()
+
+    spec = PRESETS[args.preset]
+    if args.entries is not None:
+        spec = dataclasses.replace(spec, entries=args.entries)
+    names = args.benchmark or list(BENCHMARKS)
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        results = run_suite(spec, names, args.repeat, Path(workdir))
+
+    document = {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "preset": args.preset,
+            "spec": dataclasses.asdict(spec),
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.time(),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        args.output.write_text(json.dumps(document, indent=2))
+    else:
+        print(json.dumps(document, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        print("\n".join(compare(results, baseline)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    cli()
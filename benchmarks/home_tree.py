@@ -0,0 +1,152 @@
+"""Generate synthetic home trees of a chosen size for benchmarking"""
+
+import os
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.file_organizer import EXT_DIR_MAP
+from main import MY_DIRS
+
+# names the default rules route, and ones that look similar but do not match
+MATCHING_DIR_PREFIXES = ["Learn_", "Study_", "Test_", "CS_", "Hackathon_"]
+NON_MATCHING_DIR_PREFIXES = ["Notes_", "Lab_", "Misc_", "Old_", "Shared_"]
+MATCHING_FILE_WORDS = ["backup", "recovery", "key"]
+NON_MATCHING_FILE_WORDS = ["report", "photo", "track", "draft", "scan", "invoice"]
+ARCHIVE_EXTENSIONS = [".zip", ".tar.gz", ".tar.bz2", ".tar.xz", ".deb"]
+OTHER_EXTENSIONS = [".bin", ".log", ".csv", ".json", ""]
+
+# HEAD mtime of generated repositories, old enough that none look active
+IDLE_REPO_TIME = 1_000_000_000
+
+# (size in bytes, weight), files are sparse so large sizes cost no disk
+DEFAULT_FILE_SIZES = [
+    (0, 5),
+    (512, 30),
+    (16 * 1024, 35),
+    (1024 * 1024, 20),
+    (64 * 1024 * 1024, 8),
+    (1024 * 1024 * 1024, 2),
+]
+
+
+@dataclass
+class TreeSpec:
+    """
+    shape of a generated home, entries counts every file and directory
+    created below home, split across the top-level directories with
+    Downloads taking downloads_share of the files
+    """
+
+    entries: int = 1_000
+    extra_top_dirs: int = 10
+    subdir_ratio: float = 0.2
+    git_ratio: float = 0.3
+    matching_ratio: float = 0.3
+    nested_files: int = 4
+    downloads_share: float = 0.4
+    file_sizes: list[tuple[int, int]] = field(
+        default_factory=lambda: list(DEFAULT_FILE_SIZES)
+    )
+    seed: int = 0
+
+
+PRESETS = {
+    "1k": TreeSpec(entries=1_000),
+    "10k": TreeSpec(entries=10_000, extra_top_dirs=20),
+    "100k": TreeSpec(entries=100_000, extra_top_dirs=50),
+    "1m": TreeSpec(entries=1_000_000, extra_top_dirs=100),
+}
+
+
+class _TreeBuilder:
+    def __init__(self, home: Path, spec: TreeSpec):
+        self.home = home
+        self.spec = spec
+        self.random = random.Random(spec.seed)
+        self.sizes = [size for size, _ in spec.file_sizes]
+        self.weights = [weight for _, weight in spec.file_sizes]
+        self.extensions = list(EXT_DIR_MAP) + ARCHIVE_EXTENSIONS + OTHER_EXTENSIONS
+        self.created = 0
+        self.counter = 0
+
+    def _unique(self) -> int:
+        self.counter += 1
+        return self.counter
+
+    def _mkdir(self, path: Path):
+        os.mkdir(path)
+        self.created += 1
+
+    def _file(self, path: Path):
+        size = self.random.choices(self.sizes, self.weights)[0]
+        with open(path, "wb") as file:
+            if size:
+                file.truncate(size)
+        self.created += 1
+
+    def file_name(self) -> str:
+        if self.random.random() < self.spec.matching_ratio:
+            word = self.random.choice(MATCHING_FILE_WORDS)
+        else:
+            word = self.random.choice(NON_MATCHING_FILE_WORDS)
+        extension = self.random.choice(self.extensions)
+        return f"{word}_{self._unique()}{extension}"
+
+    def dir_name(self) -> str:
+        if self.random.random() < self.spec.matching_ratio:
+            prefix = self.random.choice(MATCHING_DIR_PREFIXES)
+        else:
+            prefix = self.random.choice(NON_MATCHING_DIR_PREFIXES)
+        return f"{prefix}{self._unique()}"
+
+    def subdir(self, parent: Path, budget: int):
+        """a subdirectory, maybe a git repository, holding a few files"""
+
+        path = parent / self.dir_name()
+        self._mkdir(path)
+        budget -= 1
+        if budget >= 2 and self.random.random() < self.spec.git_ratio:
+            self._mkdir(path / ".git")
+            self._file(path / ".git" / "HEAD")
+            # an idle repository, recent git activity would defer its move
+            os.utime(path / ".git" / "HEAD", (IDLE_REPO_TIME, IDLE_REPO_TIME))
+            budget -= 2
+        for _ in range(min(self.spec.nested_files, budget)):
+            self._file(path / self.file_name())
+
+    def fill(self, directory: Path, budget: int):
+        target = self.created + budget
+        while self.created < target:
+            if self.random.random() < self.spec.subdir_ratio:
+                self.subdir(directory, target - self.created)
+            else:
+                self._file(directory / self.file_name())
+
+    def build(self) -> int:
+        self.home.mkdir(parents=True, exist_ok=True)
+        top_dirs = list(MY_DIRS) + [
+            f"Extra_{index}" for index in range(self.spec.extra_top_dirs)
+        ]
+        for directory in top_dirs:
+            self._mkdir(self.home / directory)
+
+        remaining = max(self.spec.entries - self.created, 0)
+        downloads_budget = int(remaining * self.spec.downloads_share)
+        self.fill(self.home / "Downloads", downloads_budget)
+
+        others = [directory for directory in top_dirs if directory != "Downloads"]
+        share, extra = divmod(remaining - downloads_budget, len(others))
+        for index, directory in enumerate(others):
+            self.fill(self.home / directory, share + (index < extra))
+
+        return self.created
+
+
+def generate_home(home: Path, spec: TreeSpec | None = None) -> int:
+    """
+    create a synthetic home tree under home following spec,
+    returns the number of entries created
+    """
+
+    return _TreeBuilder(home, spec or TreeSpec()).build()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""Measure CLI import time with -X importtime and enforce a budget"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# cumulative microseconds each entry point may spend importing,
+# the best of several runs is compared so a noisy run does not fail it,
+# main is what every cron and watch run pays before doing any work
+IMPORT_BUDGET_US = {
+    "cli": 60_000,
+    "main": 150_000,
+}
+
+# modules each entry point must not import, only the paths that use them do
+LAZY_MODULES = {
+    # never imported just to build the parser
+    "cli": (
+        "main",
+        "app.file_organizer",
+        "app.executor",
+        "app.journal",
+        "app.watcher",
+        "app.pipeline",
+        "concurrent.futures",
+        "logging.handlers",
+    ),
+    # only batch, watch and pipeline runs or a Downloads holding archives
+    # need these, not every single-home run
+    "main": (
+        "app.batch",
+        "app.watcher",
+        "app.pipeline",
+        "asyncio",
+        "multiprocessing",
+        "concurrent.futures.process",
+        "tarfile",
+        "zipfile",
+    ),
+}
+
+
+def _run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_time_us(module: str, runs: int = 5) -> int:
+    """best cumulative import time of module over runs fresh interpreters"""
+
+    best = None
+    for _ in range(runs):
+        result = _run_python("-X", "importtime", "-c", f"import {module}")
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = [field.strip() for field in line.split("|")]
+            if len(fields) == 3 and fields[2] == module:
+                cumulative = int(fields[1])
+                best = cumulative if best is None else min(best, cumulative)
+    if best is None:
+        raise RuntimeError(f"no importtime line for {module}")
+    return best
+
+
+def imported_modules(module: str) -> set[str]:
+    """every module loaded by importing module in a fresh interpreter"""
+
+    code = f"import json, sys; import {module}; print(json.dumps(list(sys.modules)))"
+    return set(json.loads(_run_python("-c", code).stdout))
+
+
+def main() -> int:
+    failed = False
+    for module, budget in IMPORT_BUDGET_US.items():
+        took = import_time_us(module)
+        eager = sorted(set(LAZY_MODULES[module]) & imported_modules(module))
+        over = took > budget or eager
+        failed = failed or bool(over)
+        print(f"{module:<8} {took / 1000:8.1f}ms  budget {budget / 1000:.1f}ms")
+        if eager:
+            print(f"         eagerly imports {', '.join(eager)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
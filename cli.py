@@ -3,16 +3,37 @@
 """For cli setup and running main."""
 
 import argparse
+import math
 import sys
-from logging import FileHandler, StreamHandler
 from pathlib import Path
 
-from main import main
-from tests.logger import get_prod_logger
+from app import stats
+from app.collisions import COLLISION_POLICIES, COLLISION_RENAME
+from app.duplicates import DUPLICATE_MOVE, DUPLICATE_POLICIES
+
+SIZE_MULTIPLIERS = {"K": 1024, "M": 1024**2, "G": 1024**3}
+
+
+def parse_size(value: str) -> int:
+    """bytes in a size such as 500, 10K, 1.5M or 2G"""
+
+    number = value.strip().upper().removesuffix("B").removesuffix("I")
+    multiplier = SIZE_MULTIPLIERS.get(number[-1:], 1)
+    if multiplier != 1:
+        number = number[:-1]
+    try:
+        size = float(number) * multiplier
+        # inf and nan parse as floats but are no size at all
+        if not math.isfinite(size):
+            raise ValueError(value)
+        size = int(size)
+    except (ValueError, OverflowError):
+        raise argparse.ArgumentTypeError(f"invalid size {value!r}") from None
+    if size < 0:
+        raise argparse.ArgumentTypeError(f"invalid size {value!r}")
+    return size
 
 
-# TODO: write integration test for cli
-# TODO: add functionality for excluding certain directories from cleanup
 def cli():
     parser = argparse.ArgumentParser()
 
@@ -24,35 +45,386 @@ def cli():
         "-t",
         "--trash-flag",
         action="store_true",
-        help="automatically delete compressed files from Downloads",
+        help="move compressed files in Downloads to the trash",
+    )
+    parser.add_argument(
+        "-y",
+        "--yes",
+        action="store_true",
+        help="trash compressed files without asking, for cron and other scripts",
+    )
+    parser.add_argument(
+        "--trash-older-than",
+        action="store",
+        type=float,
+        default=0,
+        metavar="DAYS",
+        help="only trash compressed files last modified at least DAYS ago",
+    )
+    parser.add_argument(
+        "--trash-larger-than",
+        action="store",
+        type=parse_size,
+        default=0,
+        metavar="SIZE",
+        help="only trash compressed files of at least SIZE, such as 500K or 1G",
+    )
+    parser.add_argument(
+        "--trash-ext",
+        action="append",
+        metavar="SUFFIX",
+        help="trash files ending in SUFFIX instead of every archive, repeatable",
     )
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="show verbose output"
     )
+    parser.add_argument(
+        "-n",
+        "--dry-run",
+        action="store_true",
+        help="print the planned moves without touching the disk",
+    )
+    parser.add_argument(
+        "--device-workers",
+        action="store",
+        type=int,
+        default=2,
+        help="concurrent cross-device copies allowed per disk",
+    )
+    parser.add_argument(
+        "--scan-workers",
+        action="store",
+        type=int,
+        default=1,
+        help="directories listed at once, raise it for NFS and other slow mounts",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="skip directories unchanged since the last run, still stats "
+        "each of their subdirectories to notice a new .git",
+    )
+    parser.add_argument(
+        "--state-file",
+        action="store",
+        type=Path,
+        help="state file used by --incremental",
+    )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="keep running and route new items in home, Downloads and Desktop",
+    )
+    parser.add_argument(
+        "--debounce",
+        action="store",
+        type=float,
+        default=1.0,
+        help="seconds of quiet before a batch of watched changes is routed",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="overlap scanning, classifying and moving in an asyncio pipeline",
+    )
+    parser.add_argument(
+        "--duplicates",
+        action="store",
+        choices=DUPLICATE_POLICIES,
+        default=DUPLICATE_MOVE,
+        help="what to do with files already present byte for byte at their destination",
+    )
+    parser.add_argument(
+        "--on-collision",
+        action="store",
+        choices=COLLISION_POLICIES,
+        default=COLLISION_RENAME,
+        help="rename an item whose name is taken at its destination, or abort the run",
+    )
+    parser.add_argument(
+        "--journal",
+        action="store",
+        type=Path,
+        help="journal recording every move, used by --undo",
+    )
+    parser.add_argument(
+        "--no-journal",
+        action="store_true",
+        help="do not record moves, the run cannot be undone",
+    )
+    parser.add_argument(
+        "--undo",
+        action="store_true",
+        help="move everything the last run, or watched batch, moved back",
+    )
+    parser.add_argument(
+        "--max-depth",
+        action="store",
+        type=int,
+        default=1,
+        help="how many levels below each home directory items are routed from",
+    )
+    parser.add_argument(
+        "--active-window",
+        action="store",
+        type=float,
+        default=900,
+        help="seconds since a repository's last git activity before it may be moved",
+    )
+    parser.add_argument(
+        "-x",
+        "--exclude",
+        action="append",
+        metavar="PATTERN",
+        help="gitignore-style pattern of paths below home to leave alone, repeatable",
+    )
+    parser.add_argument(
+        "--exclude-file",
+        action="store",
+        type=Path,
+        help="file of exclusion patterns, one per line",
+    )
+    parser.add_argument(
+        "--roots",
+        action="store",
+        nargs="+",
+        metavar="ROOT",
+        help="organize these home directories (paths or globs such as '/home/*') "
+        "instead of your own, each on a worker process",
+    )
+    parser.add_argument(
+        "--batch-workers",
+        action="store",
+        type=int,
+        default=4,
+        help="roots organized at once with --roots",
+    )
+    parser.add_argument(
+        "--roots-per-device",
+        action="store",
+        type=int,
+        default=2,
+        help="roots on the same disk organized at once with --roots",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store",
+        nargs="?",
+        const=stats.STATS_TABLE,
+        choices=stats.STATS_FORMATS,
+        help="print time spent per stage and syscall counters, as a table or json",
+    )
     parser.add_argument(
         "-l",
         "--log",
         action="store",
-        type=argparse.FileType("wt"),
+        type=Path,
         help="output logs to file specified",
     )
 
     args = parser.parse_args()
+    if args.max_depth < 1:
+        parser.error("--max-depth must be at least 1")
+    if args.exclude_file is not None and not args.exclude_file.is_file():
+        parser.error(f"--exclude-file {args.exclude_file} does not exist")
+    # every root keeps its own state, journal and exclude file
+    batch_conflicts = [
+        option
+        for option, value in [
+            # workers cannot ask for confirmation
+            ("--trash-flag without --yes", args.trash_flag and not args.yes),
+            ("--undo", args.undo),
+            ("--watch", args.watch),
+            ("--pipeline", args.pipeline),
+            ("--log", args.log),
+            ("--state-file", args.state_file),
+            ("--journal", args.journal),
+            ("--exclude-file", args.exclude_file),
+        ]
+        if value
+    ]
+    if args.roots and batch_conflicts:
+        parser.error(f"--roots cannot be combined with {', '.join(batch_conflicts)}")
+    # watch mode routes as things arrive, there is nothing to preview,
+    # no full run to save state for and nobody to confirm trashing
+    watch_conflicts = [
+        option
+        for option, value in [
+            ("--dry-run", args.dry_run),
+            ("--trash-flag", args.trash_flag),
+            ("--incremental", args.incremental),
+        ]
+        if value
+    ]
+    if args.watch and watch_conflicts:
+        parser.error(f"--watch cannot be combined with {', '.join(watch_conflicts)}")
+    # the pipeline moves items as soon as they are classified, looking
+    # only at the top level of each directory and moving on a single thread
+    pipeline_conflicts = [
+        option
+        for option, value in [
+            ("--dry-run", args.dry_run),
+            ("--duplicates", args.duplicates != DUPLICATE_MOVE),
+            ("--incremental", args.incremental),
+            ("--max-depth", args.max_depth != parser.get_default("max_depth")),
+            (
+                "--device-workers",
+                args.device_workers != parser.get_default("device_workers"),
+            ),
+            ("--scan-workers", args.scan_workers != parser.get_default("scan_workers")),
+        ]
+        if value
+    ]
+    if args.pipeline and pipeline_conflicts:
+        parser.error(
+            f"--pipeline cannot be combined with {', '.join(pipeline_conflicts)}"
+        )
+    if args.trash_older_than < 0:
+        parser.error("--trash-older-than cannot be negative")
+    if (
+        min(
+            args.batch_workers,
+            args.roots_per_device,
+            args.scan_workers,
+            args.device_workers,
+        )
+        < 1
+    ):
+        parser.error(
+            "--batch-workers, --roots-per-device, --scan-workers and "
+            "--device-workers must be at least 1"
+        )
+
+    # the organizer itself is only imported once the arguments are valid,
+    # so --help and usage errors stay cheap (see benchmarks/startup.py)
+    from app.archives import ARCHIVE_SUFFIXES
+    from app.exclusions import default_exclude_path, read_exclude_file
+    from app.journal import default_journal_path
+    from app.logger import setup_prod_logging
+    from app.repos import default_repo_cache_path
+    from app.state import default_state_path
+    from app.trash import TrashPolicy
 
     # set flags
     desktop_flag = args.desktop_flag
     trash_flag = args.trash_flag
+    # --trash-ext replaces the archive suffixes rather than adding to them
+    suffixes = ARCHIVE_SUFFIXES
+    if args.trash_ext:
+        suffixes = tuple(
+            ("" if ext.startswith(".") else ".") + ext.lower()
+            for ext in args.trash_ext
+        )
+    trash_policy = TrashPolicy(args.trash_older_than, args.trash_larger_than, suffixes)
+
+    state_path = args.state_file
+    if args.incremental and state_path is None:
+        state_path = default_state_path()
+
+    journal_path = args.journal or default_journal_path()
+
+    exclude_patterns = read_exclude_file(args.exclude_file or default_exclude_path())
+    exclude_patterns += args.exclude or []
+
+    # records are written on a background thread, off the move loop
+    log_listener = setup_prod_logging(args.verbose, args.log)
+
+    if args.roots:
+        from app.batch import expand_roots
+        from main import batch_main
+
+        try:
+            results = batch_main(
+                expand_roots(args.roots),
+                args.batch_workers,
+                args.roots_per_device,
+                args.stats,
+                desktop_flag=desktop_flag,
+                trash_flag=trash_flag,
+                trash_policy=trash_policy,
+                dry_run=args.dry_run,
+                verbose=args.verbose,
+                incremental=args.incremental,
+                journal=not args.no_journal,
+                exclude_patterns=args.exclude,
+                device_workers=args.device_workers,
+                scan_workers=args.scan_workers,
+                duplicate_policy=args.duplicates,
+                collision_policy=args.on_collision,
+                max_depth=args.max_depth,
+                active_window=args.active_window,
+            )
+        finally:
+            log_listener.stop()
+        if any(result.error is not None for result in results):
+            sys.exit(1)
+        return
+
+    run_stats = stats.enable() if args.stats else None
+    try:
+        if args.undo:
+            from main import undo_main
+
+            undo_main(journal_path, args.dry_run)
+            return
+
+        if args.watch:
+            from main import watch_main
+
+            watch_main(
+                desktop_flag=desktop_flag,
+                debounce=args.debounce,
+                device_workers=args.device_workers,
+                journal_path=None if args.no_journal else journal_path,
+                exclude_patterns=exclude_patterns,
+                active_window=args.active_window,
+                duplicate_policy=args.duplicates,
+                collision_policy=args.on_collision,
+                max_depth=args.max_depth,
+            )
+            return
 
-    logger = get_prod_logger(args.verbose)
+        if args.pipeline:
+            from main import pipeline_main
 
-    if args.log:
-        if not Path(args.log).exists():
-            Path(args.log).touch()
+            pipeline_main(
+                desktop_flag=desktop_flag,
+                trash_flag=trash_flag,
+                collision_policy=args.on_collision,
+                trash_policy=trash_policy,
+                assume_yes=args.yes,
+                journal_path=None if args.no_journal else journal_path,
+                exclude_patterns=exclude_patterns,
+                active_window=args.active_window,
+            )
+            return
 
-        logger.removeHandler(StreamHandler(sys.stdout))
-        logger.addHandler(FileHandler(args.log))
+        from main import main
 
-    main(desktop_flag=desktop_flag, trash_flag=trash_flag)
+        main(
+            desktop_flag=desktop_flag,
+            trash_flag=trash_flag,
+            dry_run=args.dry_run,
+            device_workers=args.device_workers,
+            state_path=state_path,
+            duplicate_policy=args.duplicates,
+            collision_policy=args.on_collision,
+            journal_path=None if args.no_journal else journal_path,
+            max_depth=args.max_depth,
+            exclude_patterns=exclude_patterns,
+            scan_workers=args.scan_workers,
+            repo_cache_path=default_repo_cache_path(),
+            active_window=args.active_window,
+            trash_policy=trash_policy,
+            assume_yes=args.yes,
+        )
+    finally:
+        log_listener.stop()
+        if run_stats is not None:
+            stats.disable()
+            print(run_stats.format(args.stats))
 
 
 if __name__ == "__main__":
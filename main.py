@@ -1,43 +1,351 @@
 """For running all funnels in an integrated fashion."""
 
+import functools
+import json
+import logging
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from app import file_organizer as fo
+from app import stats
+from app.exclusions import ExclusionMatcher, default_exclude_path, read_exclude_file
+from app.journal import MoveJournal, default_journal_path, undo_last_run
+from app.logger import setup_prod_logging
+from app.repos import ACTIVE_WINDOW, RepoIndex, default_repo_cache_path
+from app.state import RunState, default_state_path
+from app.trash import Trash, TrashPolicy, default_trash_dir
 
+# the process pool is only loaded by batch runs, not by every single-home run
+if TYPE_CHECKING:
+    from app.batch import RootResult
 
-def main(desktop_flag: bool, trash_flag: bool):
-    my_dirs = [
-        "Projects",
-        "Hackathons",
-        "Documents",
-        "Desktop",
-        "Fonts",
-        "Templates",
-        "3D Models",
-        "Hacking",
-        "Powerhouse_Vault",
-        "Obsidian_Plugin_Sandbox",
-        "Pictures",
-        "Music",
-        "Downloads",
-        "Arduino",
-        "anaconda3",
-        "Videos",
-        "Backups",
-        "Research",
-        "College",
-    ]
-    home_path = Path().home()
+logger = logging.getLogger("Prod Logger")
+
+MY_DIRS = [
+    "Projects",
+    "Hackathons",
+    "Documents",
+    "Desktop",
+    "Fonts",
+    "Templates",
+    "3D Models",
+    "Hacking",
+    "Powerhouse_Vault",
+    "Obsidian_Plugin_Sandbox",
+    "Pictures",
+    "Music",
+    "Downloads",
+    "Arduino",
+    "anaconda3",
+    "Videos",
+    "Backups",
+    "Research",
+    "College",
+]
+
+
+def main(
+    desktop_flag: bool,
+    trash_flag: bool,
+    dry_run: bool = False,
+    device_workers: int = fo.DEVICE_WORKERS,
+    state_path: Path | None = None,
+    duplicate_policy: str = fo.DUPLICATE_MOVE,
+    collision_policy: str = fo.COLLISION_RENAME,
+    journal_path: Path | None = None,
+    max_depth: int = fo.DEFAULT_MAX_DEPTH,
+    exclude_patterns: list[str] | None = None,
+    repo_cache_path: Path | None = None,
+    active_window: float = ACTIVE_WINDOW,
+    home: Path | None = None,
+    scan_workers: int = fo.SCAN_WORKERS,
+    trash_policy: TrashPolicy | None = None,
+    assume_yes: bool = False,
+):
+    home_path = home or Path().home()
+    # excluded subtrees are never listed, let alone moved
+    exclusions = ExclusionMatcher(home_path, exclude_patterns or ())
+
+    # repositories are probed once, reusing what earlier runs learned
+    if repo_cache_path is None:
+        repos = RepoIndex(active_window=active_window)
+    else:
+        repos = RepoIndex.load(repo_cache_path, active_window)
+
+    if dry_run:
+        # plan against home as it is now, nothing is created, moved or deleted
+        with stats.span("snapshot"):
+            snapshot = fo.take_home_snapshot(
+                home_path, None, exclusions, repos, scan_workers
+            )
+        plan = fo.plan_run(
+            home_path,
+            desktop_flag,
+            snapshot,
+            duplicate_policy,
+            collision_policy,
+            max_depth,
+            exclusions,
+            repos,
+        )
+        if trash_flag:
+            fo.plan_trash(home_path, plan, trash_policy, exclusions)
+        print(plan.describe())
+        return plan
 
     # first create directories if they don't already exist
-    fo.create_required_dirs(my_dirs, home_path)
-
-    # run funnels with desktop flag applied,
-    # True or False determined in cli.py
-    fo.research_dir_funnel(home_path, desktop_flag)
-    fo.college_dir_funnel(home_path, desktop_flag)
-    fo.hackathon_dir_funnel(home_path, desktop_flag)
-    fo.projects_dir_funnel(home_path, desktop_flag)
-    fo.backups_dir_funnel(home_path, desktop_flag)
-    fo.cleanup_downloads_dir(home_path)
-    fo.del_zip_files(home_path, trash_flag)
+    fo.create_required_dirs(MY_DIRS, home_path)
+
+    # with a state file, directories unchanged since the last run are reused
+    state = None
+    if state_path is not None:
+        state = RunState.load(
+            state_path, fo.run_config(desktop_flag, duplicate_policy, exclusions)
+        )
+
+    # scan home once, planning works from (and updates) this snapshot
+    with stats.span("snapshot"):
+        snapshot = fo.take_home_snapshot(
+            home_path, state, exclusions, repos, scan_workers
+        )
+
+    # plan every move with desktop flag applied, True or False determined
+    # in cli.py and rule priority in app/rules.py, then apply the whole plan
+    plan = fo.plan_run(
+        home_path,
+        desktop_flag,
+        snapshot,
+        duplicate_policy,
+        collision_policy,
+        max_depth,
+        exclusions,
+        repos,
+    )
+    # with a journal every move is recorded so the run can be undone
+    journal = None if journal_path is None else MoveJournal(journal_path)
+    with stats.span("apply"):
+        fo.apply_plan(plan, main.__name__, device_workers, journal)
+    with stats.span("del_zip_files"):
+        # trashed in home's own trash when organizing someone else's home
+        trash = Trash(default_trash_dir(home))
+        fo.del_zip_files(
+            home_path,
+            trash_flag,
+            snapshot,
+            trash_policy,
+            assume_yes,
+            trash,
+            exclusions,
+        )
+
+    if state is not None:
+        with stats.span("record_state"):
+            fo.record_run_state(home_path, snapshot, plan, state)
+            state.save(state_path)
+
+    if repo_cache_path is not None:
+        repos.save(repo_cache_path)
+
+    return plan
+
+
+def organize_root(
+    root: Path,
+    desktop_flag: bool = False,
+    trash_flag: bool = False,
+    dry_run: bool = False,
+    verbose: bool = False,
+    incremental: bool = False,
+    journal: bool = True,
+    exclude_patterns: list[str] | None = None,
+    **options,
+) -> "RootResult":
+    """
+    organize root as its owner in a batch worker process, with state,
+    journal, repository cache and exclusions kept in root's own
+    .local/state (exclude_patterns apply on top of root's exclusions),
+    any failure is returned rather than raised
+    """
+
+    from app.batch import RootResult, drop_privileges
+
+    drop_privileges(root)
+    log_listener = setup_prod_logging(verbose)
+    run_stats = stats.enable()
+    result = RootResult(root)
+    start = time.perf_counter()
+    try:
+        plan = main(
+            desktop_flag=desktop_flag,
+            trash_flag=trash_flag,
+            # workers have no terminal to confirm on, cli.py requires --yes
+            assume_yes=True,
+            dry_run=dry_run,
+            state_path=default_state_path(root) if incremental else None,
+            journal_path=default_journal_path(root) if journal else None,
+            exclude_patterns=read_exclude_file(default_exclude_path(root))
+            + (exclude_patterns or []),
+            repo_cache_path=None if dry_run else default_repo_cache_path(root),
+            home=root,
+            **options,
+        )
+        result.moves = len(plan)
+        result.deferred = len(plan.deferred)
+    except Exception as error:
+        result.error = f"{type(error).__name__}: {error}"
+        logger.error("Error in organize_root for %s: %s", root, result.error)
+    finally:
+        result.seconds = time.perf_counter() - start
+        result.stats = run_stats.as_dict()
+        stats.disable()
+        log_listener.stop()
+    return result
+
+
+def batch_main(
+    roots: list[Path],
+    workers: int | None = None,
+    per_device: int | None = None,
+    stats_format: str | None = None,
+    **options,
+) -> list["RootResult"]:
+    """
+    organize every root on a process pool, a root failing does not stop
+    the others, prints one summary line per root, and each root's stats
+    when stats_format is set, workers and per_device default to those
+    of app.batch
+    """
+
+    from app.batch import BATCH_WORKERS, ROOTS_PER_DEVICE, run_batch
+
+    if workers is None:
+        workers = BATCH_WORKERS
+    if per_device is None:
+        per_device = ROOTS_PER_DEVICE
+
+    results = run_batch(
+        roots, functools.partial(organize_root, **options), workers, per_device
+    )
+
+    if stats_format == stats.STATS_JSON:
+        print(
+            json.dumps(
+                {
+                    str(result.root): {
+                        "moves": result.moves,
+                        "deferred": result.deferred,
+                        "seconds": result.seconds,
+                        "error": result.error,
+                    }
+                    | result.stats
+                    for result in results
+                },
+                indent=2,
+            )
+        )
+        return results
+
+    for result in results:
+        print(result.summary())
+        if stats_format is not None and result.stats:
+            print(stats.RunStats.from_dict(result.stats).table(), end="\n\n")
+    return results
+
+
+def undo_main(journal_path: Path, dry_run: bool = False):
+    """
+    move everything the last journaled run moved back where it came
+    from, with dry_run only print the moves that would be reversed
+    """
+
+    undone = undo_last_run(journal_path, dry_run)
+    if dry_run:
+        for op in undone:
+            print(f"[undo {op.reason}] {op.destination} -> {op.source}")
+        print(f"Would undo {len(undone)} moves")
+        return undone
+    print(f"Undid {len(undone)} moves")
+    return undone
+
+
+def watch_main(
+    desktop_flag: bool,
+    debounce: float = 1.0,
+    device_workers: int = fo.DEVICE_WORKERS,
+    journal_path: Path | None = None,
+    exclude_patterns: list[str] | None = None,
+    active_window: float = ACTIVE_WINDOW,
+    duplicate_policy: str = fo.DUPLICATE_MOVE,
+    collision_policy: str = fo.COLLISION_RENAME,
+    max_depth: int = fo.DEFAULT_MAX_DEPTH,
+):
+    """
+    long-running alternative to main, routes items as they
+    land in home, Downloads and (with desktop_flag) Desktop,
+    each batch routed is journaled as its own run
+    """
+
+    from app.watcher import watch_home
+
+    home_path = Path().home()
+    fo.create_required_dirs(MY_DIRS, home_path)
+    watch_home(
+        home_path,
+        desktop_flag,
+        debounce,
+        device_workers,
+        journal_path=journal_path,
+        exclusions=ExclusionMatcher(home_path, exclude_patterns or ()),
+        active_window=active_window,
+        duplicate_policy=duplicate_policy,
+        collision_policy=collision_policy,
+        max_depth=max_depth,
+    )
+
+
+def pipeline_main(
+    desktop_flag: bool,
+    trash_flag: bool,
+    collision_policy: str = fo.COLLISION_RENAME,
+    trash_policy: TrashPolicy | None = None,
+    assume_yes: bool = False,
+    journal_path: Path | None = None,
+    exclude_patterns: list[str] | None = None,
+    active_window: float = ACTIVE_WINDOW,
+):
+    """
+    alternative to main that overlaps scanning, classifying and moving
+    in an asyncio pipeline, when aborting on collisions conflicting moves
+    are skipped rather than stopping the run and reported once everything
+    else has moved
+    """
+
+    import asyncio
+
+    from app.pipeline import run_pipeline
+
+    home_path = Path().home()
+    fo.create_required_dirs(MY_DIRS, home_path)
+    journal = None if journal_path is None else MoveJournal(journal_path)
+    exclusions = ExclusionMatcher(home_path, exclude_patterns or ())
+    plan = asyncio.run(
+        run_pipeline(
+            home_path,
+            desktop_flag,
+            collision_policy=collision_policy,
+            journal=journal,
+            exclusions=exclusions,
+            repos=RepoIndex(active_window=active_window),
+        )
+    )
+    fo.del_zip_files(
+        home_path,
+        trash_flag,
+        policy=trash_policy,
+        assume_yes=assume_yes,
+        # your own trash, under $XDG_DATA_HOME as in main
+        trash=Trash(default_trash_dir()),
+        exclusions=exclusions,
+    )
+    return plan
@@ -0,0 +1,206 @@
+#!/usr/bin/python3
+
+"""Tests for archives"""
+
+import io
+import os
+import tarfile
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import app.file_organizer as fo
+from app.archives import (
+    ReadLimitReached,
+    archive_suffix,
+    classify_archive,
+    classify_members,
+    is_archive,
+    tar_member_names,
+    zip_member_names,
+)
+
+EXT_DIR_MAP = {".png": "Pictures", ".jpg": "Pictures", ".stl": "3D Models"}
+
+
+def make_zip(path: Path, members: dict[str, bytes]) -> Path:
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return path
+
+
+def make_tar(path: Path, members: dict[str, bytes], mode: str = "w:xz") -> Path:
+    with tarfile.open(path, mode) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return path
+
+
+class CountingFile(io.FileIO):
+    """a file that remembers how many bytes were read from it"""
+
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+@pytest.mark.parametrize(
+    "name, suffix",
+    [
+        ("photos.zip", ".zip"),
+        ("PHOTOS.ZIP", ".zip"),
+        ("models.tar.xz", ".tar.xz"),
+        ("source.tgz", ".tgz"),
+        ("package.deb", ".deb"),
+        ("my.zipper.txt", None),
+        ("notes.tar.gz.txt", None),
+        (".zip", None),
+    ],
+)
+def test_archive_suffix(name, suffix):
+    assert archive_suffix(name) == suffix
+    assert is_archive(name) is (suffix is not None)
+
+
+def test_zip_of_images_is_pictures(tmp_path):
+    archive = make_zip(
+        tmp_path / "holiday.zip",
+        {
+            "holiday/": b"",
+            "holiday/beach.png": b"png",
+            "holiday/sunset.JPG": b"jpg",
+            "holiday/.DS_Store": b"",
+            "__MACOSX/holiday/._beach.png": b"",
+        },
+    )
+
+    assert classify_archive(archive, EXT_DIR_MAP) == "Pictures"
+
+
+def test_tar_xz_of_models_is_3d_models(tmp_path):
+    archive = make_tar(
+        tmp_path / "printables.tar.xz",
+        {"parts/gear.stl": b"solid gear", "parts/axle.stl": b"solid axle"},
+    )
+
+    assert classify_archive(archive, EXT_DIR_MAP) == "3D Models"
+
+
+@pytest.mark.parametrize(
+    "members",
+    [
+        {"beach.png": b"png", "gear.stl": b"solid"},
+        {"beach.png": b"png", "setup.exe": b"MZ"},
+        {},
+    ],
+)
+def test_mixed_unknown_or_empty_archives_stay(tmp_path, members):
+    archive = make_zip(tmp_path / "mixed.zip", members)
+    assert classify_archive(archive, EXT_DIR_MAP) is None
+
+
+def test_corrupt_archives_stay(tmp_path):
+    (tmp_path / "broken.zip").write_bytes(b"PK\x03\x04 not really")
+    (tmp_path / "broken.tar.gz").write_bytes(b"\x1f\x8b not really")
+
+    assert classify_archive(tmp_path / "broken.zip", EXT_DIR_MAP) is None
+    assert classify_archive(tmp_path / "broken.tar.gz", EXT_DIR_MAP) is None
+
+
+@pytest.mark.parametrize("suffix", [".tar", ".tar.gz", ".tar.bz2", ".tar.xz", ".tgz"])
+def test_large_junk_tars_stay_quickly(tmp_path, suffix):
+    junk = tmp_path / f"junk{suffix}"
+    junk.write_bytes(os.urandom(16 * 1024 * 1024))
+
+    start = time.perf_counter()
+    assert classify_archive(junk, EXT_DIR_MAP) is None
+    assert time.perf_counter() - start < 0.5
+
+
+def test_tar_read_stops_at_limit(tmp_path):
+    members = {f"scan{index}.png": os.urandom(1024 * 1024) for index in range(4)}
+    archive = make_tar(tmp_path / "scans.tar.gz", members, "w:gz")
+
+    with pytest.raises(ReadLimitReached):
+        list(tar_member_names(archive, limit=1024 * 1024))
+    # unsure rather than routed on the first members alone
+    assert classify_archive(archive, EXT_DIR_MAP) is None
+    assert list(tar_member_names(archive, limit=8 * 1024 * 1024)) == list(members)
+
+
+def test_tar_is_read_as_its_suffix_says(tmp_path):
+    archive = make_tar(tmp_path / "printables.tar.gz", {"gear.stl": b"solid"}, "w:xz")
+
+    assert classify_archive(archive, EXT_DIR_MAP) is None
+
+
+def test_classify_members_stops_once_confident():
+    consumed = []
+
+    def names():
+        for index in range(1000):
+            consumed.append(index)
+            yield f"img{index}.png"
+
+    assert classify_members(names(), EXT_DIR_MAP, sample=8) == "Pictures"
+    assert len(consumed) == 8
+
+
+def test_classify_members_stops_at_first_disagreement():
+    consumed = []
+
+    def names():
+        for name in ["a.png", "b.stl"] + [f"c{index}.png" for index in range(100)]:
+            consumed.append(name)
+            yield name
+
+    assert classify_members(names(), EXT_DIR_MAP) is None
+    assert consumed == ["a.png", "b.stl"]
+
+
+def test_zip_member_names_skip_member_data(tmp_path):
+    members = {f"scan{index}.png": os.urandom(1024 * 1024) for index in range(3)}
+    archive = tmp_path / "scans.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as output:
+        for name, data in members.items():
+            output.writestr(name, data)
+
+    with CountingFile(archive) as file:
+        names = list(zip_member_names(file))
+
+    assert names == list(members)
+    # the tail holding the central directory, none of the 3 MiB of members
+    assert file.bytes_read < 100 * 1024
+
+
+def test_zip_member_names_with_prepended_stub(tmp_path):
+    make_zip(tmp_path / "inner.zip", {"beach.png": b"png"})
+    archive = tmp_path / "installer.zip"
+    archive.write_bytes(b"#!/bin/sh stub\n" + (tmp_path / "inner.zip").read_bytes())
+
+    with open(archive, "rb") as file:
+        assert list(zip_member_names(file)) == ["beach.png"]
+
+
+def test_plan_downloads_routes_archives_by_contents(tmp_path):
+    for directory in ["Downloads", "Pictures", "3D Models"]:
+        (tmp_path / directory).mkdir()
+    downloads = tmp_path / "Downloads"
+    make_zip(downloads / "holiday.zip", {"beach.png": b"png"})
+    make_tar(downloads / "printables.tar.xz", {"gear.stl": b"solid"})
+    make_zip(downloads / "mixed.zip", {"beach.png": b"png", "setup.exe": b"MZ"})
+
+    plan = fo.plan_downloads(tmp_path)
+
+    assert {op.source.name: op.destination.parent.name for op in plan} == {
+        "holiday.zip": "Pictures",
+        "printables.tar.xz": "3D Models",
+    }
@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+
+"""Tests for batch"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import cli
+import main
+from app.batch import RootResult, expand_roots, run_batch
+
+
+def timed_task(root: Path) -> RootResult:
+    start = time.monotonic()
+    time.sleep(0.2)
+    (root / "interval").write_text(f"{start} {time.monotonic()}")
+    return RootResult(root, moves=1)
+
+
+def failing_task(root: Path) -> RootResult:
+    if root.name == "broken":
+        raise OSError("disk on fire")
+    return RootResult(root, moves=1)
+
+
+def crashing_task(root: Path) -> RootResult:
+    if root.name == "crash":
+        os._exit(3)
+    time.sleep(0.1)
+    return RootResult(root, moves=1)
+
+
+def make_home(root: Path) -> Path:
+    for directory in ["Desktop", "Downloads", "Documents", "Backups"]:
+        (root / directory).mkdir(parents=True)
+    (root / "Downloads" / "notes.txt").touch()
+    (root / "Downloads" / "recovery-key.txt").touch()
+    return root
+
+
+def test_expand_roots(tmp_path):
+    for name in ["alice", "bob"]:
+        (tmp_path / name).mkdir()
+    (tmp_path / "README").touch()
+
+    roots = expand_roots([str(tmp_path / "*"), str(tmp_path / "alice")])
+
+    assert roots == [tmp_path / "alice", tmp_path / "bob"]
+
+
+def test_run_batch_limits_roots_per_device(tmp_path):
+    roots = [tmp_path / name for name in ["a", "b", "c"]]
+    for root in roots:
+        root.mkdir()
+
+    results = run_batch(roots, timed_task, workers=3, per_device=1)
+
+    assert [result.root for result in results] == roots
+    intervals = sorted(
+        tuple(map(float, (root / "interval").read_text().split())) for root in roots
+    )
+    for (_, end), (start, _) in zip(intervals, intervals[1:]):
+        assert end <= start
+
+
+def test_run_batch_isolates_failures(tmp_path):
+    roots = [tmp_path / name for name in ["good", "broken", "fine"]]
+    for root in roots:
+        root.mkdir()
+
+    results = run_batch(roots, failing_task, workers=2)
+
+    assert [result.error for result in results] == [
+        None,
+        "OSError: disk on fire",
+        None,
+    ]
+
+
+def test_run_batch_survives_a_dying_process(tmp_path):
+    names = ["a", "b", "crash", "c", "d"]
+    roots = [tmp_path / name for name in names]
+    for root in roots:
+        root.mkdir()
+
+    results = run_batch(roots, crashing_task, workers=3, per_device=3)
+
+    assert [result.root for result in results] == roots
+    errors = {result.root.name: result.error for result in results}
+    assert errors.pop("crash").startswith("BrokenProcessPool")
+    assert set(errors.values()) == {None}
+    assert all(result.moves == 1 for result in results if result.error is None)
+
+
+def test_batch_main_organizes_each_root(tmp_path, capsys):
+    alice = make_home(tmp_path / "alice")
+    bob = make_home(tmp_path / "bob")
+    (bob / "Documents" / "notes.txt").touch()
+
+    results = main.batch_main(
+        [alice, bob], workers=2, stats_format="json", collision_policy="abort"
+    )
+
+    assert (alice / "Documents" / "notes.txt").exists()
+    assert (alice / "Backups" / "recovery-key.txt").exists()
+    assert (alice / ".local" / "state" / "file_organizer" / "journal.jsonl").exists()
+    # the collision aborts bob's run without touching alice's
+    assert (bob / "Downloads" / "recovery-key.txt").exists()
+
+    document = json.loads(capsys.readouterr().out)
+    assert document[str(alice)]["moves"] == 2
+    assert document[str(alice)]["counters"]["listings"] > 0
+    assert document[str(bob)]["error"].startswith("FileExistsError")
+    assert results[1].error is not None
+
+
+def test_cli_roots(tmp_path, monkeypatch, capsys):
+    make_home(tmp_path / "homes" / "alice")
+    make_home(tmp_path / "homes" / "bob")
+    monkeypatch.setattr(
+        sys, "argv", ["cli.py", "--roots", str(tmp_path / "homes" / "*")]
+    )
+
+    cli.cli()
+
+    output = capsys.readouterr().out
+    assert f"{tmp_path / 'homes' / 'alice'}: 2 moves" in output
+    assert (tmp_path / "homes" / "bob" / "Documents" / "notes.txt").exists()
+
+
+def test_cli_roots_rejects_interactive_options(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["cli.py", "--roots", str(tmp_path), "-t"])
+
+    with pytest.raises(SystemExit):
+        cli.cli()
+
+
+def test_single_home_run_does_not_load_the_process_pool():
+    from benchmarks.startup import imported_modules
+
+    loaded = imported_modules("main")
+
+    assert "app.batch" not in loaded
+    assert "concurrent.futures.process" not in loaded
@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+
+"""Tests for benchmarks"""
+
+import os
+
+from benchmarks.bench import compare, run_suite
+from benchmarks.home_tree import TreeSpec, generate_home
+
+
+def count_entries(home):
+    return sum(len(dirs) + len(files) for _, dirs, files in os.walk(home))
+
+
+def test_generate_home_reaches_requested_size(tmp_path):
+    created = generate_home(tmp_path / "home", TreeSpec(entries=500))
+
+    assert created == count_entries(tmp_path / "home")
+    assert created == 500
+    assert (tmp_path / "home" / "Downloads").exists()
+
+
+def test_generate_home_is_deterministic(tmp_path):
+    generate_home(tmp_path / "a", TreeSpec(entries=300, seed=7))
+    generate_home(tmp_path / "b", TreeSpec(entries=300, seed=7))
+
+    def listing(home):
+        return sorted(str(path.relative_to(home)) for path in home.rglob("*"))
+
+    assert listing(tmp_path / "a") == listing(tmp_path / "b")
+
+
+def test_run_suite_and_compare(tmp_path):
+    names = ["backups_dir_funnel", "main"]
+    results = run_suite(TreeSpec(entries=200), names, 1, tmp_path)
+
+    assert set(results) == {"backups_dir_funnel", "main"}
+    assert len(results["main"]["runs"]) == 1
+    assert list(tmp_path.iterdir()) == []
+    assert len(compare(results, results)) == 2
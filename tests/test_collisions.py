@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+
+"""Tests for collisions"""
+
+import pytest
+
+from app import collisions
+from app.collisions import CollisionIndex, split_name, suffixed_name
+
+
+@pytest.mark.parametrize(
+    "name, is_dir, expected",
+    [
+        ("backup.txt", False, "backup (3).txt"),
+        ("Makefile", False, "Makefile (3)"),
+        ("my.project", True, "my.project (3)"),
+        ("backup.tar.gz", False, "backup (3).tar.gz"),
+        ("Release.TAR.XZ", False, "Release (3).TAR.XZ"),
+    ],
+)
+def test_suffixed_name(name, is_dir, expected):
+    assert suffixed_name(name, 3, is_dir) == expected
+
+
+def test_split_name_keeps_directory_whole():
+    assert split_name("v1.2", is_dir=True) == ("v1.2", "")
+    assert split_name("v1.2") == ("v1", ".2")
+
+
+def test_free_name_follows_highest_suffix(tmp_path):
+    for name in ["backup.txt", "backup (1).txt", "backup (7).txt", "backup (2).pdf"]:
+        (tmp_path / name).touch()
+    index = CollisionIndex()
+
+    assert index.free_name(tmp_path / "backup.txt") == tmp_path / "backup (8).txt"
+    assert index.free_name(tmp_path / "backup.pdf") == tmp_path / "backup (3).pdf"
+
+
+def test_free_name_sees_reservations(tmp_path):
+    index = CollisionIndex()
+    index.reserve(tmp_path / "key.txt")
+    index.reserve(tmp_path / "key (1).txt")
+
+    renamed = index.free_name(tmp_path / "key.txt")
+    index.reserve(renamed)
+
+    assert renamed == tmp_path / "key (2).txt"
+    assert index.free_name(tmp_path / "key.txt") == tmp_path / "key (3).txt"
+
+
+def test_many_collisions_list_directory_once(tmp_path, monkeypatch):
+    (tmp_path / "backup.txt").touch()
+    listings = []
+    listdir = collisions.os.listdir
+    monkeypatch.setattr(
+        collisions.os, "listdir", lambda path: listings.append(path) or listdir(path)
+    )
+    index = CollisionIndex()
+
+    for number in range(1, 501):
+        renamed = index.free_name(tmp_path / "backup.txt")
+        index.reserve(renamed)
+        assert renamed.name == f"backup ({number}).txt"
+
+    assert listings == [tmp_path]
@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+
+"""Tests for copy_engine"""
+
+import errno
+import os
+
+import pytest
+
+from app import copy_engine
+from app.copy_engine import copy2, copy_file
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "source.bin"
+    path.write_bytes(os.urandom(256 * 1024) + b"tail")
+    return path
+
+
+def unsupported(*args, **kwargs):
+    raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+
+def test_copy_file_uses_a_kernel_path(source, tmp_path):
+    destination = tmp_path / "destination.bin"
+
+    method = copy_file(source, destination)
+
+    assert method in (
+        copy_engine.COPY_REFLINK,
+        copy_engine.COPY_FILE_RANGE,
+        copy_engine.COPY_SENDFILE,
+    )
+    assert destination.read_bytes() == source.read_bytes()
+
+
+def test_copy_file_falls_back_to_sendfile(source, tmp_path, monkeypatch):
+    destination = tmp_path / "destination.bin"
+    monkeypatch.setattr(copy_engine, "_reflink", lambda *args: False)
+    monkeypatch.setattr(os, "copy_file_range", unsupported)
+
+    assert copy_file(source, destination) == copy_engine.COPY_SENDFILE
+    assert destination.read_bytes() == source.read_bytes()
+
+
+def test_copy_file_falls_back_to_userspace(source, tmp_path, monkeypatch):
+    destination = tmp_path / "destination.bin"
+    monkeypatch.setattr(copy_engine, "_reflink", lambda *args: False)
+    monkeypatch.setattr(os, "copy_file_range", unsupported)
+    monkeypatch.setattr(os, "sendfile", unsupported)
+
+    assert copy_file(source, destination) == copy_engine.COPY_USERSPACE
+    assert destination.read_bytes() == source.read_bytes()
+
+
+def test_copy_file_restarts_after_partial_copy(source, tmp_path, monkeypatch):
+    destination = tmp_path / "destination.bin"
+    real_copy_file_range = os.copy_file_range
+    calls = 0
+
+    def fail_second_chunk(*args):
+        nonlocal calls
+        calls += 1
+        if calls > 1:
+            unsupported()
+        return real_copy_file_range(args[0], args[1], 1000, args[3], args[4])
+
+    monkeypatch.setattr(copy_engine, "_reflink", lambda *args: False)
+    monkeypatch.setattr(os, "copy_file_range", fail_second_chunk)
+
+    assert copy_file(source, destination) == copy_engine.COPY_SENDFILE
+    assert destination.read_bytes() == source.read_bytes()
+
+
+def test_copy_file_real_errors_propagate(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        copy_file(tmp_path / "missing", tmp_path / "destination.bin")
+
+
+def test_copy2_into_directory_keeps_metadata(source, tmp_path):
+    (tmp_path / "dest").mkdir()
+    os.utime(source, (1_000_000, 1_000_000))
+
+    copied = copy2(str(source), str(tmp_path / "dest"))
+
+    assert copied == str(tmp_path / "dest" / "source.bin")
+    assert os.stat(copied).st_mtime == 1_000_000
@@ -0,0 +1,197 @@
+#!/usr/bin/python3
+
+"""Tests for duplicates"""
+
+import os
+
+import pytest
+
+from app import duplicates
+from app import file_organizer as fo
+from app.duplicates import PARTIAL_SIZE, find_duplicates
+from app.exclusions import ExclusionMatcher
+from app.executor import execute_plan
+from app.planner import ACTION_LINK, ACTION_MOVE, ACTION_REPLACE, MoveOp, MovePlan
+
+
+@pytest.fixture
+def downloads(tmp_path):
+    (tmp_path / "Downloads").mkdir()
+    (tmp_path / "Documents").mkdir()
+    return tmp_path
+
+
+def test_find_duplicates_by_content(tmp_path):
+    (tmp_path / "dest").mkdir()
+    (tmp_path / "dest" / "paper.pdf").write_bytes(b"same bytes")
+    (tmp_path / "dest" / "other.pdf").write_bytes(b"diff bytes")
+    (tmp_path / "paper (1).pdf").write_bytes(b"same bytes")
+    (tmp_path / "fresh.pdf").write_bytes(b"brand new!")
+
+    found = find_duplicates(
+        [tmp_path / "paper (1).pdf", tmp_path / "fresh.pdf"], tmp_path / "dest"
+    )
+
+    assert found == {tmp_path / "paper (1).pdf": tmp_path / "dest" / "paper.pdf"}
+
+
+def test_find_duplicates_prefers_same_name(tmp_path):
+    (tmp_path / "dest").mkdir()
+    (tmp_path / "dest" / "a.txt").write_bytes(b"data")
+    (tmp_path / "dest" / "key.txt").write_bytes(b"data")
+    (tmp_path / "key.txt").write_bytes(b"data")
+
+    found = find_duplicates([tmp_path / "key.txt"], tmp_path / "dest")
+
+    assert found[tmp_path / "key.txt"] == tmp_path / "dest" / "key.txt"
+
+
+def test_find_duplicates_ignores_empty_files(tmp_path):
+    (tmp_path / "dest").mkdir()
+    (tmp_path / "dest" / "empty.txt").touch()
+    (tmp_path / "empty.txt").touch()
+
+    assert find_duplicates([tmp_path / "empty.txt"], tmp_path / "dest") == {}
+
+
+def test_find_duplicates_full_hash_only_for_large_matches(tmp_path, monkeypatch):
+    (tmp_path / "dest").mkdir()
+    head = os.urandom(PARTIAL_SIZE)
+    tail = os.urandom(PARTIAL_SIZE)
+    # same head, tail and size, different middle
+    (tmp_path / "dest" / "big.iso").write_bytes(head + b"a" * 10 + tail)
+    (tmp_path / "big.iso").write_bytes(head + b"b" * 10 + tail)
+    (tmp_path / "dest" / "small.txt").write_bytes(b"small")
+    (tmp_path / "small.txt").write_bytes(b"small")
+
+    hashed = []
+    full_hash = duplicates.full_hash
+    monkeypatch.setattr(
+        duplicates,
+        "full_hash",
+        lambda path: hashed.append(path.name) or full_hash(path),
+    )
+
+    found = find_duplicates(
+        [tmp_path / "big.iso", tmp_path / "small.txt"], tmp_path / "dest"
+    )
+
+    assert found == {tmp_path / "small.txt": tmp_path / "dest" / "small.txt"}
+    assert sorted(hashed) == ["big.iso", "big.iso"]
+
+
+def test_downloads_skip_duplicate(downloads):
+    (downloads / "Documents" / "paper.pdf").write_bytes(b"%PDF-1.7 body")
+    (downloads / "Downloads" / "paper (1).pdf").write_bytes(b"%PDF-1.7 body")
+    (downloads / "Downloads" / "notes.txt").write_bytes(b"notes")
+
+    plan = fo.plan_downloads(downloads, duplicate_policy="skip")
+    execute_plan(plan)
+
+    assert [op.source.name for op in plan.skipped] == ["paper (1).pdf"]
+    assert (downloads / "Downloads" / "paper (1).pdf").exists()
+    assert (downloads / "Documents" / "notes.txt").exists()
+
+
+def test_downloads_replace_duplicate(downloads):
+    (downloads / "Documents" / "paper.pdf").write_bytes(b"%PDF-1.7 body")
+    (downloads / "Downloads" / "paper.pdf").write_bytes(b"%PDF-1.7 body")
+
+    plan = fo.plan_downloads(downloads, duplicate_policy="replace")
+    assert [op.action for op in plan] == [ACTION_REPLACE]
+    plan.check()
+    execute_plan(plan)
+
+    assert not (downloads / "Downloads" / "paper.pdf").exists()
+    assert (downloads / "Documents" / "paper.pdf").read_bytes() == b"%PDF-1.7 body"
+
+
+def test_downloads_hardlink_duplicate(downloads):
+    existing = downloads / "Documents" / "paper.pdf"
+    existing.write_bytes(b"%PDF-1.7 body")
+    (downloads / "Downloads" / "paper (1).pdf").write_bytes(b"%PDF-1.7 body")
+
+    plan = fo.plan_downloads(downloads, duplicate_policy="hardlink")
+    assert [op.action for op in plan] == [ACTION_LINK]
+    execute_plan(plan)
+
+    linked = downloads / "Documents" / "paper (1).pdf"
+    assert not (downloads / "Downloads" / "paper (1).pdf").exists()
+    assert os.path.samefile(linked, existing)
+
+
+def test_backups_skip_keeps_file_out_of_downloads_funnel(downloads):
+    (downloads / "Backups").mkdir()
+    (downloads / "Backups" / "recovery-key.txt").write_bytes(b"secret")
+    (downloads / "Downloads" / "recovery-key.txt").write_bytes(b"secret")
+
+    plan = fo.plan_run(downloads, duplicate_policy="skip")
+
+    assert len(plan) == 0
+    assert not plan.conflicts
+    assert "[skip duplicate]" in plan.describe()
+
+
+@pytest.mark.parametrize("policy", ["skip", "replace", "hardlink"])
+def test_file_planned_out_of_destination_is_no_duplicate(downloads, policy):
+    (downloads / "Backups").mkdir()
+    (downloads / "Documents" / "key.pdf").write_bytes(b"%PDF-1.7 body")
+    (downloads / "Downloads" / "report.pdf").write_bytes(b"%PDF-1.7 body")
+
+    plan = fo.plan_run(downloads, duplicate_policy=policy)
+    assert [op.action for op in plan] == [ACTION_MOVE, ACTION_MOVE]
+    fo.apply_plan(plan)
+
+    assert (downloads / "Backups" / "key.pdf").read_bytes() == b"%PDF-1.7 body"
+    assert (downloads / "Documents" / "report.pdf").read_bytes() == b"%PDF-1.7 body"
+    assert not (downloads / "Downloads" / "report.pdf").exists()
+
+
+def test_file_planned_into_destination_is_a_duplicate(downloads):
+    (downloads / "Backups").mkdir()
+    (downloads / "Documents" / "recovery.txt").write_bytes(b"secret")
+    (downloads / "Downloads" / "key.txt").write_bytes(b"secret")
+    arriving = MoveOp(
+        downloads / "Documents" / "recovery.txt",
+        downloads / "Backups" / "recovery.txt",
+        False,
+        "backups",
+    )
+    incoming = MoveOp(
+        downloads / "Downloads" / "key.txt",
+        downloads / "Backups" / "key.txt",
+        False,
+        "backups",
+    )
+    plan = MovePlan()
+    plan.add(arriving)
+
+    [resolved] = fo.resolve_duplicates(plan, [incoming], "replace")
+    assert resolved.duplicate_of == arriving.destination
+    plan.add(resolved)
+    execute_plan(plan)
+
+    assert (downloads / "Backups" / "key.txt").read_bytes() == b"secret"
+    assert not (downloads / "Backups" / "recovery.txt").exists()
+    assert not (downloads / "Documents" / "recovery.txt").exists()
+
+
+@pytest.mark.parametrize("policy", ["skip", "replace", "hardlink"])
+@pytest.mark.parametrize("with_snapshot", [True, False])
+def test_excluded_duplicate_survives(downloads, policy, with_snapshot):
+    keep = downloads / "Documents" / "keep.pdf"
+    keep.write_bytes(b"%PDF-1.7 body")
+    (downloads / "Downloads" / "new.pdf").write_bytes(b"%PDF-1.7 body")
+    exclusions = ExclusionMatcher(downloads, ["Documents/keep.pdf"])
+
+    snapshot = None
+    if with_snapshot:
+        snapshot = fo.take_home_snapshot(downloads, exclusions=exclusions)
+    plan = MovePlan(snapshot=snapshot, exclusions=exclusions)
+    fo.plan_downloads(downloads, snapshot, plan, policy)
+    assert [op.action for op in plan] == [ACTION_MOVE]
+    fo.apply_plan(plan)
+
+    assert keep.read_bytes() == b"%PDF-1.7 body"
+    assert os.stat(keep).st_nlink == 1
+    assert (downloads / "Documents" / "new.pdf").exists()
@@ -0,0 +1,179 @@
+#!/usr/bin/python3
+
+"""Tests for exclusions"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+import app.file_organizer as fo
+import cli
+import main
+from app import stats
+from app.exclusions import ExclusionMatcher, pattern_regex, read_exclude_file
+from app.pipeline import run_pipeline
+from app.watcher import dispatch_batch
+
+
+@pytest.mark.parametrize(
+    "pattern, relative, is_dir, excluded",
+    [
+        ("node_modules/", "Documents/app/node_modules", True, True),
+        ("node_modules/", "Documents/node_modules", False, False),
+        ("/Documents/private", "Documents/private", True, True),
+        ("/Documents/private", "Videos/Documents/private", True, False),
+        ("Documents/private", "Documents/private", False, True),
+        ("*.iso", "Downloads/ubuntu.iso", False, True),
+        ("*.iso", "Downloads/ubuntu.isolated", False, False),
+        ("Music/*.mp3", "Music/live/set.mp3", False, False),
+        ("Music/**/*.mp3", "Music/live/set.mp3", False, True),
+        ("Music/**/*.mp3", "Music/set.mp3", False, True),
+        ("backup-202?", "Downloads/backup-2024", False, True),
+        ("[!a]*.txt", "Downloads/notes.txt", False, True),
+        ("[!a]*.txt", "Downloads/about.txt", False, False),
+    ],
+)
+def test_pattern_semantics(pattern, relative, is_dir, excluded):
+    matcher = ExclusionMatcher(Path("/home"), [pattern])
+    assert matcher.excluded(relative, is_dir) is excluded
+
+
+def test_comments_blanks_and_negations_are_ignored():
+    assert pattern_regex("") is None
+    assert pattern_regex("   ") is None
+    assert pattern_regex("# Desktop") is None
+    assert pattern_regex("!keep.txt") is None
+    assert not ExclusionMatcher(Path("/home"), ["# only a comment", ""])
+
+
+def test_read_exclude_file(tmp_path):
+    (tmp_path / "exclude").write_text("# keep these\nnode_modules/\n*.iso\n")
+
+    assert read_exclude_file(tmp_path / "exclude") == [
+        "# keep these",
+        "node_modules/",
+        "*.iso",
+    ]
+    assert read_exclude_file(tmp_path / "missing") == []
+
+
+@pytest.fixture
+def home(tmp_path: Path) -> Path:
+    for directory in ["Documents", "Downloads", "College", "Backups", "Vault"]:
+        (tmp_path / directory).mkdir()
+    (tmp_path / "Vault" / "CS_secret").mkdir()
+    (tmp_path / "Vault" / "recovery-key.txt").touch()
+    (tmp_path / "Documents" / "CS101").mkdir()
+    (tmp_path / "Documents" / "keep" / "CS202").mkdir(parents=True)
+    (tmp_path / "Downloads" / "big.iso").touch()
+    (tmp_path / "Downloads" / "wallet-key.txt").touch()
+    return tmp_path
+
+
+def test_excluded_directories_are_never_listed(home):
+    exclusions = ExclusionMatcher(home, ["/Vault/"])
+    run_stats = stats.enable()
+    try:
+        snapshot = fo.take_home_snapshot(home, exclusions=exclusions)
+    finally:
+        stats.disable()
+
+    assert "Vault" not in snapshot.top_dirs()
+    # home plus every other top-level directory
+    assert run_stats.counters["listings"] == 5
+    assert run_stats.counters["excluded"] == 1
+
+
+def test_plan_run_leaves_excluded_paths_alone(home):
+    exclusions = ExclusionMatcher(home, ["/Vault/", "keep/", "*.iso"])
+    snapshot = fo.take_home_snapshot(home, exclusions=exclusions)
+
+    plan = fo.plan_run(home, snapshot=snapshot, max_depth=2, exclusions=exclusions)
+
+    assert sorted(str(op.source.relative_to(home)) for op in plan) == [
+        "Documents/CS101",
+        "Downloads/wallet-key.txt",
+    ]
+
+
+def test_excluded_path_checks_every_level(home):
+    exclusions = ExclusionMatcher(home, ["/Vault/", "Backups/old.txt"])
+
+    assert exclusions.excluded_path(home / "Vault" / "deep", True)
+    assert exclusions.excluded_path(home / "Backups" / "old.txt", False)
+    assert not exclusions.excluded_path(home / "Backups", True)
+    assert not exclusions.excluded_path(Path("/elsewhere/Vault"), True)
+
+
+def test_excluded_file_is_never_overwritten(home):
+    (home / "Backups" / "wallet-key.txt").write_text("excluded")
+    (home / "Downloads" / "wallet-key.txt").write_text("incoming")
+
+    main.main(
+        desktop_flag=False,
+        trash_flag=False,
+        exclude_patterns=["Backups/wallet-key.txt"],
+        home=home,
+    )
+
+    assert (home / "Backups" / "wallet-key.txt").read_text() == "excluded"
+    assert (home / "Backups" / "wallet-key (1).txt").read_text() == "incoming"
+
+
+def test_nothing_moves_into_excluded_directory(home):
+    exclusions = ExclusionMatcher(home, ["Backups/"])
+    snapshot = fo.take_home_snapshot(home, exclusions=exclusions)
+
+    plan = fo.plan_run(home, snapshot=snapshot, exclusions=exclusions)
+    fo.apply_plan(plan)
+
+    assert sorted(op.source.name for op in plan.excluded) == [
+        "recovery-key.txt",
+        "wallet-key.txt",
+    ]
+    assert "[excluded destination]" in plan.describe()
+    assert (home / "Downloads" / "wallet-key.txt").exists()
+
+
+def test_pipeline_and_watch_honour_exclusions(home):
+    exclusions = ExclusionMatcher(home, ["wallet-key.txt", "/Documents/"])
+
+    asyncio.run(run_pipeline(home, exclusions=exclusions))
+    dispatch_batch(home, {"Downloads", "Documents"}, exclusions=exclusions)
+
+    assert (home / "Downloads" / "wallet-key.txt").exists()
+    assert (home / "Documents" / "CS101").exists()
+
+
+def test_cli_exclude_options(home, monkeypatch):
+    (home / "exclude").write_text("/Vault/\n")
+    monkeypatch.setattr(Path, "home", classmethod(lambda cls: home))
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "cli.py",
+            "--no-journal",
+            "--exclude-file",
+            str(home / "exclude"),
+            "-x",
+            "Documents/",
+        ],
+    )
+
+    cli.cli()
+
+    assert (home / "Vault" / "recovery-key.txt").exists()
+    assert (home / "Documents" / "CS101").exists()
+    assert (home / "Backups" / "wallet-key.txt").exists()
+
+
+def test_cli_rejects_missing_exclude_file(home, monkeypatch):
+    monkeypatch.setattr(
+        sys, "argv", ["cli.py", "--exclude-file", str(home / "missing")]
+    )
+
+    with pytest.raises(SystemExit):
+        cli.cli()
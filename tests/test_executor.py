@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+
+"""Tests for executor"""
+
+import errno
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app import executor
+from app.executor import execute_plan
+from app.planner import MoveOp, MovePlan
+
+
+def make_plan(tmp_path: Path, names: list[str], destination: str = "Dest") -> MovePlan:
+    (tmp_path / "Src").mkdir(exist_ok=True)
+    (tmp_path / destination).mkdir(exist_ok=True)
+    plan = MovePlan()
+    for name in names:
+        (tmp_path / "Src" / name).write_text(name)
+        plan.add(
+            MoveOp(tmp_path / "Src" / name, tmp_path / destination / name, False, "t")
+        )
+    return plan
+
+
+def fake_devices(monkeypatch, tmp_path: Path):
+    """pretend every top-level directory of tmp_path is its own device"""
+
+    def device(self, directory):
+        return hash(directory.relative_to(tmp_path).parts[0])
+
+    monkeypatch.setattr(executor._DeviceMap, "device", device)
+
+
+def test_execute_plan_same_device_renames_inline(tmp_path, monkeypatch):
+    plan = make_plan(tmp_path, ["a.txt", "b.txt"])
+
+    def fail_pool(*args, **kwargs):
+        raise AssertionError("worker pool used for a same-device move")
+
+    monkeypatch.setattr(executor, "ThreadPoolExecutor", fail_pool)
+
+    moved = execute_plan(plan)
+
+    assert moved == [tmp_path / "Dest" / "a.txt", tmp_path / "Dest" / "b.txt"]
+    assert (tmp_path / "Dest" / "a.txt").read_text() == "a.txt"
+    assert not (tmp_path / "Src" / "a.txt").exists()
+
+
+def test_execute_plan_exdev_falls_back_to_copy(tmp_path, monkeypatch):
+    plan = make_plan(tmp_path, ["a.txt"])
+
+    def exdev_rename(source, destination):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(executor, "_renameat2", None)
+    monkeypatch.setattr(os, "rename", exdev_rename)
+
+    assert execute_plan(plan) == [tmp_path / "Dest" / "a.txt"]
+    assert (tmp_path / "Dest" / "a.txt").read_text() == "a.txt"
+    assert not (tmp_path / "Src" / "a.txt").exists()
+
+
+def test_execute_plan_limits_copies_per_device(tmp_path, monkeypatch):
+    plan = make_plan(tmp_path, [f"file{i}.bin" for i in range(8)])
+    fake_devices(monkeypatch, tmp_path)
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+    real_copy = executor.copy_file
+
+    def slow_copy(source, destination):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return real_copy(source, destination)
+
+    monkeypatch.setattr(executor, "copy_file", slow_copy)
+
+    moved = execute_plan(plan, device_workers=2)
+
+    assert peak == 2
+    assert moved == [tmp_path / "Dest" / f"file{i}.bin" for i in range(8)]
+    assert all(path.exists() for path in moved)
+    assert not list((tmp_path / "Src").iterdir())
+
+
+def test_execute_plan_reports_copy_method(tmp_path, monkeypatch):
+    plan = make_plan(tmp_path, ["a.txt"])
+    (tmp_path / "Src" / "tree").mkdir()
+    (tmp_path / "Src" / "tree" / "inner.txt").write_text("inner")
+    plan.add(MoveOp(tmp_path / "Src" / "tree", tmp_path / "Dest" / "tree", True, "t"))
+    fake_devices(monkeypatch, tmp_path)
+    copy_report = {}
+
+    execute_plan(plan, copy_report=copy_report)
+
+    assert list(copy_report) == [tmp_path / "Src" / "a.txt"]
+    assert (tmp_path / "Dest" / "tree" / "inner.txt").read_text() == "inner"
+    assert not (tmp_path / "Src" / "tree").exists()
+
+
+def test_execute_plan_cross_device_error_after_others_finish(tmp_path, monkeypatch):
+    plan = make_plan(tmp_path, ["a.txt", "b.txt"])
+    fake_devices(monkeypatch, tmp_path)
+    (tmp_path / "Src" / "a.txt").unlink()
+
+    with pytest.raises(FileNotFoundError):
+        execute_plan(plan)
+
+    assert (tmp_path / "Dest" / "b.txt").exists()
+
+
+@pytest.mark.parametrize("renameat2", [executor._renameat2, None])
+def test_execute_plan_never_overwrites(tmp_path, monkeypatch, renameat2):
+    plan = make_plan(tmp_path, ["a.txt"])
+    monkeypatch.setattr(executor, "_renameat2", renameat2)
+    # appeared after planning
+    (tmp_path / "Dest" / "a.txt").write_text("kept")
+
+    with pytest.raises(FileExistsError):
+        execute_plan(plan)
+
+    assert (tmp_path / "Dest" / "a.txt").read_text() == "kept"
+    assert (tmp_path / "Src" / "a.txt").read_text() == "a.txt"
+
+
+def test_execute_plan_cross_device_never_overwrites(tmp_path, monkeypatch):
+    plan = make_plan(tmp_path, ["a.txt"])
+    (tmp_path / "Src" / "tree").mkdir()
+    plan.add(MoveOp(tmp_path / "Src" / "tree", tmp_path / "Dest" / "tree", True, "t"))
+    fake_devices(monkeypatch, tmp_path)
+    (tmp_path / "Dest" / "a.txt").write_text("kept")
+    (tmp_path / "Dest" / "tree").mkdir()
+
+    with pytest.raises(FileExistsError):
+        execute_plan(plan)
+
+    assert (tmp_path / "Dest" / "a.txt").read_text() == "kept"
+    assert list((tmp_path / "Dest" / "tree").iterdir()) == []
+    assert (tmp_path / "Src" / "a.txt").exists()
+    assert (tmp_path / "Src" / "tree").exists()
@@ -3,15 +3,39 @@
 """Tests for file_organizer"""
 
 import shutil
+import time
 from pathlib import Path
 from random import randint
 
 import pytest
 
 import app.file_organizer as fo
+from app.collisions import suffixed_name
 from app.special_exceptions import EmptyDirectory
 
 
+def collided_sources(home: Path, destination: str, names: list[str]) -> list:
+    """items named like names outside destination, as (path, is_dir)"""
+
+    return [
+        (home / directory / name, (home / directory / name).is_dir())
+        for directory in fo.get_non_hidden_dirs(home)
+        if directory != destination
+        for name in names
+        if (home / directory / name).exists()
+    ]
+
+
+def assert_renamed(home: Path, destination: str, sources: list):
+    """every source that moved landed next to the item it collided with"""
+
+    for source, is_dir in sources:
+        if source.exists():
+            continue
+        assert (home / destination / source.name).exists()
+        assert (home / destination / suffixed_name(source.name, 1, is_dir)).exists()
+
+
 @pytest.fixture
 def setup_tmp_path(tmp_path: Path):
     root_dirs = [
@@ -210,6 +234,77 @@ def test_get_non_hidden_files_with_mixed_dirs_files(tmp_path):
     assert sorted(fo.get_non_hidden_files(tmp_path)) == sorted(expected_files)
 
 
+# take_home_snapshot tests
+def test_take_home_snapshot_records_types_and_git(tmp_path):
+    (tmp_path / "Desktop").mkdir()
+    (tmp_path / "Desktop" / "repo").mkdir()
+    (tmp_path / "Desktop" / "repo" / ".git").touch()
+    (tmp_path / "Desktop" / "plain").mkdir()
+    (tmp_path / "Desktop" / "file.txt").touch()
+    (tmp_path / ".hidden").mkdir()
+
+    snapshot = fo.take_home_snapshot(tmp_path)
+
+    assert snapshot.top_dirs() == ["Desktop"]
+    assert {entry.name: entry.has_git for entry in snapshot.sub_dirs("Desktop")} == {
+        "repo": True,
+        "plain": False,
+    }
+    assert snapshot.files("Desktop") == ["file.txt"]
+
+
+def test_take_home_snapshot_parallel_matches_serial(setup_tmp_path):
+    serial = fo.take_home_snapshot(setup_tmp_path)
+    parallel = fo.take_home_snapshot(setup_tmp_path, scan_workers=8)
+
+    assert parallel.top_dirs() == serial.top_dirs()
+    for directory in serial.top_dirs():
+        assert parallel.entries(directory) == serial.entries(directory)
+
+
+def test_take_home_snapshot_overlaps_slow_listings(tmp_path, monkeypatch):
+    for index in range(8):
+        (tmp_path / f"dir{index}" / "sub").mkdir(parents=True)
+    list_non_hidden = fo.list_non_hidden
+
+    def slow_listing(directory):
+        # a round trip to a network mount
+        time.sleep(0.1)
+        return list_non_hidden(directory)
+
+    monkeypatch.setattr("app.file_organizer.list_non_hidden", slow_listing)
+
+    start = time.perf_counter()
+    snapshot = fo.take_home_snapshot(tmp_path, scan_workers=8)
+    elapsed = time.perf_counter() - start
+
+    assert len(snapshot.top_dirs()) == 8
+    # home, then the eight directories side by side rather than 0.9s in a row
+    assert elapsed < 0.6
+
+
+def test_take_home_snapshot_is_shared_between_funnels(setup_tmp_path, monkeypatch):
+    snapshot = fo.take_home_snapshot(setup_tmp_path)
+
+    def fail_listing(directory):
+        raise AssertionError(f"{directory} listed again")
+
+    monkeypatch.setattr("app.file_organizer.get_non_hidden_dirs", fail_listing)
+    monkeypatch.setattr("app.file_organizer.get_non_hidden_files", fail_listing)
+
+    fo.research_dir_funnel(setup_tmp_path, True, snapshot)
+    fo.projects_dir_funnel(setup_tmp_path, True, snapshot)
+
+    research = [entry.name for entry in snapshot.sub_dirs("Research")]
+    projects = [entry.name for entry in snapshot.sub_dirs("Projects")]
+    assert {"Learn_Go", "Study_Javascript", "Test_Selenium"} <= set(research)
+    assert not set(research) & set(projects)
+    for item in research:
+        assert (setup_tmp_path / "Research" / item).exists()
+    for item in projects:
+        assert (setup_tmp_path / "Projects" / item).exists()
+
+
 # create_require_dirs tests
 def test_create_require_dirs_creates_dirs(tmp_path):
     dirs_list = ["dir1", "dir2"]
@@ -272,8 +367,9 @@ def test_research_dir_funnel_existing_dirs_with_desktop(setup_tmp_path):
         if not (research / ex_dir).exists():
             (research / ex_dir).mkdir()
 
-    with pytest.raises(FileExistsError):
-        fo.research_dir_funnel(setup_tmp_path, desktop_flag)
+    sources = collided_sources(setup_tmp_path, "Research", existing_dirs)
+    fo.research_dir_funnel(setup_tmp_path, desktop_flag)
+    assert_renamed(setup_tmp_path, "Research", sources)
 
 
 def test_research_dir_funnel_without_desktop(setup_tmp_path):
@@ -319,8 +415,9 @@ def test_research_dir_funnel_existing_dirs_without_desktop(setup_tmp_path):
             (research / ex_dir).mkdir()
 
     if remaining_dirs:
-        with pytest.raises(FileExistsError):
-            fo.research_dir_funnel(setup_tmp_path)
+        sources = collided_sources(setup_tmp_path, "Research", remaining_dirs)
+        fo.research_dir_funnel(setup_tmp_path)
+        assert_renamed(setup_tmp_path, "Research", sources)
 
 
 # college_dir_funnel tests
@@ -357,8 +454,9 @@ def test_college_dir_funnel_existing_dirs_with_desktop(setup_tmp_path):
         if not (college / ex_dir).exists():
             (college / ex_dir).mkdir()
 
-    with pytest.raises(FileExistsError):
-        fo.college_dir_funnel(setup_tmp_path, desktop_flag)
+    sources = collided_sources(setup_tmp_path, "College", existing_dirs)
+    fo.college_dir_funnel(setup_tmp_path, desktop_flag)
+    assert_renamed(setup_tmp_path, "College", sources)
 
 
 def test_college_dir_funnel_without_desktop(setup_tmp_path):
@@ -406,8 +504,9 @@ def test_college_dir_funnel_existing_dirs_without_desktop(setup_tmp_path):
         for r_dir in remaining_dirs:
             if not (research / r_dir).exists():
                 (research / r_dir).mkdir()
-        with pytest.raises(FileExistsError):
-            fo.college_dir_funnel(setup_tmp_path)
+        sources = collided_sources(setup_tmp_path, "College", remaining_dirs)
+        fo.college_dir_funnel(setup_tmp_path)
+        assert_renamed(setup_tmp_path, "College", sources)
 
 
 # hackathon_dir_funnel tests
@@ -444,8 +543,9 @@ def test_hackathon_dir_funnel_existing_dirs_with_desktop(setup_tmp_path):
         if not (hackathon / ex_dir).exists():
             (hackathon / ex_dir).mkdir()
 
-    with pytest.raises(FileExistsError):
-        fo.hackathon_dir_funnel(setup_tmp_path, desktop_flag)
+    sources = collided_sources(setup_tmp_path, "Hackathons", existing_dirs)
+    fo.hackathon_dir_funnel(setup_tmp_path, desktop_flag)
+    assert_renamed(setup_tmp_path, "Hackathons", sources)
 
 
 def test_hackathon_dir_funnel_without_desktop(setup_tmp_path):
@@ -490,8 +590,9 @@ def test_hackathon_dir_funnel_existing_dirs_without_desktop(setup_tmp_path):
             (hackathon / ex_dir).mkdir()
 
     if remaining_dirs:
-        with pytest.raises(FileExistsError):
-            fo.hackathon_dir_funnel(setup_tmp_path)
+        sources = collided_sources(setup_tmp_path, "Hackathons", remaining_dirs)
+        fo.hackathon_dir_funnel(setup_tmp_path)
+        assert_renamed(setup_tmp_path, "Hackathons", sources)
 
 
 # projects_dir_funnel tests
@@ -555,8 +656,9 @@ def test_projects_dir_funnel_existing_dirs_with_desktop(setup_tmp_path):
             (projects / ex_dir).mkdir()
 
     if existing_dirs:
-        with pytest.raises(FileExistsError):
-            fo.projects_dir_funnel(setup_tmp_path, desktop_flag)
+        sources = collided_sources(setup_tmp_path, "Projects", existing_dirs)
+        fo.projects_dir_funnel(setup_tmp_path, desktop_flag)
+        assert_renamed(setup_tmp_path, "Projects", sources)
 
 
 def test_projects_dir_funnel_without_desktop(setup_tmp_path):
@@ -617,8 +719,55 @@ def test_projects_dir_funnel_existing_dirs_without_desktop(setup_tmp_path):
             (projects / ex_dir).mkdir()
 
     if remaining_dirs:
-        with pytest.raises(FileExistsError):
-            fo.projects_dir_funnel(setup_tmp_path)
+        sources = collided_sources(setup_tmp_path, "Projects", remaining_dirs)
+        fo.projects_dir_funnel(setup_tmp_path)
+        assert_renamed(setup_tmp_path, "Projects", sources)
+
+
+# organize_home tests
+def test_organize_home_empty_home(setup_tmp_path, monkeypatch):
+    monkeypatch.setattr("app.file_organizer.get_non_hidden_dirs", lambda x: [])
+
+    with pytest.raises(EmptyDirectory):
+        fo.organize_home(setup_tmp_path)
+
+
+def test_organize_home_with_desktop(setup_tmp_path):
+    expected = {
+        "Research": ["Learn_Go", "Test_Selenium", "Study_Javascript"],
+        "College": ["CS_1250", "CSM_Assignments"],
+        "Hackathons": ["Hackathon_Velocity", "Hackathon_Yeti"],
+        "Projects": [
+            "project1",
+            "project2",
+            "Terminal_Search",
+            "OneStopQR",
+            "ElectricGuitar",
+            "Integer_Game",
+        ],
+        "Backups": [
+            "backup-recovery.pdf",
+            "recovery1.txt",
+            "backup1.txt",
+            "recovery-key.txt",
+            "backup.txt",
+            "teehee-key.txt",
+            "backup-recovery-key.txt",
+            "randfile18_backup.txt",
+        ],
+    }
+
+    # repositories already sitting in Research are left there
+    research = setup_tmp_path / "Research"
+    expected["Projects"] = [
+        item for item in expected["Projects"] if not (research / item).exists()
+    ]
+
+    fo.organize_home(setup_tmp_path, True)
+
+    for directory, items in expected.items():
+        for item in items:
+            assert (setup_tmp_path / directory / item).exists()
 
 
 def test_backups_dir_funnel_empty_home(setup_tmp_path, monkeypatch):
@@ -666,8 +815,9 @@ def test_backups_dir_funnel_existing_dirs_with_desktop(setup_tmp_path):
         if not (backups / ex_file).exists():
             (backups / ex_file).touch()
 
-    with pytest.raises(shutil.Error):
-        fo.backups_dir_funnel(setup_tmp_path, desktop_flag)
+    sources = collided_sources(setup_tmp_path, "Backups", existing_files)
+    fo.backups_dir_funnel(setup_tmp_path, desktop_flag)
+    assert_renamed(setup_tmp_path, "Backups", sources)
 
 
 def test_backups_dir_funnel_without_desktop(setup_tmp_path):
@@ -724,8 +874,9 @@ def test_backups_dir_funnel_existing_dirs_without_desktop(setup_tmp_path):
             (backups / ex_file).mkdir()
 
     if remaining_files:
-        with pytest.raises(shutil.Error):
-            fo.backups_dir_funnel(setup_tmp_path)
+        sources = collided_sources(setup_tmp_path, "Backups", remaining_files)
+        fo.backups_dir_funnel(setup_tmp_path)
+        assert_renamed(setup_tmp_path, "Backups", sources)
 
 
 def test_cleanup_downloads_dir_with_empty_downloads(setup_tmp_path, monkeypatch):
@@ -814,12 +965,64 @@ def test_cleanup_downloads_dir_without_del_zip_files(setup_tmp_path):
         assert (downloads / exp_dir).exists()
 
 
-def test_del_zip_files_with_empty_directory(setup_tmp_path, monkeypatch):
-    monkeypatch.setattr("app.file_organizer.get_non_hidden_files", lambda x: [])
+def test_cleanup_downloads_dir_uppercase_extensions(setup_tmp_path, monkeypatch):
+    downloads = setup_tmp_path / "Downloads"
+    (downloads / "HOLIDAY.JPG").touch()
+    (downloads / "Report.PDF").touch()
+
+    def fail_sniff(paths):
+        assert downloads / "HOLIDAY.JPG" not in paths
+        assert downloads / "Report.PDF" not in paths
+        return {}
+
+    monkeypatch.setattr("app.file_organizer.sniff_files", fail_sniff)
+    fo.cleanup_downloads_dir(setup_tmp_path)
+
+    assert (setup_tmp_path / "Pictures" / "HOLIDAY.JPG").exists()
+    assert (setup_tmp_path / "Documents" / "Report.PDF").exists()
+
+
+def test_cleanup_downloads_dir_sniffs_unknown_extensions(setup_tmp_path):
+    downloads = setup_tmp_path / "Downloads"
+    (downloads / "invoice").write_bytes(b"%PDF-1.4\n")
+    (downloads / "photo.download").write_bytes(b"\x89PNG\r\n\x1a\n")
+    (downloads / "mystery.bin").write_bytes(b"\x7fELF")
+
+    fo.cleanup_downloads_dir(setup_tmp_path)
+
+    assert (setup_tmp_path / "Documents" / "invoice").exists()
+    assert (downloads / "mystery.bin").exists()
+    # a partial download is still being written by the browser
+    assert (downloads / "photo.download").exists()
+
+
+def test_plan_downloads_leaves_partial_downloads(setup_tmp_path):
+    downloads = setup_tmp_path / "Downloads"
+    partials = [
+        "report.pdf.part",
+        "photo.jpg.crdownload",
+        "song.mp3.download",
+        "clip.mov.partial",
+        "notes.TMP",
+    ]
+    for name in partials:
+        (downloads / name).write_bytes(b"%PDF-1.4\n")
+
+    plan = fo.plan_downloads(setup_tmp_path)
+
+    assert not {op.source.name for op in plan} & set(partials)
+
+
+def test_del_zip_files_with_empty_directory(setup_tmp_path):
+    # decided from its own scan of Downloads, so empty it for real
+    shutil.rmtree(setup_tmp_path / "Downloads")
+    (setup_tmp_path / "Downloads").mkdir()
     del_flag = True
 
-    with pytest.raises(EmptyDirectory):
-        fo.del_zip_files(setup_tmp_path, del_flag)
+    # nothing to trash is the normal outcome once a run has emptied Downloads
+    fo.del_zip_files(setup_tmp_path, del_flag)
+
+    assert not (setup_tmp_path / ".local" / "share" / "Trash").exists()
 
 
 def test_del_zip_files_with_no_flag(setup_tmp_path):
@@ -873,6 +1076,20 @@ def test_del_zip_files_with_flag_and_y_input(setup_tmp_path, monkeypatch):
         assert not (downloads / file).exists()
 
 
+def test_del_zip_files_matches_whole_suffixes(setup_tmp_path, monkeypatch):
+    downloads = setup_tmp_path / "Downloads"
+    for file in ["my.zipper.txt", "debug.debian.log", "notes.tar.gz.txt"]:
+        (downloads / file).touch()
+
+    monkeypatch.setattr("builtins.input", lambda _: "y")
+    fo.del_zip_files(setup_tmp_path, True)
+
+    assert (downloads / "my.zipper.txt").exists()
+    assert (downloads / "debug.debian.log").exists()
+    assert (downloads / "notes.tar.gz.txt").exists()
+    assert not (downloads / "randfile14.zip").exists()
+
+
 def test_del_zip_files_with_flag_and_Y_input(setup_tmp_path, monkeypatch):
     downloads = setup_tmp_path / "Downloads"
     tbr_files = [
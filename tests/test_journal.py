@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+
+"""Tests for journal"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from app import journal as journal_module
+from app.executor import execute_plan
+from app.journal import MoveJournal, read_journal, undo_last_run
+from app.planner import ACTION_LINK, MoveOp, MovePlan
+
+
+def make_plan(tmp_path: Path, names: list[str]) -> MovePlan:
+    (tmp_path / "Src").mkdir(exist_ok=True)
+    (tmp_path / "Dest").mkdir(exist_ok=True)
+    plan = MovePlan()
+    for name in names:
+        (tmp_path / "Src" / name).write_text(name)
+        plan.add(MoveOp(tmp_path / "Src" / name, tmp_path / "Dest" / name, False, "t"))
+    return plan
+
+
+def test_journal_records_begin_and_done(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    plan = make_plan(tmp_path, ["a.txt", "b.txt"])
+
+    execute_plan(plan, journal=MoveJournal(path))
+
+    events = [record["event"] for record in read_journal(path)]
+    assert events == ["run", "begin", "begin", "done", "done"]
+
+
+def test_journal_syncs_each_directory_once_per_batch(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(journal_module, "sync_directories", synced.append)
+    plan = make_plan(tmp_path, [f"file{i}.txt" for i in range(20)])
+
+    execute_plan(plan, journal=MoveJournal(tmp_path / "journal.jsonl"))
+
+    assert synced == [{tmp_path / "Src", tmp_path / "Dest"}]
+
+
+def test_journal_commits_completed_moves_on_failure(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    plan = make_plan(tmp_path, ["a.txt", "b.txt"])
+    (tmp_path / "Src" / "b.txt").unlink()
+
+    with pytest.raises(FileNotFoundError):
+        execute_plan(plan, journal=MoveJournal(path))
+
+    done = [record["id"] for record in read_journal(path) if record["event"] == "done"]
+    assert done == [0]
+
+
+def test_undo_last_run(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    execute_plan(make_plan(tmp_path, ["a.txt"]), journal=MoveJournal(path))
+    execute_plan(make_plan(tmp_path, ["b.txt"]), journal=MoveJournal(path))
+
+    undone = undo_last_run(path)
+
+    assert [op.source.name for op in undone] == ["b.txt"]
+    assert (tmp_path / "Src" / "b.txt").read_text() == "b.txt"
+    assert (tmp_path / "Dest" / "a.txt").exists()
+
+    # runs are undone newest first, each only once
+    undo_last_run(path)
+    assert (tmp_path / "Src" / "a.txt").exists()
+    assert undo_last_run(path) == []
+
+
+def test_undo_after_crash_only_reverses_moves_that_happened(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    plan = make_plan(tmp_path, ["a.txt", "b.txt"])
+    journal = MoveJournal(path)
+    journal.begin(plan.ops)
+    # the process died after the first move, before anything was marked done
+    os.rename(tmp_path / "Src" / "a.txt", tmp_path / "Dest" / "a.txt")
+    with open(path, "a", encoding="utf-8") as file:
+        file.write('{"event": "done", "ru')
+
+    undone = undo_last_run(path)
+
+    assert [op.source.name for op in undone] == ["a.txt"]
+    assert (tmp_path / "Src" / "a.txt").exists()
+    assert (tmp_path / "Src" / "b.txt").exists()
+
+
+def test_undo_hardlinked_duplicate(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    (tmp_path / "Src").mkdir()
+    (tmp_path / "Dest").mkdir()
+    (tmp_path / "Src" / "copy.pdf").write_text("same")
+    (tmp_path / "Dest" / "paper.pdf").write_text("same")
+    plan = MovePlan()
+    plan.add(
+        MoveOp(
+            tmp_path / "Src" / "copy.pdf",
+            tmp_path / "Dest" / "copy.pdf",
+            False,
+            "downloads",
+            ACTION_LINK,
+            tmp_path / "Dest" / "paper.pdf",
+        )
+    )
+    execute_plan(plan, journal=MoveJournal(path))
+
+    undo_last_run(path)
+
+    assert (tmp_path / "Src" / "copy.pdf").read_text() == "same"
+    assert not (tmp_path / "Dest" / "copy.pdf").exists()
+    assert (tmp_path / "Dest" / "paper.pdf").exists()
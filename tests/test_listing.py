@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+
+"""Tests for listing"""
+
+import subprocess
+
+from app.listing import ListedEntry, list_non_hidden
+
+
+def test_list_non_hidden_types(tmp_path):
+    (tmp_path / "dir1").mkdir()
+    (tmp_path / "file.txt").touch()
+    (tmp_path / ".hidden").mkdir()
+    (tmp_path / ".hidden.txt").touch()
+
+    assert sorted(list_non_hidden(tmp_path)) == [
+        ListedEntry("dir1", True, False),
+        ListedEntry("file.txt", False, True),
+    ]
+
+
+def test_list_non_hidden_follows_symlinks(tmp_path):
+    (tmp_path / "real_dir").mkdir()
+    (tmp_path / "link_dir").symlink_to(tmp_path / "real_dir")
+    (tmp_path / "dangling").symlink_to(tmp_path / "missing")
+
+    listed = {entry.name: entry for entry in list_non_hidden(tmp_path)}
+    assert listed["link_dir"].is_dir
+    assert not listed["dangling"].is_dir
+    assert not listed["dangling"].is_file
+
+
+def test_list_non_hidden_spawns_no_process(tmp_path, monkeypatch):
+    def fail_run(*args, **kwargs):
+        raise AssertionError("subprocess spawned")
+
+    monkeypatch.setattr(subprocess, "run", fail_run)
+    (tmp_path / "dir1").mkdir()
+
+    assert list_non_hidden(tmp_path) == [ListedEntry("dir1", True, False)]
+
+
+def test_list_non_hidden_empty(tmp_path):
+    assert list_non_hidden(tmp_path) == []
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+
+"""Tests for logger"""
+
+import logging
+import threading
+
+import pytest
+
+import app.file_organizer as fo
+from app import stats
+from app.logger import PROD_LOGGER, setup_prod_logging, start_queue_logging
+
+
+@pytest.fixture
+def prod_logger():
+    logger = logging.getLogger(PROD_LOGGER)
+    handlers, level = list(logger.handlers), logger.level
+    yield logger
+    logger.handlers[:] = handlers
+    logger.setLevel(level)
+    stats.disable()
+
+
+class ThreadRecorder(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+        self.threads.add(threading.current_thread().name)
+
+
+def test_records_are_written_on_the_listener_thread(prod_logger):
+    prod_logger.setLevel(logging.INFO)
+    recorder = ThreadRecorder()
+    listener = start_queue_logging(prod_logger, [recorder])
+
+    prod_logger.info("moved %s", "a.txt")
+    listener.stop()
+
+    assert recorder.messages == ["moved a.txt"]
+    assert threading.current_thread().name not in recorder.threads
+
+
+def test_setup_prod_logging_to_file(prod_logger, tmp_path):
+    log_path = tmp_path / "run.log"
+    listener = setup_prod_logging(True, log_path)
+
+    prod_logger.info("hello")
+    prod_logger.debug("hidden")
+    listener.stop()
+
+    assert log_path.read_text() == "hello\n"
+
+
+def test_debug_logging_does_not_list_destinations(prod_logger, tmp_path):
+    for directory in ["Downloads", "Documents", "Backups"]:
+        (tmp_path / directory).mkdir()
+    for index in range(20):
+        (tmp_path / "Downloads" / f"backup{index}.txt").touch()
+    prod_logger.setLevel(logging.DEBUG)
+    listener = start_queue_logging(prod_logger, [logging.NullHandler()])
+    run_stats = stats.enable()
+
+    fo.backups_dir_funnel(tmp_path)
+    listener.stop()
+
+    assert len(list((tmp_path / "Backups").iterdir())) == 20
+    # home and its three directories, nothing per moved file
+    assert run_stats.counters["listings"] == 4
@@ -1,3 +1,261 @@
 """File for integration tests for main.py & cli.py."""
 
-# TODO: write integration tests for main & cli
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+import cli
+import main
+
+
+@pytest.fixture
+def fake_home(tmp_path: Path, monkeypatch):
+    for directory in ["Desktop", "Downloads", "Documents", "Backups", "Projects"]:
+        (tmp_path / directory).mkdir()
+
+    (tmp_path / "Desktop" / "repo").mkdir()
+    (tmp_path / "Desktop" / "repo" / ".git").touch()
+    (tmp_path / "Desktop" / "recovery-key.txt").touch()
+    (tmp_path / "Downloads" / "notes.txt").touch()
+
+    monkeypatch.setattr(Path, "home", classmethod(lambda cls: tmp_path))
+    return tmp_path
+
+
+def test_main_dry_run_touches_nothing(fake_home, capsys):
+    before = sorted(fake_home.rglob("*"))
+
+    plan = main.main(desktop_flag=True, trash_flag=False, dry_run=True)
+
+    assert sorted(fake_home.rglob("*")) == before
+    assert len(plan) == 3
+    output = capsys.readouterr().out
+    assert "[projects] dir" in output
+    assert "[backups] file" in output
+    assert "[downloads] file" in output
+
+
+def test_main_applies_plan(fake_home):
+    main.main(desktop_flag=True, trash_flag=False)
+
+    assert (fake_home / "Projects" / "repo").exists()
+    assert (fake_home / "Backups" / "recovery-key.txt").exists()
+    assert (fake_home / "Documents" / "notes.txt").exists()
+
+
+def test_main_collision_renames(fake_home):
+    (fake_home / "Projects" / "repo").mkdir()
+
+    main.main(desktop_flag=True, trash_flag=False)
+
+    assert (fake_home / "Projects" / "repo (1)" / ".git").exists()
+    assert (fake_home / "Projects" / "repo").exists()
+
+
+def test_main_conflict_moves_nothing(fake_home):
+    (fake_home / "Projects" / "repo").mkdir()
+
+    with pytest.raises(FileExistsError):
+        main.main(desktop_flag=True, trash_flag=False, collision_policy="abort")
+
+    assert (fake_home / "Desktop" / "recovery-key.txt").exists()
+    assert (fake_home / "Downloads" / "notes.txt").exists()
+
+
+def test_cli_dry_run_flag(fake_home, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["cli.py", "--dry-run", "-d"])
+
+    cli.cli()
+
+    assert "[projects] dir" in capsys.readouterr().out
+    assert (fake_home / "Desktop" / "repo").exists()
+
+
+def test_main_incremental_second_run_is_noop(fake_home, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.state.RACY_WINDOW_NS", 0)
+    state_path = tmp_path / "state" / "state.json"
+    (fake_home / "Downloads" / "keep.zip").touch()
+
+    first = main.main(desktop_flag=True, trash_flag=False, state_path=state_path)
+    second = main.main(desktop_flag=True, trash_flag=False, state_path=state_path)
+
+    assert len(first) == 3
+    assert len(second) == 0
+    assert state_path.exists()
+
+    (fake_home / "Desktop" / "backup.txt").touch()
+    third = main.main(desktop_flag=True, trash_flag=False, state_path=state_path)
+    assert [op.source.name for op in third] == ["backup.txt"]
+
+
+def test_main_trash_after_emptying_downloads_saves_state(fake_home, tmp_path):
+    state_path = tmp_path / "state" / "state.json"
+
+    main.main(
+        desktop_flag=False,
+        trash_flag=True,
+        assume_yes=True,
+        state_path=state_path,
+    )
+
+    assert (fake_home / "Documents" / "notes.txt").exists()
+    assert state_path.exists()
+
+
+def test_main_with_empty_downloads_still_organizes(fake_home):
+    (fake_home / "Downloads" / "notes.txt").unlink()
+
+    main.main(desktop_flag=True, trash_flag=False)
+
+    assert (fake_home / "Projects" / "repo").exists()
+
+
+def test_pipeline_main(fake_home):
+    plan = main.pipeline_main(desktop_flag=True, trash_flag=False)
+
+    assert len(plan) == 3
+    assert (fake_home / "Projects" / "repo").exists()
+    assert (fake_home / "Documents" / "notes.txt").exists()
+
+
+@pytest.mark.parametrize("entry_point", [main.main, main.pipeline_main])
+def test_entry_points_share_the_xdg_trash(fake_home, monkeypatch, entry_point):
+    monkeypatch.setenv("XDG_DATA_HOME", str(fake_home / "data"))
+    (fake_home / "Downloads" / "setup.zip").write_bytes(b"PK")
+
+    entry_point(desktop_flag=False, trash_flag=True, assume_yes=True)
+
+    assert (fake_home / "data" / "Trash" / "files" / "setup.zip").exists()
+
+
+def test_cli_undo_restores_last_run(fake_home, monkeypatch):
+    journal_path = fake_home / ".local" / "state" / "journal.jsonl"
+    monkeypatch.setattr(sys, "argv", ["cli.py", "-d", "--journal", str(journal_path)])
+    cli.cli()
+    assert (fake_home / "Projects" / "repo").exists()
+
+    monkeypatch.setattr(
+        sys, "argv", ["cli.py", "--undo", "--journal", str(journal_path)]
+    )
+    cli.cli()
+
+    assert (fake_home / "Desktop" / "repo" / ".git").exists()
+    assert (fake_home / "Desktop" / "recovery-key.txt").exists()
+    assert (fake_home / "Downloads" / "notes.txt").exists()
+    assert not (fake_home / "Projects" / "repo").exists()
+
+
+def test_cli_undo_dry_run_moves_nothing(fake_home, monkeypatch, capsys):
+    journal_path = fake_home / ".local" / "state" / "journal.jsonl"
+    monkeypatch.setattr(sys, "argv", ["cli.py", "--journal", str(journal_path)])
+    cli.cli()
+    capsys.readouterr()
+
+    monkeypatch.setattr(
+        sys, "argv", ["cli.py", "--undo", "-n", "--journal", str(journal_path)]
+    )
+    cli.cli()
+
+    out = capsys.readouterr().out
+    assert "Would undo 1 moves" in out
+    assert str(fake_home / "Documents" / "notes.txt") in out
+    assert (fake_home / "Documents" / "notes.txt").exists()
+    assert not (fake_home / "Downloads" / "notes.txt").exists()
+
+
+def test_cli_stats_json(fake_home, monkeypatch, capsys):
+    monkeypatch.setattr(
+        sys, "argv", ["cli.py", "-d", "--no-journal", "--stats", "json"]
+    )
+
+    cli.cli()
+
+    document = json.loads(capsys.readouterr().out)
+    assert document["counters"]["renames"] == 3
+    assert {"snapshot", "plan_home", "apply"} <= set(document["spans"])
+
+
+def test_cli_log_file(fake_home, tmp_path, monkeypatch, capsys):
+    log_path = tmp_path / "organizer.log"
+    monkeypatch.setattr(
+        sys, "argv", ["cli.py", "-d", "-v", "--no-journal", "--log", str(log_path)]
+    )
+
+    cli.cli()
+
+    assert "moved to" in log_path.read_text()
+    assert "moved to" not in capsys.readouterr().out
+
+
+def test_cli_max_depth(fake_home, monkeypatch, capsys):
+    (fake_home / "Documents" / "old" / "wallet-key.txt").parent.mkdir()
+    (fake_home / "Documents" / "old" / "wallet-key.txt").touch()
+    monkeypatch.setattr(
+        sys, "argv", ["cli.py", "--no-journal", "--max-depth", "2", "--stats", "json"]
+    )
+
+    cli.cli()
+
+    assert (fake_home / "Backups" / "wallet-key.txt").exists()
+    assert json.loads(capsys.readouterr().out)["counters"]["visited"] > 0
+
+
+def test_cli_rejects_zero_max_depth(fake_home, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["cli.py", "--max-depth", "0"])
+
+    with pytest.raises(SystemExit):
+        cli.cli()
+
+
+def test_cli_rejects_zero_device_workers(fake_home, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["cli.py", "-d", "--device-workers", "0"])
+
+    with pytest.raises(SystemExit):
+        cli.cli()
+
+    # rejected before any move, not part way through the run
+    assert (fake_home / "Desktop" / "recovery-key.txt").exists()
+
+
+def test_cli_rejects_watch_dry_run(fake_home, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["cli.py", "--watch", "--dry-run"])
+
+    with pytest.raises(SystemExit):
+        cli.cli()
+
+
+@pytest.mark.parametrize("option", ["--trash-flag", "--incremental"])
+def test_cli_rejects_watch_options_it_cannot_honour(fake_home, monkeypatch, option):
+    monkeypatch.setattr(sys, "argv", ["cli.py", "--watch", option])
+
+    with pytest.raises(SystemExit):
+        cli.cli()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        ["--incremental"],
+        ["--max-depth", "2"],
+        ["--device-workers", "4"],
+        ["--scan-workers", "8"],
+    ],
+)
+def test_cli_rejects_pipeline_options_it_cannot_honour(fake_home, monkeypatch, options):
+    monkeypatch.setattr(sys, "argv", ["cli.py", "--pipeline", *options])
+
+    with pytest.raises(SystemExit):
+        cli.cli()
+
+    assert (fake_home / "Downloads" / "notes.txt").exists()
+
+
+def test_cli_rejects_pipeline_dry_run(fake_home, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["cli.py", "--pipeline", "--dry-run"])
+
+    with pytest.raises(SystemExit):
+        cli.cli()
+
+    assert (fake_home / "Downloads" / "notes.txt").exists()
@@ -0,0 +1,162 @@
+#!/usr/bin/python3
+
+"""Tests for pipeline"""
+
+import asyncio
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import app.file_organizer as fo
+from app import pipeline
+from app.journal import MoveJournal, undo_last_run
+from app.pipeline import run_pipeline
+from app.planner import MoveOp, MovePlan
+from app.special_exceptions import EmptyDirectory
+
+
+def build_home(home: Path):
+    for directory in [
+        "Desktop",
+        "Downloads",
+        "Documents",
+        "Pictures",
+        "Backups",
+        "Projects",
+        "Research",
+        "College",
+        "Hackathons",
+        "Arduino",
+    ]:
+        (home / directory).mkdir(parents=True)
+
+    for parent, name in [
+        ("Desktop", "Learn_Go"),
+        ("Arduino", "Hackathon_Yeti"),
+        ("Arduino", "Terminal_Search"),
+        ("Research", "OneStopQR"),
+    ]:
+        (home / parent / name).mkdir()
+        (home / parent / name / ".git").touch()
+
+    (home / "Arduino" / "CS_1250").mkdir()
+    (home / "Desktop" / "recovery-key.txt").touch()
+    (home / "Downloads" / "randfile18_backup.txt").touch()
+    (home / "Downloads" / "photo.JPG").touch()
+    (home / "Downloads" / "invoice").write_bytes(b"%PDF-1.4")
+    (home / "Downloads" / "archive.zip").touch()
+
+
+def tree(home: Path) -> list[str]:
+    return sorted(str(path.relative_to(home)) for path in home.rglob("*"))
+
+
+def test_pipeline_matches_plan_run(tmp_path):
+    build_home(tmp_path / "planned")
+    build_home(tmp_path / "pipelined")
+
+    planned = tmp_path / "planned"
+    fo.apply_plan(fo.plan_run(planned, True, fo.take_home_snapshot(planned)))
+    plan = asyncio.run(run_pipeline(tmp_path / "pipelined", True))
+
+    assert tree(tmp_path / "pipelined") == tree(planned)
+    assert len(plan) == 8
+
+
+def test_pipeline_with_small_queues(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "SCAN_QUEUE_SIZE", 1)
+    monkeypatch.setattr(pipeline, "MOVE_QUEUE_SIZE", 1)
+    build_home(tmp_path)
+
+    plan = asyncio.run(run_pipeline(tmp_path, False))
+
+    assert (tmp_path / "College" / "CS_1250").exists()
+    assert (tmp_path / "Desktop" / "Learn_Go").exists()
+    assert len(plan) == 6
+
+
+def test_pipeline_conflict_skips_and_raises_at_end(tmp_path):
+    build_home(tmp_path)
+    (tmp_path / "College" / "CS_1250").mkdir()
+
+    with pytest.raises(FileExistsError):
+        asyncio.run(run_pipeline(tmp_path, True, collision_policy="abort"))
+
+    assert (tmp_path / "Arduino" / "CS_1250").exists()
+    assert (tmp_path / "Projects" / "Terminal_Search").exists()
+
+
+def test_pipeline_collision_renames(tmp_path):
+    build_home(tmp_path)
+    (tmp_path / "College" / "CS_1250").mkdir()
+
+    plan = asyncio.run(run_pipeline(tmp_path, True))
+
+    assert (tmp_path / "College" / "CS_1250 (1)").exists()
+    assert not (tmp_path / "Arduino" / "CS_1250").exists()
+    assert not plan.conflicts
+
+
+def test_pipeline_routes_archives_like_plan_run(tmp_path):
+    for home in [tmp_path / "planned", tmp_path / "pipelined"]:
+        build_home(home)
+        with zipfile.ZipFile(home / "Downloads" / "photos.zip", "w") as archive:
+            archive.writestr("a.png", b"")
+            archive.writestr("b.jpg", b"")
+
+    planned = tmp_path / "planned"
+    fo.apply_plan(fo.plan_run(planned, True, fo.take_home_snapshot(planned)))
+    asyncio.run(run_pipeline(tmp_path / "pipelined", True))
+
+    assert (tmp_path / "pipelined" / "Pictures" / "photos.zip").exists()
+    assert tree(tmp_path / "pipelined") == tree(planned)
+
+
+def test_pipeline_journal_undo(tmp_path):
+    home = tmp_path / "home"
+    build_home(home)
+    before = tree(home)
+    journal_path = tmp_path / "journal.jsonl"
+
+    plan = asyncio.run(run_pipeline(home, True, journal=MoveJournal(journal_path)))
+
+    assert len(undo_last_run(journal_path)) == len(plan)
+    assert tree(home) == before
+
+
+def test_pipeline_journals_queued_moves_as_one_batch(tmp_path, monkeypatch):
+    (tmp_path / "Downloads").mkdir()
+    (tmp_path / "Documents").mkdir()
+    ops = []
+    for name in ["a.txt", "b.txt", "c.txt"]:
+        (tmp_path / "Downloads" / name).touch()
+        ops.append(
+            MoveOp(
+                tmp_path / "Downloads" / name,
+                tmp_path / "Documents" / name,
+                False,
+                "downloads",
+            )
+        )
+
+    journal = MoveJournal(tmp_path / "journal.jsonl")
+    batches = []
+    begin = journal.begin
+    monkeypatch.setattr(journal, "begin", lambda ops: batches.append(ops) or begin(ops))
+
+    async def drain():
+        move_queue = asyncio.Queue()
+        for op in ops + [None]:
+            move_queue.put_nowait(op)
+        await pipeline._move(move_queue, MovePlan(), journal)
+
+    asyncio.run(drain())
+
+    assert batches == [ops]
+    assert len(undo_last_run(tmp_path / "journal.jsonl")) == 3
+
+
+def test_pipeline_empty_home(tmp_path):
+    with pytest.raises(EmptyDirectory):
+        asyncio.run(run_pipeline(tmp_path))
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+
+"""Tests for planner"""
+
+import pytest
+
+from app.collisions import COLLISION_ABORT
+from app.planner import MoveOp, MovePlan
+from app.snapshot import EntrySnapshot, HomeSnapshot
+
+
+def test_move_plan_records_ops_in_order(tmp_path):
+    plan = MovePlan()
+    first = MoveOp(tmp_path / "a", tmp_path / "A" / "a", True, "projects")
+    second = MoveOp(tmp_path / "b.txt", tmp_path / "B" / "b.txt", False, "backups")
+
+    assert plan.add(first)
+    assert plan.add(second)
+
+    assert list(plan) == [first, second]
+    assert len(plan) == 2
+    plan.check()
+
+
+def test_move_plan_conflict_on_disk(tmp_path):
+    (tmp_path / "B").mkdir()
+    (tmp_path / "B" / "b.txt").touch()
+    plan = MovePlan(COLLISION_ABORT)
+
+    assert not plan.add(
+        MoveOp(tmp_path / "b.txt", tmp_path / "B" / "b.txt", False, "backups")
+    )
+
+    assert len(plan) == 0
+    with pytest.raises(FileExistsError):
+        plan.check()
+
+
+def test_move_plan_conflict_between_ops(tmp_path):
+    plan = MovePlan(COLLISION_ABORT)
+    target = tmp_path / "B" / "b.txt"
+
+    assert plan.add(MoveOp(tmp_path / "x" / "b.txt", target, False, "backups"))
+    assert not plan.add(MoveOp(tmp_path / "y" / "b.txt", target, False, "backups"))
+
+    with pytest.raises(FileExistsError):
+        plan.check()
+
+
+def test_move_plan_describe(tmp_path):
+    plan = MovePlan()
+    assert plan.describe() == "Nothing to move"
+
+    plan.add(MoveOp(tmp_path / "a", tmp_path / "A" / "a", True, "projects"))
+    assert plan.describe() == f"[projects] dir  {tmp_path / 'a'} -> {tmp_path / 'A' / 'a'}"
+
+
+def test_move_plan_renames_on_collision(tmp_path):
+    (tmp_path / "B").mkdir()
+    (tmp_path / "B" / "b.txt").touch()
+    (tmp_path / "B" / "b (4).txt").touch()
+    plan = MovePlan()
+    target = tmp_path / "B" / "b.txt"
+
+    first = plan.add(MoveOp(tmp_path / "x" / "b.txt", target, False, "backups"))
+    second = plan.add(MoveOp(tmp_path / "y" / "b.txt", target, False, "backups"))
+
+    assert first.destination == tmp_path / "B" / "b (5).txt"
+    assert second.destination == tmp_path / "B" / "b (6).txt"
+    assert list(plan) == [first, second]
+    plan.check()
+
+
+def test_move_plan_renames_claimed_target(tmp_path):
+    plan = MovePlan()
+    target = tmp_path / "B" / "repo"
+
+    plan.add(MoveOp(tmp_path / "x" / "repo", target, True, "projects"))
+    renamed = plan.add(MoveOp(tmp_path / "y" / "repo", target, True, "projects"))
+
+    assert renamed.destination == tmp_path / "B" / "repo (1)"
+
+
+def test_move_plan_answers_membership_from_snapshot(tmp_path, monkeypatch):
+    snapshot = HomeSnapshot(tmp_path)
+    snapshot.add_dir("Backups", [EntrySnapshot("b.txt", False)])
+    snapshot.add_dir("Desktop", [EntrySnapshot("b.txt", False)])
+    plan = MovePlan(snapshot=snapshot)
+
+    def no_disk(self):
+        raise AssertionError(f"{self} checked on disk")
+
+    monkeypatch.setattr(type(tmp_path), "exists", no_disk)
+    monkeypatch.setattr("app.planner.list_names", no_disk)
+    source = tmp_path / "Desktop" / "b.txt"
+
+    planned = plan.add(MoveOp(source, tmp_path / "Backups" / "b.txt", False, "t"))
+
+    assert planned.destination == tmp_path / "Backups" / "b (1).txt"
+
+
+def test_move_plan_falls_back_to_disk_outside_snapshot(tmp_path):
+    (tmp_path / "Other").mkdir()
+    (tmp_path / "Other" / "b.txt").touch()
+    plan = MovePlan(COLLISION_ABORT, HomeSnapshot(tmp_path))
+
+    op = MoveOp(tmp_path / "b.txt", tmp_path / "Other" / "b.txt", False, "t")
+
+    assert plan.add(op) is None
@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+
+"""Tests for repos"""
+
+import asyncio
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+import app.file_organizer as fo
+from app import stats
+from app.pipeline import run_pipeline
+from app.repos import RepoIndex
+from app.state import RunState
+from app.watcher import dispatch_batch
+
+OLD = time.time() - 24 * 60 * 60
+
+
+def make_repo(path: Path, active: bool) -> Path:
+    (path / ".git").mkdir(parents=True)
+    for name in ["HEAD", "index"]:
+        (path / ".git" / name).write_text("ref: refs/heads/main\n")
+        if not active:
+            os.utime(path / ".git" / name, (OLD, OLD))
+    os.utime(path / ".git", (OLD, OLD))
+    return path
+
+
+def test_probe_reads_activity_from_git_files(tmp_path):
+    repos = RepoIndex()
+
+    assert repos.probe(make_repo(tmp_path / "busy", active=True)) == (True, True)
+    assert repos.probe(make_repo(tmp_path / "idle", active=False)) == (True, False)
+    (tmp_path / "plain").mkdir()
+    assert repos.probe(tmp_path / "plain") == (False, False)
+    (tmp_path / "worktree").mkdir()
+    (tmp_path / "worktree" / ".git").write_text("gitdir: elsewhere\n")
+    assert repos.probe(tmp_path / "worktree") == (True, False)
+
+
+def test_active_window_is_configurable(tmp_path):
+    repo = make_repo(tmp_path / "repo", active=False)
+
+    assert RepoIndex(active_window=2 * 24 * 60 * 60).probe(repo).active
+    assert not RepoIndex(active_window=60).probe(repo).active
+
+
+def test_probe_once_per_run(tmp_path):
+    repo = make_repo(tmp_path / "repo", active=False)
+    repos = RepoIndex()
+    run_stats = stats.enable()
+    try:
+        repos.probe(repo)
+        repos.probe(repo)
+    finally:
+        stats.disable()
+
+    assert run_stats.counters["git_probes"] == 1
+
+
+def test_cache_across_runs_by_inode_and_mtime(tmp_path):
+    repo = make_repo(tmp_path / "repo", active=False)
+    cache_path = tmp_path / "state" / "repos.json"
+    # a missing cache starts empty
+    first = RepoIndex.load(cache_path)
+    first.probe(repo)
+    first.save(cache_path)
+
+    run_stats = stats.enable()
+    try:
+        assert not RepoIndex.load(cache_path).probe(repo).active
+    finally:
+        stats.disable()
+    # only .git itself was looked at, not HEAD, index and ORIG_HEAD
+    assert run_stats.counters["stats"] == 0
+
+    # a commit rewrites HEAD through a rename, changing the mtime of .git
+    (repo / ".git" / "HEAD.lock").write_text("ref: refs/heads/dev\n")
+    os.replace(repo / ".git" / "HEAD.lock", repo / ".git" / "HEAD")
+    assert RepoIndex.load(cache_path).probe(repo).active
+
+
+def test_unreadable_cache_starts_empty(tmp_path):
+    (tmp_path / "repos.json").write_text("{not json")
+    assert RepoIndex.load(tmp_path / "repos.json").records == {}
+
+
+@pytest.fixture
+def home(tmp_path: Path) -> Path:
+    for directory in ["Documents", "Projects", "Research"]:
+        (tmp_path / directory).mkdir()
+    make_repo(tmp_path / "Documents" / "busy", active=True)
+    make_repo(tmp_path / "Documents" / "Learn_idle", active=False)
+    return tmp_path
+
+
+def test_plan_run_defers_active_repositories(home):
+    plan = fo.plan_run(home)
+
+    assert [op.source.name for op in plan] == ["Learn_idle"]
+    assert [op.source.name for op in plan.deferred] == ["busy"]
+    assert "[defer active repository]" in plan.describe()
+
+
+def test_watch_batch_defers_active_repositories(home):
+    plan = dispatch_batch(home, {"Documents"})
+
+    assert (home / "Documents" / "busy").exists()
+    assert [op.source.name for op in plan.deferred] == ["busy"]
+    assert (home / "Research" / "Learn_idle").exists()
+
+
+def test_pipeline_defers_active_repositories(home):
+    plan = asyncio.run(run_pipeline(home))
+
+    assert (home / "Documents" / "busy").exists()
+    assert [op.source.name for op in plan.deferred] == ["busy"]
+    assert (home / "Research" / "Learn_idle").exists()
+
+
+def test_deferred_directory_is_not_recorded_as_organized(home):
+    state = RunState("config")
+    state.dirs["Documents"] = {"stale": True}
+    snapshot = fo.take_home_snapshot(home)
+    plan = fo.plan_run(home, snapshot=snapshot)
+    fo.apply_plan(plan)
+
+    fo.record_run_state(home, snapshot, plan, state)
+
+    assert "Documents" not in state.dirs
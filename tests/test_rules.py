@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+
+"""Tests for rules"""
+
+import pytest
+
+from app.rules import DEFAULT_RULES, Rule, compile_rules
+from app.snapshot import EntrySnapshot
+
+
+@pytest.fixture
+def dispatcher():
+    return compile_rules(DEFAULT_RULES)
+
+
+def route_name(dispatcher, source_dir, entry):
+    rule = dispatcher.route(source_dir, entry)
+    return None if rule is None else rule.name
+
+
+@pytest.mark.parametrize(
+    "entry, expected",
+    [
+        (EntrySnapshot("Learn_Go", True, True), "research"),
+        (EntrySnapshot("Learn_Go", True, False), None),
+        (EntrySnapshot("CS_1250", True, False), "college"),
+        (EntrySnapshot("CS_1250", True, True), "college"),
+        (EntrySnapshot("Hackathon_Yeti", True, True), "hackathon"),
+        (EntrySnapshot("Hackathon_Yeti", True, False), None),
+        (EntrySnapshot("Terminal_Search", True, True), "projects"),
+        (EntrySnapshot("Random_Dir", True, False), None),
+        (EntrySnapshot("recovery-key.txt", False), "backups"),
+        (EntrySnapshot("notes.txt", False), None),
+        (EntrySnapshot("backup_dir", True, False), None),
+        (EntrySnapshot("CS_notes.txt", False), None),
+    ],
+)
+def test_route_from_desktop(dispatcher, entry, expected):
+    assert route_name(dispatcher, "Desktop", entry) == expected
+
+
+def test_route_priority_keeps_entries_in_their_destination(dispatcher):
+    assert dispatcher.route("Research", EntrySnapshot("Learn_Go", True, True)) is None
+    assert dispatcher.route("Hackathons", EntrySnapshot("Hackathon_1", True, True)) is None
+    assert dispatcher.route("Backups", EntrySnapshot("key.txt", False)) is None
+
+
+def test_route_skip_sources(dispatcher):
+    assert dispatcher.route("Research", EntrySnapshot("repo", True, True)) is None
+    assert route_name(dispatcher, "College", EntrySnapshot("repo", True, True)) == (
+        "projects"
+    )
+
+
+def test_route_overlapping_substrings():
+    dispatcher = compile_rules(
+        [
+            Rule("a", "A", 2, for_dirs=False, substrings=("keyring",)),
+            Rule("b", "B", 1, for_dirs=False, substrings=("ring",)),
+        ]
+    )
+
+    assert route_name(dispatcher, "Desktop", EntrySnapshot("keyring", False)) == "b"
+
+
+def test_route_explicit_priority_not_declaration_order():
+    dispatcher = compile_rules(
+        [
+            Rule("late", "Late", 5, prefixes=("Te",)),
+            Rule("early", "Early", 1, prefixes=("Test",)),
+        ]
+    )
+
+    assert route_name(dispatcher, "Desktop", EntrySnapshot("Test_x", True)) == "early"
+    assert route_name(dispatcher, "Desktop", EntrySnapshot("Temp", True)) == "late"
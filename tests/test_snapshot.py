@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+
+"""Tests for snapshot"""
+
+from pathlib import Path
+
+import pytest
+
+from app.snapshot import EntrySnapshot, HomeSnapshot
+
+
+@pytest.fixture
+def snapshot(tmp_path: Path):
+    home_snapshot = HomeSnapshot(tmp_path)
+    home_snapshot.add_dir(
+        "Desktop",
+        [
+            EntrySnapshot("Learn_Go", True, True),
+            EntrySnapshot("notes", True),
+            EntrySnapshot("backup.txt", False),
+        ],
+    )
+    home_snapshot.add_dir("Research", [])
+
+    return home_snapshot
+
+
+def test_snapshot_top_dirs(snapshot):
+    assert sorted(snapshot.top_dirs()) == ["Desktop", "Research"]
+
+
+def test_snapshot_sub_dirs_and_files(snapshot):
+    assert sorted(entry.name for entry in snapshot.sub_dirs("Desktop")) == [
+        "Learn_Go",
+        "notes",
+    ]
+    assert snapshot.files("Desktop") == ["backup.txt"]
+
+
+def test_snapshot_unknown_dir_is_empty(snapshot):
+    assert snapshot.sub_dirs("Nope") == []
+    assert snapshot.files("Nope") == []
+    assert not snapshot.contains("Nope", "Learn_Go")
+
+
+def test_snapshot_move_keeps_entry_metadata(snapshot):
+    snapshot.move("Desktop", "Learn_Go", "Research")
+
+    assert not snapshot.contains("Desktop", "Learn_Go")
+    assert snapshot.contains("Research", "Learn_Go")
+    assert snapshot.sub_dirs("Research")[0].has_git
+
+
+def test_snapshot_move_into_untracked_dir(snapshot):
+    snapshot.move("Desktop", "backup.txt", "Backups")
+
+    assert snapshot.files("Backups") == ["backup.txt"]
+
+
+def test_snapshot_remove(snapshot):
+    snapshot.remove("Desktop", "backup.txt")
+    snapshot.remove("Desktop", "missing.txt")
+
+    assert snapshot.files("Desktop") == []
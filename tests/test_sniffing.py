@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+
+"""Tests for sniffing"""
+
+import pytest
+
+from app import sniffing
+from app.sniffing import (
+    classify_header,
+    is_partial_download,
+    read_header,
+    sniff_file,
+    sniff_files,
+)
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (b"%PDF-1.7\n", "Documents"),
+        (b"\x89PNG\r\n\x1a\n\x00\x00", "Pictures"),
+        (b"\xff\xd8\xff\xe0\x00\x10JFIF", "Pictures"),
+        (b"RIFF\x24\x00\x00\x00WAVEfmt ", "Music"),
+        (b"RIFF\x24\x00\x00\x00AVI LIST", "Videos"),
+        (b"\x00\x00\x00\x14ftypqt  \x00\x00", "Videos"),
+        (b"\x00\x00\x00\x18ftypmp42\x00\x00", "Music"),
+        (b"solid cube\n facet normal", "3D Models"),
+        (b"PK\x03\x04\x14\x00word/document.xml", "Documents"),
+        (b"PK\x03\x04\x14\x00random/member.bin", None),
+        (b'<?xml version="1.0"?>\n<svg xmlns="x">', "Pictures"),
+        (b"", None),
+        (b"\x7fELF\x02\x01\x01", None),
+    ],
+)
+def test_classify_header(header, expected):
+    assert classify_header(header) == expected
+
+
+def test_classify_header_text_only_without_suffix():
+    assert classify_header(b"plain notes\n", has_suffix=False) == "Documents"
+    assert classify_header(b"plain notes\n", has_suffix=True) is None
+    assert classify_header(b"bin\x00ary", has_suffix=False) is None
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("report.pdf.part", True),
+        ("photo.jpg.crdownload", True),
+        ("photo.DOWNLOAD", True),
+        ("clip.partial", True),
+        ("notes.tmp", True),
+        ("report.pdf", False),
+        ("partial", False),
+    ],
+)
+def test_is_partial_download(name, expected):
+    assert is_partial_download(name) is expected
+
+
+def test_read_header_is_bounded(tmp_path):
+    big = tmp_path / "big"
+    big.write_bytes(b"a" * (sniffing.HEADER_SIZE * 3))
+
+    assert len(read_header(big)) == sniffing.HEADER_SIZE
+    assert read_header(tmp_path / "missing") == b""
+
+
+def test_sniff_file_without_extension(tmp_path):
+    pdf = tmp_path / "invoice"
+    pdf.write_bytes(b"%PDF-1.4\n...")
+
+    assert sniff_file(pdf) == "Documents"
+
+
+def test_sniff_files_batch(tmp_path):
+    paths = []
+    for i, header in enumerate([b"%PDF-1.4", b"\x89PNG\r\n\x1a\n", b""]):
+        path = tmp_path / f"file{i}.download"
+        path.write_bytes(header)
+        paths.append(path)
+
+    assert sniff_files(paths, max_workers=2) == {
+        paths[0]: "Documents",
+        paths[1]: "Pictures",
+        paths[2]: None,
+    }
+    assert sniff_files([]) == {}
@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+
+"""Tests for CLI startup cost"""
+
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.startup import (
+    IMPORT_BUDGET_US,
+    LAZY_MODULES,
+    REPO_ROOT,
+    import_time_us,
+    imported_modules,
+)
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGET_US))
+def test_import_defers_lazy_modules(module):
+    assert not set(LAZY_MODULES[module]) & imported_modules(module)
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGET_US))
+def test_import_within_budget(module):
+    # generous slack, a shared CI box is noisier than the machine it was set on
+    assert import_time_us(module, runs=3) < 2 * IMPORT_BUDGET_US[module]
+
+
+def test_help_does_not_load_main():
+    code = (
+        "import sys\n"
+        "sys.argv = ['cli.py', '--help']\n"
+        "import cli\n"
+        "try:\n"
+        "    cli.cli()\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print('main' in sys.modules)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip().splitlines()[-1] == "False"
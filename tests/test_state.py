@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+
+"""Tests for state"""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+import app.file_organizer as fo
+from app import state as state_module
+from app.snapshot import EntrySnapshot
+from app.state import RunState, config_fingerprint
+
+
+@pytest.fixture(autouse=True)
+def no_racy_window(monkeypatch):
+    monkeypatch.setattr(state_module, "RACY_WINDOW_NS", 0)
+
+
+@pytest.fixture
+def organized_dir(tmp_path: Path):
+    directory = tmp_path / "Desktop"
+    directory.mkdir()
+    (directory / "repo").mkdir()
+    (directory / "notes.txt").touch()
+    entries = [EntrySnapshot("repo", True, False), EntrySnapshot("notes.txt", False)]
+    return directory, entries
+
+
+def test_cached_dir_round_trip(organized_dir, tmp_path):
+    directory, entries = organized_dir
+    run_state = RunState("cfg")
+    run_state.record_dir("Desktop", directory, entries)
+    run_state.save(tmp_path / "state" / "state.json")
+
+    loaded = RunState.load(tmp_path / "state" / "state.json", "cfg")
+
+    assert loaded.cached_dir("Desktop", directory) == entries
+
+
+def test_cached_dir_keeps_excluded_entries(organized_dir):
+    directory, entries = organized_dir
+    (directory / "vault").mkdir()
+    entries = entries + [EntrySnapshot("vault", True, excluded=True)]
+    os.utime(directory, ns=(0, 0))
+    run_state = RunState("cfg")
+    run_state.record_dir("Desktop", directory, entries)
+
+    assert run_state.cached_dir("Desktop", directory) == entries
+
+
+def test_cached_dir_keeps_symlinks(organized_dir, tmp_path):
+    directory, entries = organized_dir
+    (tmp_path / "outside").mkdir()
+    os.utime(tmp_path / "outside", ns=(0, 0))
+    (directory / "ext").symlink_to(tmp_path / "outside")
+    entries = entries + [EntrySnapshot("ext", True, is_symlink=True)]
+    os.utime(directory, ns=(0, 0))
+    run_state = RunState("cfg")
+    run_state.record_dir("Desktop", directory, entries)
+
+    assert run_state.cached_dir("Desktop", directory) == entries
+
+
+def test_cached_dir_detects_new_entry(organized_dir):
+    directory, entries = organized_dir
+    run_state = RunState("cfg")
+    run_state.record_dir("Desktop", directory, entries)
+
+    (directory / "new.txt").touch()
+    os.utime(directory, ns=(0, os.stat(directory).st_mtime_ns + 1))
+
+    assert run_state.cached_dir("Desktop", directory) is None
+
+
+def test_cached_dir_detects_git_init_in_subdir(organized_dir):
+    directory, entries = organized_dir
+    run_state = RunState("cfg")
+    run_state.record_dir("Desktop", directory, entries)
+    directory_mtime = os.stat(directory).st_mtime_ns
+
+    (directory / "repo" / ".git").mkdir()
+    os.utime(directory / "repo", ns=(0, directory_mtime + 5))
+    os.utime(directory, ns=(0, directory_mtime))
+
+    assert run_state.cached_dir("Desktop", directory) is None
+
+
+def test_cached_dir_watch_files(organized_dir):
+    directory, entries = organized_dir
+    run_state = RunState("cfg")
+    run_state.record_dir("Desktop", directory, entries, watch_files=True)
+    directory_mtime = os.stat(directory).st_mtime_ns
+
+    os.utime(directory / "notes.txt", ns=(0, 12345))
+    os.utime(directory, ns=(0, directory_mtime))
+
+    assert run_state.cached_dir("Desktop", directory) is None
+
+
+def test_record_dir_skips_racy_mtimes(organized_dir, monkeypatch):
+    directory, entries = organized_dir
+    monkeypatch.setattr(state_module, "RACY_WINDOW_NS", 60 * 1_000_000_000)
+    run_state = RunState("cfg")
+
+    run_state.record_dir("Desktop", directory, entries)
+
+    assert run_state.cached_dir("Desktop", directory) is None
+
+
+def test_load_ignores_other_config_and_garbage(organized_dir, tmp_path):
+    directory, entries = organized_dir
+    state_path = tmp_path / "state.json"
+    run_state = RunState("cfg")
+    run_state.record_dir("Desktop", directory, entries)
+    run_state.save(state_path)
+
+    assert RunState.load(state_path, "other").dirs == {}
+
+    state_path.write_text("{not json")
+    assert RunState.load(state_path, "cfg").dirs == {}
+    assert RunState.load(tmp_path / "missing.json", "cfg").dirs == {}
+
+
+def test_config_fingerprint():
+    assert config_fingerprint(True, ("a",)) == config_fingerprint(True, ("a",))
+    assert config_fingerprint(True, ("a",)) != config_fingerprint(False, ("a",))
+
+
+def test_incremental_snapshot_matches_full_scan(tmp_path, monkeypatch):
+    for directory in ["Desktop", "Projects", "Downloads", "Documents"]:
+        (tmp_path / directory).mkdir()
+    (tmp_path / "Desktop" / "repo").mkdir()
+    (tmp_path / "Desktop" / "repo" / ".git").touch()
+    (tmp_path / "Downloads" / "notes.txt").touch()
+    (tmp_path / "Downloads" / "archive.zip").touch()
+    run_state = RunState(fo.run_config(True))
+
+    snapshot = fo.take_home_snapshot(tmp_path, run_state)
+    plan = fo.plan_run(tmp_path, True, snapshot)
+    fo.apply_plan(plan)
+    fo.record_run_state(tmp_path, snapshot, plan, run_state)
+    assert json.loads(json.dumps(run_state.dirs)) == run_state.dirs
+
+    listed = []
+    real_list_non_hidden = fo.list_non_hidden
+
+    def counting_list(directory):
+        listed.append(directory)
+        return real_list_non_hidden(directory)
+
+    monkeypatch.setattr("app.file_organizer.list_non_hidden", counting_list)
+
+    incremental = fo.take_home_snapshot(tmp_path, run_state)
+    assert listed == [tmp_path]
+    assert len(fo.plan_run(tmp_path, True, incremental)) == 0
+
+    full = fo.take_home_snapshot(tmp_path)
+    for directory in full.top_dirs():
+        assert sorted(map(repr, full.entries(directory))) == sorted(
+            map(repr, incremental.entries(directory))
+        )
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+
+"""Tests for stats"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app.file_organizer as fo
+from app import stats
+
+
+@pytest.fixture(autouse=True)
+def stats_disabled():
+    yield
+    stats.disable()
+
+
+@pytest.fixture
+def small_home(tmp_path):
+    for directory in ["Desktop", "Downloads", "Projects", "Documents", "Backups"]:
+        (tmp_path / directory).mkdir()
+    (tmp_path / "Desktop" / "repo" / ".git").mkdir(parents=True)
+    (tmp_path / "Downloads" / "notes.txt").touch()
+    (tmp_path / "Downloads" / "backup.bin").touch()
+    return tmp_path
+
+
+def test_disabled_collects_nothing(small_home):
+    assert stats.span("anything") is stats.span("other")
+
+    stats.count("listings")
+    fo.organize_home(small_home, True)
+
+    run_stats = stats.enable()
+    assert set(run_stats.counters.values()) == {0}
+    assert run_stats.spans == {}
+
+
+def test_counts_and_spans_of_a_run(small_home):
+    run_stats = stats.enable()
+
+    plan = fo.plan_run(small_home, True)
+    with stats.span("apply"):
+        fo.apply_plan(plan)
+
+    # home and its five directories, each listed once
+    assert run_stats.counters["listings"] == 6
+    assert run_stats.counters["git_probes"] == 1
+    # destinations are answered from the snapshot
+    assert run_stats.counters["exists_checks"] == 0
+    assert run_stats.counters["renames"] == 3
+    assert run_stats.counters["header_reads"] == 0
+    assert set(run_stats.spans) == {"plan_home", "plan_downloads", "apply"}
+    assert run_stats.spans["apply"][0] == 1
+
+
+def test_format(small_home):
+    run_stats = stats.enable()
+    fo.organize_home(small_home, True)
+
+    table = run_stats.format(stats.STATS_TABLE)
+    document = json.loads(run_stats.format(stats.STATS_JSON))
+
+    assert "route_home" in table
+    assert document["spans"]["route_home"]["calls"] == 1
+    assert document["counters"]["renames"] == 2
+
+
+def test_count_from_many_threads():
+    run_stats = stats.enable()
+
+    def hammer(_):
+        for _ in range(10_000):
+            stats.count("stats")
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(hammer, range(8)))
+
+    assert run_stats.counters["stats"] == 80_000
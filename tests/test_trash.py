@@ -0,0 +1,197 @@
+#!/usr/bin/python3
+
+"""Tests for trash"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import app.file_organizer as fo
+import cli
+from app.exclusions import ExclusionMatcher
+from app.trash import DAY, Trash, TrashPolicy, default_trash_dir, format_size
+
+
+@pytest.fixture
+def downloads(tmp_path: Path) -> Path:
+    downloads = tmp_path / "Downloads"
+    downloads.mkdir()
+    return downloads
+
+
+def write_file(path: Path, size: int = 0, age_days: float = 0) -> Path:
+    path.write_bytes(b"\0" * size)
+    mtime = time.time() - age_days * DAY
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_default_trash_dir_follows_xdg_data_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+
+    assert default_trash_dir() == tmp_path / "data" / "Trash"
+    assert default_trash_dir(tmp_path) == tmp_path / ".local" / "share" / "Trash"
+
+
+def test_trash_writes_trashinfo(tmp_path, downloads):
+    file = write_file(downloads / "big release.zip")
+    trash_dir = default_trash_dir(tmp_path)
+
+    trashed = Trash(trash_dir).trash(file)
+
+    assert trashed == trash_dir / "files" / "big release.zip"
+    assert trashed.exists() and not file.exists()
+    info = (trash_dir / "info" / "big release.zip.trashinfo").read_text()
+    lines = info.splitlines()
+    assert lines[0] == "[Trash Info]"
+    assert lines[1] == "Path=" + str(downloads.resolve() / "big%20release.zip")
+    time.strptime(lines[2].removeprefix("DeletionDate="), "%Y-%m-%dT%H:%M:%S")
+
+
+def test_trash_name_collision(tmp_path, downloads):
+    trash = Trash(default_trash_dir(tmp_path))
+
+    first = trash.trash(write_file(downloads / "a.zip", 1))
+    second = trash.trash(write_file(downloads / "a.zip", 2))
+
+    assert first.name == "a.zip"
+    assert second.name == "a.zip.2"
+    assert second.stat().st_size == 2
+    assert (second.parent.parent / "info" / "a.zip.2.trashinfo").exists()
+
+
+def test_trash_policy_selects_in_one_pass(downloads):
+    write_file(downloads / "old-big.zip", 2048, age_days=40)
+    write_file(downloads / "old-small.zip", 10, age_days=40)
+    write_file(downloads / "new-big.tar.gz", 2048)
+    write_file(downloads / "old-big.txt", 2048, age_days=40)
+    write_file(downloads / ".hidden.zip", 2048, age_days=40)
+
+    policy = TrashPolicy(min_age_days=30, min_size=1024)
+
+    assert policy.select(downloads) == ([("old-big.zip", 2048)], True)
+    assert TrashPolicy(suffixes=(".txt",)).select(downloads)[0] == [
+        ("old-big.txt", 2048)
+    ]
+
+
+def test_trash_policy_honours_exclusions(tmp_path, downloads):
+    write_file(downloads / "keep.zip")
+    write_file(downloads / "old.zip")
+    exclusions = ExclusionMatcher(tmp_path, ["Downloads/keep.zip"])
+
+    assert TrashPolicy().select(downloads, exclusions) == ([("old.zip", 0)], True)
+
+
+@pytest.mark.parametrize("pattern", ["Downloads", "Downloads/", "/Downloads"])
+def test_trash_policy_honours_excluded_directory(tmp_path, downloads, pattern):
+    write_file(downloads / "keep.zip")
+    exclusions = ExclusionMatcher(tmp_path, [pattern])
+
+    assert TrashPolicy().select(downloads, exclusions) == ([], True)
+
+
+def test_trash_policy_without_files(downloads):
+    write_file(downloads / ".hidden.zip")
+    (downloads / "dir.zip").mkdir()
+
+    assert TrashPolicy().select(downloads) == ([], False)
+
+
+def test_del_zip_files_assume_yes(tmp_path, downloads, monkeypatch):
+    write_file(downloads / "old.zip", 5, age_days=10)
+    write_file(downloads / "new.zip", 5)
+    write_file(downloads / "notes.txt")
+
+    def no_input(_):
+        raise AssertionError("asked for confirmation")
+
+    monkeypatch.setattr("builtins.input", no_input)
+    fo.del_zip_files(tmp_path, True, policy=TrashPolicy(7), assume_yes=True)
+
+    assert (tmp_path / ".local" / "share" / "Trash" / "files" / "old.zip").exists()
+    assert not (downloads / "old.zip").exists()
+    assert (downloads / "new.zip").exists()
+
+
+def test_cli_trash_with_yes(tmp_path, downloads, monkeypatch):
+    write_file(downloads / "setup.zip", 2048)
+    write_file(downloads / "tiny.zip", 10)
+    monkeypatch.setattr(Path, "home", classmethod(lambda cls: tmp_path))
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setattr(
+        sys, "argv", ["cli.py", "--no-journal", "-t", "-y", "--trash-larger-than", "1K"]
+    )
+
+    cli.cli()
+
+    assert (tmp_path / "data" / "Trash" / "files" / "setup.zip").exists()
+    assert (downloads / "tiny.zip").exists()
+
+
+def test_cli_trash_keeps_excluded_files(tmp_path, downloads, monkeypatch):
+    write_file(downloads / "keep.zip")
+    write_file(downloads / "setup.zip")
+    monkeypatch.setattr(Path, "home", classmethod(lambda cls: tmp_path))
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setattr(
+        sys, "argv", ["cli.py", "--no-journal", "-t", "-y", "-x", "Downloads/keep.zip"]
+    )
+
+    cli.cli()
+
+    assert (downloads / "keep.zip").exists()
+    assert not (downloads / "setup.zip").exists()
+
+
+@pytest.mark.parametrize("options", [["-t", "-y"], ["-n", "-t"]])
+def test_cli_trash_keeps_excluded_directory(
+    tmp_path, downloads, monkeypatch, capsys, options
+):
+    write_file(downloads / "keep.zip")
+    # a dry run creates nothing, so home needs more than the excluded Downloads
+    (tmp_path / "Documents").mkdir()
+    monkeypatch.setattr(Path, "home", classmethod(lambda cls: tmp_path))
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setattr(
+        sys, "argv", ["cli.py", "--no-journal", *options, "-x", "Downloads/"]
+    )
+
+    cli.cli()
+
+    assert (downloads / "keep.zip").exists()
+    assert "[trash]" not in capsys.readouterr().out
+
+
+def test_cli_dry_run_lists_trash_candidates(tmp_path, downloads, monkeypatch, capsys):
+    write_file(downloads / "setup.zip", 2048)
+    monkeypatch.setattr(Path, "home", classmethod(lambda cls: tmp_path))
+    monkeypatch.setattr(sys, "argv", ["cli.py", "-n", "-t"])
+
+    cli.cli()
+
+    assert f"[trash] {downloads / 'setup.zip'} (2.0 KiB)" in capsys.readouterr().out
+    assert (downloads / "setup.zip").exists()
+
+
+@pytest.mark.parametrize(
+    "value, size", [("500", 500), ("10K", 10240), ("1.5M", 1572864), ("2GiB", 2**31)]
+)
+def test_parse_size(value, size):
+    assert cli.parse_size(value) == size
+
+
+@pytest.mark.parametrize("value", ["inf", "-inf", "nan", "1e400K", "-5", "big"])
+def test_parse_size_rejects_invalid(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        cli.parse_size(value)
+
+
+def test_format_size():
+    assert format_size(512) == "512 B"
+    assert format_size(1536) == "1.5 KiB"
+    assert format_size(3 * 1024**3) == "3.0 GiB"
@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+
+"""Tests for traversal"""
+
+from pathlib import Path
+
+import pytest
+
+import app.file_organizer as fo
+from app import stats
+from app.traversal import Traversal
+
+
+@pytest.fixture
+def nested_home(tmp_path: Path) -> Path:
+    for directory in ["Documents", "College", "Research", "Projects", "Backups"]:
+        (tmp_path / directory).mkdir()
+
+    school = tmp_path / "Documents" / "school"
+    (school / "CS101").mkdir(parents=True)
+    (school / "deeper" / "CS202").mkdir(parents=True)
+    (school / "node_modules" / "CS_pkg").mkdir(parents=True)
+    (school / "repo" / ".git").mkdir(parents=True)
+    (school / "repo" / "CS_inside").mkdir()
+    (school / "wallet-key.txt").write_text("secret")
+    (tmp_path / "Documents" / "CS_top").mkdir()
+    (tmp_path / "Documents" / "CS_top" / "CS_child").mkdir()
+    return tmp_path
+
+
+def walked(home: Path, max_depth: int) -> tuple[Traversal, set[str]]:
+    traversal = Traversal(fo.snapshot_dir_entries, max_depth)
+    names = {
+        str((parent / entry.name).relative_to(home))
+        for parent, entry in traversal.walk(home / "Documents")
+    }
+    return traversal, names
+
+
+def test_walk_default_depth_stays_one_level(nested_home):
+    traversal, names = walked(nested_home, 1)
+
+    assert names == {"Documents/school", "Documents/CS_top"}
+    assert traversal.visited == 2
+    assert traversal.pruned == 0
+
+
+def test_walk_prunes_heavy_trees_and_repositories(nested_home):
+    traversal, names = walked(nested_home, 4)
+
+    assert "Documents/school/deeper/CS202" in names
+    assert "Documents/school/node_modules" in names
+    assert "Documents/school/node_modules/CS_pkg" not in names
+    assert "Documents/school/repo" in names
+    assert "Documents/school/repo/CS_inside" not in names
+    assert traversal.pruned == 2
+    assert traversal.visited == len(names)
+
+
+def test_walk_counts_into_stats(nested_home):
+    run_stats = stats.enable()
+    try:
+        traversal, _ = walked(nested_home, 4)
+    finally:
+        stats.disable()
+
+    assert run_stats.counters["visited"] == traversal.visited
+    assert run_stats.counters["pruned"] == traversal.pruned
+
+
+def test_plan_run_routes_nested_items(nested_home):
+    plan = fo.plan_run(nested_home, max_depth=3)
+    moves = {
+        str(op.source.relative_to(nested_home)): op.destination.parent.name
+        for op in plan
+    }
+
+    assert moves == {
+        "Documents/school/CS101": "College",
+        "Documents/school/wallet-key.txt": "Backups",
+        "Documents/school/repo": "Projects",
+        "Documents/school/deeper/CS202": "College",
+        # moved whole, its child travels with it
+        "Documents/CS_top": "College",
+    }
+
+    fo.apply_plan(plan)
+    assert (nested_home / "College" / "CS202").is_dir()
+    assert (nested_home / "College" / "CS_top" / "CS_child").is_dir()
+    assert (nested_home / "Projects" / "repo" / "CS_inside").is_dir()
+
+
+def test_plan_run_renames_nested_collisions(nested_home):
+    (nested_home / "College" / "CS101").mkdir()
+
+    plan = fo.plan_run(nested_home, max_depth=2)
+
+    assert [op.destination.name for op in plan if op.source.name == "CS101"] == [
+        "CS101 (1)"
+    ]
+
+
+def test_plan_run_leaves_top_level_repositories_and_pruned_dirs(nested_home):
+    (nested_home / "myrepo" / ".git").mkdir(parents=True)
+    (nested_home / "myrepo" / "src" / "CS_utils").mkdir(parents=True)
+    (nested_home / "anaconda3" / "pkgs" / "pkg0" / "CS_thing").mkdir(parents=True)
+
+    plan = fo.plan_run(nested_home, max_depth=3)
+    sources = {str(op.source.relative_to(nested_home)) for op in plan}
+
+    assert not any(source.startswith(("myrepo/", "anaconda3/")) for source in sources)
+    assert "Documents/school/CS101" in sources
+
+
+def test_walk_does_not_descend_from_pruned_top_level(nested_home):
+    (nested_home / "anaconda3" / "pkgs" / "pkg0").mkdir(parents=True)
+    (nested_home / "myrepo" / ".git").mkdir(parents=True)
+    (nested_home / "myrepo" / "src" / "CS_utils").mkdir(parents=True)
+
+    for top, child in [("anaconda3", "pkgs"), ("myrepo", "src")]:
+        traversal = Traversal(fo.snapshot_dir_entries, 3)
+        names = {entry.name for _, entry in traversal.walk(nested_home / top)}
+
+        # the top level's own items are still routed, nothing below them
+        assert names == {child}
+        assert traversal.pruned == 1
+
+
+def test_plan_run_never_descends_through_symlinks(nested_home, tmp_path_factory):
+    outside = tmp_path_factory.mktemp("outside")
+    (outside / "CS_secret").mkdir()
+    (outside / "repo" / ".git").mkdir(parents=True)
+    (outside / "key.txt").write_text("secret")
+    (nested_home / "Stuff").mkdir()
+    (nested_home / "Stuff" / "ext").symlink_to(outside, target_is_directory=True)
+    (nested_home / "linked").symlink_to(outside, target_is_directory=True)
+
+    plan = fo.plan_run(nested_home, max_depth=3)
+
+    sources = {str(op.source.relative_to(nested_home)) for op in plan}
+    assert not any(source.startswith("Stuff/ext/") for source in sources)
+    # a symlinked top-level directory, such as a Downloads on another
+    # disk, is still routed one level deep but never below that
+    assert not any(source.startswith("linked/repo/") for source in sources)
+    assert "linked/repo" in sources
+
+
+def test_walk_yields_symlink_without_entering_it(nested_home, tmp_path_factory):
+    outside = tmp_path_factory.mktemp("outside")
+    (outside / "CS_secret").mkdir()
+    (nested_home / "Documents" / "school" / "ext").symlink_to(outside)
+
+    traversal, names = walked(nested_home, 4)
+
+    assert "Documents/school/ext" in names
+    assert "Documents/school/ext/CS_secret" not in names
@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+
+"""Tests for watcher"""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.journal import undo_last_run
+from app.watcher import DirectoryWatcher, changed_dirs, dispatch_batch, watch_home
+
+
+@pytest.fixture
+def home(tmp_path: Path):
+    for directory in ["Downloads", "Desktop", "Documents", "Backups", "Projects", "College"]:
+        (tmp_path / directory).mkdir()
+    return tmp_path
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_watcher_coalesces_events_into_one_batch(home):
+    watcher = DirectoryWatcher([home / "Downloads"], debounce=0.2)
+    batches = []
+
+    def collect():
+        for batch in watcher.batches():
+            batches.append(batch)
+
+    with watcher:
+        thread = threading.Thread(target=collect)
+        thread.start()
+        (home / "Downloads" / "a.txt").write_text("a")
+        (home / "Downloads" / "b.txt").write_text("b")
+        (home / "Downloads" / ".hidden").write_text("h")
+        (home / "Downloads" / "c.pdf.part").write_text("c")
+        assert wait_for(lambda: batches)
+        watcher.stop()
+        thread.join(timeout=5)
+
+    assert batches == [
+        {(home / "Downloads", "a.txt", False), (home / "Downloads", "b.txt", False)}
+    ]
+
+
+def test_changed_dirs(home):
+    batch = {
+        (home / "Downloads", "a.txt", False),
+        (home, "Stuff", True),
+        (home, "loose-file.txt", False),
+    }
+
+    assert changed_dirs(home, batch) == {"Downloads", "Stuff"}
+    assert changed_dirs(home, {(home, "", True)}) == {
+        "Backups",
+        "College",
+        "Desktop",
+        "Documents",
+        "Downloads",
+        "Projects",
+    }
+
+
+def test_dispatch_batch_routes_only_changed_dirs(home):
+    (home / "Downloads" / "notes.txt").touch()
+    (home / "Downloads" / "recovery-key.txt").touch()
+    (home / "Documents" / "repo").mkdir()
+    (home / "Documents" / "repo" / ".git").touch()
+
+    plan = dispatch_batch(home, {"Downloads"})
+
+    assert len(plan) == 2
+    assert (home / "Documents" / "notes.txt").exists()
+    assert (home / "Backups" / "recovery-key.txt").exists()
+    assert (home / "Documents" / "repo").exists()
+
+
+def test_dispatch_batch_is_journaled(home, tmp_path):
+    (home / "Downloads" / "notes.txt").touch()
+    journal_path = tmp_path / "state" / "journal.jsonl"
+
+    dispatch_batch(home, {"Downloads"}, journal_path=journal_path)
+    assert (home / "Documents" / "notes.txt").exists()
+
+    assert len(undo_last_run(journal_path)) == 1
+    assert (home / "Downloads" / "notes.txt").exists()
+
+
+def test_dispatch_batch_aborts_on_collision(home):
+    (home / "Downloads" / "notes.txt").write_text("new")
+    (home / "Documents" / "notes.txt").write_text("old")
+
+    with pytest.raises(FileExistsError):
+        dispatch_batch(home, {"Downloads"}, collision_policy="abort")
+
+    assert (home / "Downloads" / "notes.txt").exists()
+    assert (home / "Documents" / "notes.txt").read_text() == "old"
+
+
+def test_dispatch_batch_follows_duplicate_policy_and_depth(home):
+    (home / "Downloads" / "notes.txt").write_text("same")
+    (home / "Documents" / "notes.txt").write_text("same")
+    (home / "Desktop" / "Stuff").mkdir()
+    (home / "Desktop" / "Stuff" / "CS_101").mkdir()
+
+    dispatch_batch(
+        home, {"Downloads", "Desktop"}, True, duplicate_policy="skip", max_depth=2
+    )
+
+    assert (home / "Downloads" / "notes.txt").exists()
+    assert (home / "College" / "CS_101").exists()
+
+
+def test_watch_home_routes_new_downloads(home):
+    watcher = DirectoryWatcher([home, home / "Downloads"], debounce=0.05)
+    thread = threading.Thread(target=watch_home, args=(home,), kwargs={"watcher": watcher})
+    thread.start()
+
+    try:
+        (home / "Downloads" / "report.pdf").write_bytes(b"%PDF-1.4")
+        (home / "Stuff").mkdir()
+        (home / "Stuff" / "CS_101").mkdir()
+        assert wait_for(lambda: (home / "Documents" / "report.pdf").exists())
+        assert wait_for(lambda: (home / "College" / "CS_101").exists())
+    finally:
+        watcher.stop()
+        thread.join(timeout=5)
+
+    assert not thread.is_alive()